@@ -0,0 +1,223 @@
+"""
+Online Accuracy Tracking Module
+Persists every forecast the app serves and scores it walk-forward as actual
+prices arrive, keeping running MAE/RMSE/MAPE/directional accuracy per
+forecast horizon
+
+Each forecast row (bundle, origin date, target date, horizon, yhat) is
+stored once in the results store's forecasts table (results_store.py). Rows
+wait in an index by target date; observing the actual close for a date
+resolves exactly the rows targeting it and adds their errors to
+constant-size accumulators, so each observation costs O(1) per matching
+forecast and history is never re-predicted. Only targets after both the
+model's last training date and the last observed close are recorded, so
+every scored row was a genuine forecast of a price unknown when it was
+served. Accumulators are rebuilt from the store at start-up.
+
+Direction is scored against the price at the forecast origin: a forecast
+is directionally right when it and the actual moved the same way from it.
+"""
+
+import threading
+
+import numpy as np
+
+
+# Horizon buckets (days, inclusive upper bounds) reported by summary()
+HORIZON_BUCKETS = (1, 7, 30, 90, 180, 365)
+
+
+def _new_stats():
+    return {'n': 0, 'abs_error': 0.0, 'sq_error': 0.0, 'abs_pct_error': 0.0,
+            'direction_n': 0, 'direction_hits': 0}
+
+
+def _add(stats, other):
+    for key, value in other.items():
+        stats[key] += value
+
+
+def _metrics(stats):
+    n = stats['n']
+    if n == 0:
+        return {'n': 0}
+    return {
+        'n': n,
+        'mae': round(stats['abs_error'] / n, 2),
+        'rmse': round(float(np.sqrt(stats['sq_error'] / n)), 2),
+        'mape': round(stats['abs_pct_error'] / n * 100, 2),
+        'directional_accuracy': (round(stats['direction_hits'] / stats['direction_n'] * 100, 2)
+                                 if stats['direction_n'] else None),
+    }
+
+
+class AccuracyTracker:
+    """
+    Walk-forward accuracy of served forecasts for one asset.
+
+    Args:
+        store (ResultsStore): Store holding the forecasts
+        asset (str): Asset name
+    """
+
+    def __init__(self, store, asset):
+        self.store = store
+        self.asset = asset
+        self.actuals = {}
+        self.last_observed = None
+        self.stats = {}
+        self._pending = {}
+        self._recorded = {}
+        self._lock = threading.Lock()
+        for row in store.asset_forecasts(asset):
+            self._index(row)
+
+    def _index(self, row):
+        """Track a stored row: remember its coverage and score or queue it."""
+        bundle_id, origin, target, horizon, _ = row
+        key = (bundle_id, origin)
+        self._recorded[key] = max(self._recorded.get(key, 0), horizon)
+        if target in self.actuals:
+            self._score(row, self.actuals[target])
+        else:
+            self._pending.setdefault(target, []).append(row)
+
+    def _score(self, row, actual):
+        _, origin, _, horizon, yhat = row
+        stats = self.stats.setdefault(horizon, _new_stats())
+        error = actual - yhat
+        stats['n'] += 1
+        stats['abs_error'] += abs(error)
+        stats['sq_error'] += error * error
+        stats['abs_pct_error'] += abs(error / actual)
+        origin_close = self.actuals.get(origin)
+        if origin_close is not None:
+            stats['direction_n'] += 1
+            stats['direction_hits'] += (yhat > origin_close) == (actual > origin_close)
+
+    def observe(self, date, close):
+        """
+        Record the actual close for a date and score the forecasts targeting it.
+
+        Args:
+            date (str): ISO date ('YYYY-MM-DD')
+            close (float): Actual close
+        """
+        with self._lock:
+            if date in self.actuals:
+                return
+            self.actuals[date] = float(close)
+            if self.last_observed is None or date > self.last_observed:
+                self.last_observed = date
+            for row in self._pending.pop(date, ()):
+                self._score(row, self.actuals[date])
+
+    def observe_dataset(self, dataset):
+        """
+        Observe every close of a dataset not seen yet.
+
+        Args:
+            dataset (PriceDataset): Price history
+
+        Returns:
+            int: Number of new observations
+        """
+        dates = dataset.dates.astype('datetime64[D]').astype(str)
+        closes = dataset['Close']
+        start = 0
+        if self.last_observed is not None:
+            start = int(np.searchsorted(dates, self.last_observed, side='right'))
+        for date, close in zip(dates[start:], closes[start:]):
+            self.observe(date, close)
+        return len(dates) - start
+
+    def record(self, bundle, dates, yhat, lower, upper):
+        """
+        Persist a served forecast: only rows not recorded before whose target
+        is after the bundle's last training date and the last observed close.
+
+        Serving the same or a shorter forecast of a bundle again is a
+        dictionary lookup.
+
+        Args:
+            bundle (Bundle): Bundle whose model produced the forecast
+            dates (array-like): Forecast dates, starting the day after the
+                model's last training date
+            yhat (array-like): Predicted prices
+            lower (array-like): Lower interval bounds
+            upper (array-like): Upper interval bounds
+        """
+        if len(dates) == 0:
+            return
+        targets = np.asarray(dates, dtype='datetime64[D]')
+        origin = str(targets[0] - np.timedelta64(1, 'D'))
+        key = (bundle.bundle_id, origin)
+        if self._recorded.get(key, 0) >= len(targets):
+            return
+
+        with self._lock:
+            cutoff = np.datetime64(bundle.manifest['last_date'], 'D')
+            if self.last_observed is not None:
+                cutoff = max(cutoff, np.datetime64(self.last_observed, 'D'))
+            done = max(self._recorded.get(key, 0),
+                       int(np.searchsorted(targets, cutoff, side='right')))
+            # Skipped rows count as covered, so repeats take the fast path
+            self._recorded[key] = done
+            if done >= len(targets):
+                return
+            model_name = bundle.manifest['model_name']
+            rows = [
+                (self.asset, bundle.bundle_id, origin, str(target),
+                 int((target - targets[0]).astype(int)) + 1, model_name,
+                 float(value), float(low), float(high))
+                for target, value, low, high in zip(
+                    targets[done:], np.asarray(yhat)[done:], np.asarray(lower)[done:],
+                    np.asarray(upper)[done:])
+            ]
+            self.store.add_forecasts(rows)
+            for row in rows:
+                self._index(row[1:5] + row[6:7])
+
+    def snapshot(self, model_version):
+        """
+        Store the current live metrics as a snapshot as of the last observed date.
+
+        Args:
+            model_version (str): Bundle id being served
+        """
+        if self.last_observed is None:
+            return
+        summary = self.summary()
+        self.store.add_metric_snapshot(
+            self.asset, 'live', self.last_observed, model_version,
+            {bucket: metrics for bucket, metrics
+             in {'all': summary['overall'], **summary['by_horizon']}.items() if metrics['n']})
+
+    def summary(self):
+        """
+        Live accuracy overall and per horizon bucket.
+
+        Returns:
+            dict: 'last_observed', 'pending', 'overall' and 'by_horizon'
+            (bucket label -> n, mae, rmse, mape, directional_accuracy)
+        """
+        with self._lock:
+            stats = {horizon: dict(values) for horizon, values in self.stats.items()}
+            pending = sum(len(rows) for rows in self._pending.values())
+        overall = _new_stats()
+        buckets = {bound: _new_stats() for bound in HORIZON_BUCKETS}
+        for horizon, values in stats.items():
+            _add(overall, values)
+            bound = next((b for b in HORIZON_BUCKETS if horizon <= b), None)
+            if bound is not None:
+                _add(buckets[bound], values)
+        labels, lower = {}, 1
+        for bound in HORIZON_BUCKETS:
+            labels[bound] = f'{lower}-{bound}d' if bound > lower else f'{bound}d'
+            lower = bound + 1
+        return {
+            'last_observed': self.last_observed,
+            'pending': pending,
+            'overall': _metrics(overall),
+            'by_horizon': {labels[bound]: _metrics(values) for bound, values in buckets.items()},
+        }
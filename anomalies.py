@@ -0,0 +1,294 @@
+"""
+Anomaly Detection Module
+Flags abnormal price moves and volume spikes with rolling robust z-scores
+(median/MAD) and forecast-residual anomalies where the close falls outside
+the model's forecast interval
+
+Each day's value is scored against the median and MAD of the preceding
+`window` days (the day itself is excluded so a spike cannot mask itself):
+    z = 0.6745 * (x - median) / MAD
+and flagged when |z| exceeds the threshold (3.5, after Iglewicz and
+Hoaglin). Daily log returns of Close and log(1 + Volume) are scored. The
+whole history is scored in one vectorized pass over a sliding-window view
+(in bounded chunks), and AnomalyDetector keeps the last `window` values so
+each new candle is scored in O(window) instead of rescoring the history.
+
+Usage:
+    python anomalies.py --window 30 --threshold 3.5 --start 2024-01-01
+"""
+
+import argparse
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+DEFAULT_WINDOW = 30
+DEFAULT_THRESHOLD = 3.5
+
+# Makes the MAD of normally distributed data comparable to its standard deviation
+MAD_SCALE = 0.6745
+
+# Windows scored per vectorized block, bounding the temporary (rows x window) arrays
+CHUNK_ROWS = 65536
+
+SERIES = ('return', 'volume')
+
+
+def _robust_z(values, medians, mads):
+    """Robust z-scores; 0 where a value equals a zero-MAD median, inf beyond it."""
+    deviation = MAD_SCALE * (values - medians)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = deviation / mads
+    z[(mads == 0) & (deviation == 0)] = 0.0
+    return z
+
+
+def rolling_robust_z(values, window=DEFAULT_WINDOW, chunk_rows=CHUNK_ROWS):
+    """
+    Robust z-score of each value against the preceding `window` values.
+
+    Args:
+        values (np.ndarray): Series, oldest first
+        window (int): Number of preceding values forming the baseline
+        chunk_rows (int): Windows processed per vectorized block
+
+    Returns:
+        np.ndarray: z-scores (NaN for the first `window` values)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    z = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return z
+    windows = sliding_window_view(values[:-1], window)
+    for start in range(0, len(windows), chunk_rows):
+        block = windows[start:start + chunk_rows]
+        medians = np.median(block, axis=1)
+        mads = np.median(np.abs(block - medians[:, None]), axis=1)
+        stop = start + len(block)
+        z[window + start:window + stop] = _robust_z(values[window + start:window + stop],
+                                                    medians, mads)
+    return z
+
+
+def _series(close, volume):
+    """Scored series: log return (NaN on the first day) and log(1 + volume)."""
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.empty(len(close))
+    returns[:1] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = np.diff(np.log(close))
+    return returns, np.log1p(np.asarray(volume, dtype=np.float64))
+
+
+def interval_scores(dates, close, forecast):
+    """
+    Position of each close relative to the forecast interval on its date.
+
+    The score is 0 at yhat and +1/-1 at the upper/lower bound, so |score| > 1
+    means the close fell outside the interval.
+
+    Args:
+        dates (np.ndarray): datetime64 dates of the closes
+        close (np.ndarray): Closing prices
+        forecast (pd.DataFrame): Rows with 'ds', 'yhat', 'yhat_lower', 'yhat_upper'
+
+    Returns:
+        np.ndarray: Scores (NaN on dates the forecast does not cover)
+    """
+    forecast_dates = forecast['ds'].to_numpy(dtype='datetime64[D]')
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    index = np.clip(np.searchsorted(forecast_dates, dates), 0, len(forecast_dates) - 1)
+    covered = forecast_dates[index] == dates
+    yhat = forecast['yhat'].to_numpy()[index]
+    lower = forecast['yhat_lower'].to_numpy()[index]
+    upper = forecast['yhat_upper'].to_numpy()[index]
+    close = np.asarray(close, dtype=np.float64)
+    width = np.where(close >= yhat, upper - yhat, yhat - lower)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (close - yhat) / width
+    scores[~covered] = np.nan
+    return scores
+
+
+class AnomalyDetector:
+    """
+    Rolling robust z-scores of returns and volume over a price history,
+    extendable one candle at a time.
+
+    Args:
+        window (int): Days in the rolling baseline
+        threshold (float): |z| above which a day is flagged
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+        self.window = window
+        self.threshold = threshold
+        self.size = 0
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.close = np.empty(0)
+        self.volume = np.empty(0)
+        self.z = {name: np.empty(0) for name in SERIES}
+        self._recent = {name: deque(maxlen=window) for name in SERIES}
+        self._last_close = None
+
+    def fit(self, dataset):
+        """
+        Score a whole history in one vectorized pass.
+
+        Args:
+            dataset (PriceDataset): Price history with 'Close' and 'Volume'
+
+        Returns:
+            AnomalyDetector: self
+        """
+        close, volume = dataset['Close'], dataset['Volume']
+        self.size = len(close)
+        self.dates = dataset.dates.astype('datetime64[D]')
+        self.close = np.asarray(close, dtype=np.float64).copy()
+        self.volume = np.asarray(volume, dtype=np.float64).copy()
+        for name, values in zip(SERIES, _series(close, volume)):
+            self.z[name] = rolling_robust_z(values, self.window)
+            self._recent[name] = deque(values[-self.window:], maxlen=self.window)
+        self._last_close = float(close[-1]) if self.size else None
+        return self
+
+    def _append(self, date, close, volume, z):
+        """Append one scored candle, growing the arrays geometrically."""
+        if self.size == len(self.close):
+            capacity = max(2 * self.size, 64)
+            self.dates = np.resize(self.dates, capacity)
+            self.close = np.resize(self.close, capacity)
+            self.volume = np.resize(self.volume, capacity)
+            self.z = {name: np.resize(values, capacity) for name, values in self.z.items()}
+        self.dates[self.size] = date
+        self.close[self.size] = close
+        self.volume[self.size] = volume
+        for name in SERIES:
+            self.z[name][self.size] = z[name]
+        self.size += 1
+
+    def update(self, date, close, volume):
+        """
+        Score one new candle against the current window in O(window).
+
+        Args:
+            date (str or np.datetime64): Candle date
+            close (float): Close price
+            volume (float): Volume
+
+        Returns:
+            dict: z-score per series ('return', 'volume')
+        """
+        close, volume = float(close), float(volume)
+        values = {
+            'return': (np.log(close / self._last_close) if self._last_close else np.nan),
+            'volume': np.log1p(volume),
+        }
+        z = {}
+        for name, value in values.items():
+            recent = self._recent[name]
+            if len(recent) < self.window:
+                z[name] = np.nan
+            else:
+                baseline = np.fromiter(recent, dtype=np.float64, count=len(recent))
+                median = np.median(baseline)
+                mad = np.median(np.abs(baseline - median))
+                z[name] = float(_robust_z(np.array([value]), median, np.array([mad]))[0])
+            recent.append(value)
+        self._last_close = close
+        self._append(np.datetime64(date, 'D'), close, volume, z)
+        return z
+
+    def extend(self, dataset):
+        """
+        Score the candles of a dataset that are newer than the last one seen.
+
+        Args:
+            dataset (PriceDataset): Price history extending the scored one
+
+        Returns:
+            int: Number of new candles
+        """
+        dates = dataset.dates.astype('datetime64[D]')
+        start = 0
+        if self.size:
+            start = int(np.searchsorted(dates, self.dates[self.size - 1], side='right'))
+        for date, close, volume in zip(dates[start:], dataset['Close'][start:],
+                                       dataset['Volume'][start:]):
+            self.update(date, close, volume)
+        return len(dates) - start
+
+    def select(self, start=None, end=None, interval=None):
+        """
+        Flagged days between two dates (inclusive).
+
+        Args:
+            start (str): First ISO date, or None for the beginning
+            end (str): Last ISO date, or None for the end
+            interval (np.ndarray): Optional interval_scores() for the scored days
+
+        Returns:
+            list: Dicts with date, close, volume, z-scores, interval score and
+            the kinds of anomaly ('return', 'volume', 'interval')
+        """
+        dates = self.dates[:self.size]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, 'D')))
+        hi = self.size if end is None else int(np.searchsorted(dates, np.datetime64(end, 'D'),
+                                                               side='right'))
+        flags = {name: np.abs(self.z[name][lo:hi]) > self.threshold for name in SERIES}
+        if interval is not None:
+            flags['interval'] = np.abs(interval[lo:hi]) > 1
+        flagged = np.flatnonzero(np.logical_or.reduce(list(flags.values())))
+
+        def value(x):
+            return None if not np.isfinite(x) else round(float(x), 3)
+
+        rows = []
+        for offset in flagged:
+            i = lo + offset
+            rows.append({
+                'date': str(dates[i]),
+                'close': float(self.close[i]),
+                'volume': float(self.volume[i]),
+                'return_z': value(self.z['return'][i]),
+                'volume_z': value(self.z['volume'][i]),
+                'interval_score': value(interval[i]) if interval is not None else None,
+                'kinds': [name for name, flag in flags.items() if flag[offset]],
+            })
+        return rows
+
+
+def main(argv=None):
+    from data_loader import load_dataset, preprocess_data
+
+    parser = argparse.ArgumentParser(description="Rolling robust z-score anomalies")
+    parser.add_argument('--csv', help="Price CSV (default: the bundled data)")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--start', help="First date to list (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last date to list (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    root = Path(__file__).parent
+    csv_path = args.csv or (sorted((root / 'data').glob('*.csv')) or sorted(root.glob('*.csv')))[0]
+    dataset = preprocess_data(load_dataset(str(csv_path)))
+
+    start = time.perf_counter()
+    detector = AnomalyDetector(args.window, args.threshold).fit(dataset)
+    seconds = time.perf_counter() - start
+    rows = detector.select(args.start, args.end)
+
+    print(f"\nScored {detector.size:,} days in {seconds * 1000:.1f} ms "
+          f"(window {args.window}, |z| > {args.threshold:g})")
+    for row in rows:
+        print(f"  {row['date']}  ${row['close']:>12,.2f}  return z {row['return_z']!s:>8}  "
+              f"volume z {row['volume_z']!s:>8}  {', '.join(row['kinds'])}")
+    print(f"{len(rows)} anomalous day(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,52 +4,241 @@ Displays historical data, forecasts, and evaluation metrics
 with interactive forecast horizon selection
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, send_from_directory
+from jinja2 import TemplateNotFound
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
 from pathlib import Path
 import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
 import base64
+import copy
+import gzip
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 
 # Use Agg backend to avoid display issues in Flask
 matplotlib.use('Agg')
 
-from data_loader import load_data, preprocess_data, get_train_test_split
-from prophet_model import train_prophet_model, generate_forecast, plot_forecast, save_model, load_model
+from data_loader import dataset_cache_path, load_dataset, preprocess_data, get_train_test_split
+from prophet_model import generate_forecast, plot_forecast
+from models import fit_model, refit_model
+from model_store import (BundleWatcher, asset_registry, file_hash, load_bundle, promote,
+                         publish_bundle, FORECAST_HORIZON)
 from model_evaluation import evaluate_model, print_evaluation_metrics, plot_evaluation
 from eda import plot_historical_price, plot_price_statistics, print_data_summary
+from risk import DEFAULT_PATHS, MAX_HORIZON, MAX_PATHS, METHODS, simulate_risk
+from volatility import VOLATILITY_MODELS, fit_volatility, rescale_intervals
+from accuracy_tracker import AccuracyTracker
+from anomalies import AnomalyDetector, interval_scores
+from correlation import DEFAULT_STEP, DEFAULT_WINDOW, cross_asset_summary, load_assets
+from results_store import ResultsStore, default_db_path
+import instrumentation
 
-# Initialize Flask app
-app = Flask(__name__)
+# Initialize Flask app. /static is served by static_files() below so plots
+# come from the bundle currently being served.
+app = Flask(__name__, static_folder=None)
 
 # Get project root directory
 PROJECT_ROOT = Path(__file__).parent
 DATA_DIR = PROJECT_ROOT / 'data'
 STATIC_DIR = PROJECT_ROOT / 'static'
-MODEL_DIR = PROJECT_ROOT / 'model'
+CACHE_DIR = PROJECT_ROOT / 'cache'
+REGISTRY_DIR = Path(os.environ.get('FORECAST_REGISTRY_DIR', PROJECT_ROOT / 'registry'))
+
+# Forecasting model: 'prophet' or any baseline registered in models.py
+MODEL_NAME = os.environ.get('FORECAST_MODEL', 'prophet')
 
 # Ensure directories exist
 STATIC_DIR.mkdir(exist_ok=True)
-MODEL_DIR.mkdir(exist_ok=True)
 
-# Global variables to store model and data
+# Loaded price data: the CSV path, the compact PriceDataset, its
+# fingerprint, zero-copy train/test views into it, and the rolling robust
+# z-scores of its prices. Replaced as a whole when the data is reloaded;
+# handlers read it once per request, like the bundle.
+PriceData = namedtuple('PriceData', 'path dataset version train_df test_df detector')
+
+# Global variables to store model and data.
 model = None
-df_original = None
-train_df = None
-test_df = None
+prices = None
 metrics = None
-forecast_cache = {}
+
+# Risk simulations by (data fingerprint, horizon, paths, method), most recent last
+risk_cache = OrderedDict()
+RISK_CACHE_SIZE = 64
+
+# Fitted volatility models by (data fingerprint, model name), most recent last
+volatility_models = OrderedDict()
+VOLATILITY_CACHE_SIZE = 64
+
+# Forecast-interval anomaly scores by (data fingerprint, bundle id), most
+# recent last (room for the served bundle and one being warmed up)
+anomaly_intervals = OrderedDict()
+ANOMALY_CACHE_SIZE = 4
+
+# Dashboard horizons offered on the home page
+DASHBOARD_HORIZONS = (7, 30, 60, 90)
+DEFAULT_DASHBOARD_HORIZON = 30
+
+# Pre-rendered home pages of the served bundle: {bundle id: {horizon: page}},
+# replaced as a whole when a bundle is activated
+dashboard_pages = {}
+
+# Held while a newly promoted bundle is loaded and warmed up in the background
+_refresh_lock = threading.Lock()
+
+# Datasets of every CSV asset for cross-asset analytics, by (path, mtime) of the CSVs
+asset_datasets = OrderedDict()
+
+# Guards the caches above, which request threads share (see _cached())
+_cache_lock = threading.Lock()
+
+# Per-route request latency, exposed at /metrics
+REQUEST_LATENCY = instrumentation.Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    labels=('route', 'method', 'status'),
+)
+
+# Bundle currently served (model, metrics, precomputed forecast, plots).
+# Handlers read it once per request so a concurrent swap is never half-seen.
+# registry is the served asset's registry directory, set at initialization.
+registry = None
+bundle = None
+bundle_watcher = None
+
+# Forecasts, backtest windows and metric snapshots (SQLite), and the
+# walk-forward scoring of served forecasts against actuals (live metrics)
+results = None
+accuracy = None
+
+
+def _rss_mb():
+    """
+    Return the resident set size of this process in MB.
+
+    Reads VmRSS from /proc on Linux and falls back to the peak RSS reported
+    by getrusage elsewhere.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float('nan')
+    # ru_maxrss is KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _activate_bundle(new_bundle):
+    """
+    Warm up a loaded bundle, then switch serving to it. Requests keep
+    being served by the previous bundle until the switch.
+    """
+    global bundle, model, metrics, dashboard_pages
+    pages = warm_up(new_bundle, prices)
+    if results is not None:
+        results.record_evaluation(accuracy.asset, new_bundle)
+        accuracy.snapshot(new_bundle.bundle_id)
+    dashboard_pages = {new_bundle.bundle_id: pages}
+    bundle = new_bundle
+    model, metrics = new_bundle.model, new_bundle.metrics
+    print(f"Serving bundle {new_bundle.bundle_id} ({new_bundle.manifest['model_name']})")
+
+
+def _load_data(csv_path):
+    """
+    Load (or reload) the price data and feed new closes to the accuracy tracker.
+    Everything is built aside and published in one assignment, so requests
+    running meanwhile keep a consistent view of the previous data.
+    """
+    global prices
+    cache_path = dataset_cache_path(csv_path, CACHE_DIR)
+    dataset = preprocess_data(load_dataset(str(csv_path), cache_path=str(cache_path)))
+    # Train/test split (views, no copies)
+    train_df, test_df = get_train_test_split(dataset, test_days=90)
+    
+    # Score only the new candles when the data extends what was scored, on
+    # a copy: the served detector may be read by requests meanwhile
+    previous = prices.detector if prices is not None else None
+    scored = previous.size if previous is not None else 0
+    if (scored and len(dataset.dates) >= scored
+            and dataset.dates[scored - 1].astype('datetime64[D]')
+            == previous.dates[scored - 1]):
+        detector = copy.deepcopy(previous)
+        detector.extend(dataset)
+    else:
+        detector = AnomalyDetector().fit(dataset)
+    
+    prices = PriceData(csv_path, dataset, dataset.fingerprint(), train_df, test_df, detector)
+    if accuracy is not None:
+        accuracy.observe_dataset(dataset)
+
+
+def _train_and_publish(df_original, csv_path):
+    """
+    Train, evaluate and plot the configured model, then publish and promote
+    the result as a new registry bundle.
+    """
+    # Step 3: Train the configured model
+    print(f"Model: {MODEL_NAME}\n")
+    loaded = prices
+    trained = fit_model(MODEL_NAME, loaded.train_df)
+    
+    # Step 4: Evaluate model
+    evaluation = evaluate_model(trained, loaded.test_df)
+    print_evaluation_metrics(evaluation)
+    
+    # Serve forecasts from a refit on all the data, so they start after the
+    # last observation rather than inside the holdout
+    served = refit_model(MODEL_NAME, trained, loaded.dataset)
+    
+    # Step 5: Generate plots into a staging directory for the bundle
+    print("Generating visualizations...\n")
+    forecast = generate_forecast(served, periods=FORECAST_HORIZON)
+    
+    with tempfile.TemporaryDirectory() as plot_dir:
+        plot_dir = Path(plot_dir)
+        
+        # Historical price plot
+        plot_historical_price(df_original, save_path=str(plot_dir / 'historical.png'))
+        
+        # Forecast plot (30 days default)
+        forecast_30 = forecast.iloc[:len(forecast) - (FORECAST_HORIZON - 30)]
+        plot_forecast(served, forecast_30, save_path=str(plot_dir / 'forecast.png'))
+        
+        # Evaluation plot
+        plot_evaluation(evaluation['combined'], save_path=str(plot_dir / 'evaluation.png'))
+        
+        # Step 6: Publish and promote the bundle
+        plots = {path.name: str(path) for path in plot_dir.glob('*.png')}
+        source = {'path': csv_path.name, 'hash': file_hash(csv_path)}
+        bundle_id = publish_bundle(served, evaluation, loaded.dataset, registry,
+                                   model_name=MODEL_NAME, plots=plots, forecast=forecast,
+                                   source=source)
+    promote(bundle_id, registry)
+    _activate_bundle(bundle_watcher.poll(force=True) or load_bundle(registry, bundle_id))
 
 
 def initialize_app():
     """
-    Initialize the application by loading data and training the model.
+    Initialize the application by loading data and either loading the
+    promoted model bundle or training and publishing a new one.
     This function runs once at startup.
     """
-    global model, df_original, train_df, test_df, metrics
+    global registry, bundle_watcher, results, accuracy
     
     print("\n" + "=" * 60)
     print("INITIALIZING CRYPTOCURRENCY FORECASTING APPLICATION")
@@ -69,43 +258,35 @@ def initialize_app():
     
     csv_path = csv_files[0]
     print(f"Loading data from: {csv_path}\n")
+    rss_start = _rss_mb()
     
     try:
-        # Step 1: Load and preprocess data
-        df_original = load_data(str(csv_path))
-        print_data_summary(df_original)
-        
-        df_prophet = preprocess_data(df_original)
-        
-        # Step 2: Create train/test split
-        train_df, test_df = get_train_test_split(df_prophet, test_days=90)
+        # Steps 1-2: Load and preprocess data into the compact array-backed
+        # dataset and split it into train/test views
+        registry = asset_registry(csv_path.stem, REGISTRY_DIR)
+        results = ResultsStore(default_db_path(REGISTRY_DIR))
+        accuracy = AccuracyTracker(results, registry.name)
+        _load_data(csv_path)
         
-        # Step 3: Train Prophet model
-        model = train_prophet_model(train_df)
-        
-        # Step 4: Evaluate model
-        metrics = evaluate_model(model, test_df)
-        print_evaluation_metrics(metrics)
-        
-        # Step 5: Generate and save plots
-        print("Generating visualizations...\n")
-        
-        # Historical price plot
-        hist_path = STATIC_DIR / 'historical.png'
-        plot_historical_price(df_original, save_path=str(hist_path))
-        
-        # Forecast plot (30 days default)
-        forecast = generate_forecast(model, periods=30)
-        forecast_path = STATIC_DIR / 'forecast.png'
-        plot_forecast(model, forecast, save_path=str(forecast_path))
+        # The full dataframe is only needed transiently for summary and plots
+        df_original = prices.dataset.to_frame()
+        print_data_summary(df_original)
         
-        # Evaluation plot
-        eval_path = STATIC_DIR / 'evaluation.png'
-        plot_evaluation(metrics['combined'], save_path=str(eval_path))
+        # Reuse the promoted bundle when it was built from this data and model
+        bundle_watcher = BundleWatcher(registry)
+        existing = load_bundle(registry)
+        if (existing is not None
+                and existing.manifest['data_fingerprint'] == prices.version
+                and existing.manifest['model_name'] == MODEL_NAME):
+            print(f"Using published bundle {existing.bundle_id}\n")
+            bundle_watcher.bundle_id = existing.bundle_id
+            _activate_bundle(existing)
+        else:
+            _train_and_publish(df_original, csv_path)
+        del df_original
         
-        # Save model
-        model_path = MODEL_DIR / 'prophet_model.pkl'
-        save_model(model, str(model_path))
+        print(f"\nDataset memory: {prices.dataset.nbytes / 1024:.1f} KB")
+        print(f"Process RSS: {rss_start:.1f} MB before load, {_rss_mb():.1f} MB after initialization")
         
         print("\n" + "=" * 60)
         print("INITIALIZATION COMPLETE - APPLICATION READY")
@@ -120,46 +301,301 @@ def initialize_app():
         return False
 
 
+@app.before_request
+def start_request_timer():
+    """
+    Record the request start time for the latency histogram.
+    Registered first so bundle hot-loads count towards latency.
+    """
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def observe_request_latency(response):
+    """
+    Add the request's latency to the per-route histogram.
+    """
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route, request.method,
+                                str(response.status_code))
+    return response
+
+
+@app.before_request
+def refresh_bundle():
+    """
+    Hot-load a newly promoted bundle without restarting the server.
+    Checking, loading and warming up happen in a background thread, so no
+    request waits for them. A bundle built from newer data also reloads the
+    prices, which scores served forecasts against the new actuals.
+    """
+    if bundle_watcher is None or not bundle_watcher.due():
+        return
+    if _refresh_lock.acquire(blocking=False):
+        threading.Thread(target=_refresh_in_background, name='bundle-refresh',
+                         daemon=True).start()
+
+
+def _refresh_in_background():
+    try:
+        new_bundle = bundle_watcher.poll()
+        if new_bundle is not None:
+            if (new_bundle.manifest['data_fingerprint'] != prices.version
+                    and prices.path.exists()):
+                _load_data(prices.path)
+            _activate_bundle(new_bundle)
+    except Exception as e:
+        print(f"ERROR hot-loading bundle: {e}")
+    finally:
+        _refresh_lock.release()
+
+
+@app.route('/static/<path:filename>', endpoint='static')
+def static_files(filename):
+    """
+    Serve plots from the current bundle, falling back to the static folder.
+    """
+    current = bundle
+    if current is not None and (current.plots_dir / filename).is_file():
+        return send_from_directory(current.plots_dir, filename)
+    return send_from_directory(STATIC_DIR, filename)
+
+
+def _forecast_rows(current, horizon):
+    """
+    Future forecast rows for a horizon: precomputed when the bundle has
+    them, otherwise predicted from the bundle's model.
+    """
+    rows = current.forecast_for(horizon)
+    if rows is None:
+        rows = generate_forecast(current.model, periods=horizon).tail(horizon)
+    return rows
+
+
+def record_forecast(current, dates, yhat, lower, upper):
+    """
+    Persist served forecast rows for live accuracy tracking.
+    """
+    if accuracy is not None:
+        accuracy.record(current, dates, yhat, lower, upper)
+
+
+def _cached(cache, size, key, compute):
+    """
+    Look up a value in a least-recently-used cache shared by request
+    threads, computing and storing it on a miss.
+
+    The lock is only held around cache access, not while computing, so
+    two threads missing the same key may both compute it.
+
+    Args:
+        cache (OrderedDict): Cache, most recently used last
+        size (int): Maximum number of entries
+        key: Cache key
+        compute (callable): Zero-argument function returning the value
+
+    Returns:
+        The cached or computed value
+    """
+    with _cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    value = compute()
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+    return value
+
+
+def volatility_model(name):
+    """
+    EWMA or GARCH(1,1) model fitted to the loaded prices, once per data version.
+    """
+    loaded = prices
+    return _cached(volatility_models, VOLATILITY_CACHE_SIZE, (loaded.version, name),
+                   lambda: fit_volatility(name, loaded.dataset))
+
+
+def anomaly_interval(current, loaded):
+    """
+    Scores of the loaded closes against the bundle model's forecast
+    interval (in-sample and forecast days), once per data version and bundle.
+    """
+    def compute():
+        detector = loaded.detector
+        first = current.forecast['ds'].iloc[0]
+        days = (pd.Timestamp(detector.dates[detector.size - 1]) - first).days + 1
+        forecast = generate_forecast(current.model, periods=max(days, len(current.forecast)))
+        return interval_scores(detector.dates[:detector.size],
+                               detector.close[:detector.size], forecast)
+
+    return _cached(anomaly_intervals, ANOMALY_CACHE_SIZE,
+                   (loaded.version, current.bundle_id), compute)
+
+
+def all_asset_datasets():
+    """
+    Datasets of every CSV in the data directory (or project root),
+    reloaded only when a file is added, removed or modified.
+    """
+    csv_files = sorted(DATA_DIR.glob('*.csv')) if DATA_DIR.exists() else []
+    csv_files = csv_files or sorted(PROJECT_ROOT.glob('*.csv'))
+    key = tuple((path, path.stat().st_mtime) for path in csv_files)
+    return _cached(asset_datasets, 1, key, lambda: load_assets(csv_files, CACHE_DIR))
+
+
+def forecast_payload(forecast):
+    """
+    JSON body of /api/forecast for a set of forecast rows.
+    """
+    return {
+        'dates': forecast['ds'].dt.strftime('%Y-%m-%d').tolist(),
+        'predictions': forecast['yhat'].round(2).tolist(),
+        'upper_bound': forecast['yhat_upper'].round(2).tolist(),
+        'lower_bound': forecast['yhat_lower'].round(2).tolist(),
+    }
+
+
+def metrics_payload(evaluation):
+    """
+    JSON body of /api/metrics: a bundle's holdout evaluation metrics and,
+    under 'live', the walk-forward accuracy of served forecasts.
+    """
+    return {
+        'mae': round(evaluation['mae'], 2),
+        'rmse': round(evaluation['rmse'], 2),
+        'mape': round(evaluation['mape'], 2),
+        'directional_accuracy': round(evaluation['directional_accuracy'], 2),
+        'live': accuracy.summary() if accuracy is not None else None,
+    }
+
+
+def metrics_text():
+    """
+    Prometheus text exposition: per-route latency histograms, timers of
+    the instrumented loading/forecasting/plotting functions, and RSS.
+    """
+    current = bundle
+    lines = REQUEST_LATENCY.render()
+    lines += instrumentation.render_sections()
+    lines += instrumentation.render_gauge(
+        'process_resident_memory_bytes', 'Resident set size', _rss_mb() * 1024 * 1024)
+    if current is not None:
+        lines += ['# HELP forecast_bundle_info Bundle currently served',
+                  '# TYPE forecast_bundle_info gauge',
+                  f'forecast_bundle_info{{bundle_id="{current.bundle_id}",'
+                  f'model="{current.manifest["model_name"]}"}} 1']
+    return '\n'.join(lines) + '\n'
+
+
+def dashboard_context(current, horizon):
+    """
+    Template context of the home page for one bundle and horizon.
+    """
+    forecast = _forecast_rows(current, horizon)
+
+    # Get last actual price and the forecast at the horizon
+    last_actual_price = current.manifest['last_close']
+    last_date = pd.Timestamp(current.manifest['last_date'])
+    forecast_price = forecast.iloc[-1]['yhat']
+    forecast_price_low = forecast.iloc[-1]['yhat_lower']
+    forecast_price_high = forecast.iloc[-1]['yhat_upper']
+
+    # Calculate percentage change
+    pct_change = ((forecast_price - last_actual_price) / last_actual_price) * 100
+
+    return {
+        'forecast': forecast,
+        'metrics': current.metrics,
+        'horizon': horizon,
+        'last_actual_price': f"${last_actual_price:,.2f}",
+        'forecast_price': f"${forecast_price:,.2f}",
+        'forecast_price_low': f"${forecast_price_low:,.2f}",
+        'forecast_price_high': f"${forecast_price_high:,.2f}",
+        'pct_change': f"{pct_change:+.2f}%",
+        'last_date': last_date.strftime('%Y-%m-%d'),
+        'forecast_date': (last_date + pd.Timedelta(days=horizon)).strftime('%Y-%m-%d'),
+    }
+
+
+def dashboard_page(current, horizon):
+    """
+    Home page for one bundle and horizon: template context, rendered HTML
+    and its gzip encoding (both None when the template is unavailable).
+    """
+    context = dashboard_context(current, horizon)
+    html = None
+    try:
+        with app.test_request_context('/', query_string={'horizon': horizon}):
+            html = render_template('index.html', **context)
+    except TemplateNotFound:
+        pass
+    encoded = html.encode() if html is not None else None
+    return {
+        'context': context,
+        'html': encoded,
+        'gzip': gzip.compress(encoded, compresslevel=6) if encoded is not None else None,
+    }
+
+
+def warm_up(current, loaded):
+    """
+    Precompute what the first requests for a newly activated bundle would
+    otherwise compute: the home page for every dashboard horizon and the
+    forecast-interval anomaly scores. Nothing is recorded as served.
+
+    Returns:
+        dict: Horizon -> dashboard_page()
+    """
+    start = time.perf_counter()
+    pages = {horizon: dashboard_page(current, horizon) for horizon in DASHBOARD_HORIZONS}
+    if any(page['html'] is None for page in pages.values()):
+        print("Dashboard not pre-rendered: templates/index.html is missing")
+    if loaded is not None and loaded.detector.size:
+        anomaly_interval(current, loaded)
+    print(f"Warmed up bundle {current.bundle_id} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return pages
+
+
 @app.route('/')
 def index():
     """
     Home page route displaying historical data, forecast, and metrics.
     Includes form to select forecast horizon.
     """
-    if model is None or df_original is None:
+    current = bundle
+    if current is None:
         return "Error: Application not properly initialized. Check the console logs.", 500
-    
+
     # Get forecast horizon from request (default: 30 days)
-    horizon = request.args.get('horizon', 30, type=int)
-    
+    horizon = request.args.get('horizon', DEFAULT_DASHBOARD_HORIZON, type=int)
+
     # Validate horizon
-    if horizon not in [7, 30, 60, 90]:
-        horizon = 30
-    
-    # Generate forecast for selected horizon
-    forecast = generate_forecast(model, periods=horizon)
-    
-    # Get last actual price and first forecast price
-    last_actual_price = df_original['Close'].iloc[-1]
-    forecast_price_in_30 = forecast.iloc[-1]['yhat']
-    forecast_price_low = forecast.iloc[-1]['yhat_lower']
-    forecast_price_high = forecast.iloc[-1]['yhat_upper']
-    
-    # Calculate percentage change
-    pct_change = ((forecast_price_in_30 - last_actual_price) / last_actual_price) * 100
-    
-    return render_template(
-        'index.html',
-        metrics=metrics,
-        horizon=horizon,
-        last_actual_price=f"${last_actual_price:,.2f}",
-        forecast_price=f"${forecast_price_in_30:,.2f}",
-        forecast_price_low=f"${forecast_price_low:,.2f}",
-        forecast_price_high=f"${forecast_price_high:,.2f}",
-        pct_change=f"{pct_change:+.2f}%",
-        last_date=df_original['Date'].iloc[-1].strftime('%Y-%m-%d'),
-        forecast_date=(df_original['Date'].iloc[-1] + pd.Timedelta(days=horizon)).strftime('%Y-%m-%d')
-    )
+    if horizon not in DASHBOARD_HORIZONS:
+        horizon = DEFAULT_DASHBOARD_HORIZON
+
+    # Pre-rendered at bundle activation; built here only if warm-up did not run
+    page = dashboard_pages.get(current.bundle_id, {}).get(horizon)
+    if page is None:
+        page = dashboard_page(current, horizon)
+    forecast = page['context']['forecast']
+    record_forecast(current, forecast['ds'], forecast['yhat'], forecast['yhat_lower'],
+                    forecast['yhat_upper'])
+    if page['html'] is None:
+        return render_template('index.html', **page['context'])
+
+    if request.accept_encodings['gzip'] > 0:
+        response = Response(page['gzip'], mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(page['html'], mimetype='text/html')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 
 @app.route('/api/forecast', methods=['GET'])
@@ -168,23 +604,27 @@ def api_forecast():
     API endpoint to get forecast data for a specific horizon.
     Returns JSON with forecast details.
     """
-    if model is None:
+    current = bundle
+    if current is None:
         return jsonify({'error': 'Model not initialized'}), 500
     
     horizon = request.args.get('horizon', 30, type=int)
+    if not 1 <= horizon <= MAX_HORIZON:
+        return jsonify({'error': f'horizon must be between 1 and {MAX_HORIZON}'}), 400
+    scale_by = request.args.get('volatility')
+    if scale_by is not None and scale_by not in VOLATILITY_MODELS:
+        return jsonify({'error': f"volatility must be one of: {', '.join(VOLATILITY_MODELS)}"}), 400
     
-    # Generate forecast
-    forecast = generate_forecast(model, periods=horizon)
+    # Precomputed or generated forecast
+    forecast = _forecast_rows(current, horizon)
+    record_forecast(current, forecast['ds'], forecast['yhat'], forecast['yhat_lower'],
+                    forecast['yhat_upper'])
     
-    # Prepare response
-    forecast_data = {
-        'dates': forecast.tail(horizon)['ds'].dt.strftime('%Y-%m-%d').tolist(),
-        'predictions': forecast.tail(horizon)['yhat'].round(2).tolist(),
-        'upper_bound': forecast.tail(horizon)['yhat_upper'].round(2).tolist(),
-        'lower_bound': forecast.tail(horizon)['yhat_lower'].round(2).tolist(),
-    }
+    # Optionally widen/narrow the intervals to the current volatility regime
+    if scale_by is not None:
+        forecast = rescale_intervals(forecast, volatility_model(scale_by))
     
-    return jsonify(forecast_data)
+    return jsonify(forecast_payload(forecast))
 
 
 @app.route('/api/metrics', methods=['GET'])
@@ -192,17 +632,182 @@ def api_metrics():
     """
     API endpoint to get model evaluation metrics.
     """
-    if metrics is None:
+    current = bundle
+    if current is None:
         return jsonify({'error': 'Metrics not computed'}), 500
     
-    metrics_data = {
-        'mae': round(metrics['mae'], 2),
-        'rmse': round(metrics['rmse'], 2),
-        'mape': round(metrics['mape'], 2),
-        'directional_accuracy': round(metrics['directional_accuracy'], 2)
-    }
+    return jsonify(metrics_payload(current.metrics))
+
+
+def risk_summary(horizon, paths, method):
+    """
+    Monte-Carlo risk for the loaded price history, cached per data version.
+    """
+    loaded = prices
+    return _cached(risk_cache, RISK_CACHE_SIZE, (loaded.version, horizon, paths, method),
+                   lambda: simulate_risk(loaded.dataset.y, horizon, paths, method))
+
+
+@app.route('/api/risk', methods=['GET'])
+def api_risk():
+    """
+    API endpoint with simulated price quantiles, Value-at-Risk and
+    Expected Shortfall over a horizon.
+    """
+    if prices is None:
+        return jsonify({'error': 'Data not loaded'}), 500
+    
+    horizon = request.args.get('horizon', 30, type=int)
+    paths = request.args.get('paths', DEFAULT_PATHS, type=int)
+    method = request.args.get('method', 'bootstrap')
+    if not 1 <= horizon <= MAX_HORIZON:
+        return jsonify({'error': f'horizon must be between 1 and {MAX_HORIZON}'}), 400
+    if not 100 <= paths <= MAX_PATHS:
+        return jsonify({'error': f'paths must be between 100 and {MAX_PATHS}'}), 400
+    if method not in METHODS:
+        return jsonify({'error': f"method must be one of: {', '.join(METHODS)}"}), 400
+    
+    return jsonify(risk_summary(horizon, paths, method))
+
+
+@app.route('/api/volatility', methods=['GET'])
+def api_volatility():
+    """
+    API endpoint with an EWMA or GARCH(1,1) volatility forecast.
+    """
+    if prices is None:
+        return jsonify({'error': 'Data not loaded'}), 500
+    
+    horizon = request.args.get('horizon', 30, type=int)
+    name = request.args.get('model', 'garch')
+    if not 1 <= horizon <= MAX_HORIZON:
+        return jsonify({'error': f'horizon must be between 1 and {MAX_HORIZON}'}), 400
+    if name not in VOLATILITY_MODELS:
+        return jsonify({'error': f"model must be one of: {', '.join(VOLATILITY_MODELS)}"}), 400
+    
+    return jsonify(volatility_model(name).summary(horizon))
+
+
+def _iso_date(value):
+    """The value if it is an ISO date (YYYY-MM-DD), else None."""
+    try:
+        return datetime.strptime(value or '', '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+@app.route('/api/history/forecasts', methods=['GET'])
+def api_forecast_history():
+    """
+    API endpoint answering "what did we forecast for date X": every stored
+    forecast targeting the date (or issued on it with issued=1) and the
+    actual close if known.
+    """
+    if results is None:
+        return jsonify({'error': 'Results store not initialized'}), 500
+    
+    date = _iso_date(request.args.get('date'))
+    if date is None:
+        return jsonify({'error': 'date must be given as YYYY-MM-DD'}), 400
+    issued = request.args.get('issued', '0') not in ('0', 'false', '')
+    query = results.forecasts_issued if issued else results.forecasts_for
+    
+    return jsonify({
+        'date': date,
+        'actual': accuracy.actuals.get(date),
+        'forecasts': query(accuracy.asset, date),
+    })
+
+
+@app.route('/api/history/backtests', methods=['GET'])
+def api_backtest_history():
+    """
+    API endpoint with recent backtest windows and their metrics.
+    """
+    if results is None:
+        return jsonify({'error': 'Results store not initialized'}), 500
+    
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'backtests': results.backtests(accuracy.asset, limit)})
+
+
+@app.route('/api/history/metrics', methods=['GET'])
+def api_metrics_history():
+    """
+    API endpoint with recent live or holdout metric snapshots.
+    """
+    if results is None:
+        return jsonify({'error': 'Results store not initialized'}), 500
+    
+    kind = request.args.get('kind', 'live')
+    limit = request.args.get('limit', 100, type=int)
+    if kind not in ('live', 'holdout'):
+        return jsonify({'error': "kind must be 'live' or 'holdout'"}), 400
+    return jsonify({'kind': kind, 'snapshots': results.metric_snapshots(accuracy.asset, kind, limit)})
+
+
+@app.route('/api/anomalies', methods=['GET'])
+def api_anomalies():
+    """
+    API endpoint listing anomalous days between start and end (inclusive):
+    return or volume robust z-scores beyond the threshold, or closes
+    outside the served model's forecast interval.
+    """
+    current, loaded = bundle, prices
+    if current is None or loaded is None:
+        return jsonify({'error': 'Model not initialized'}), 500
     
-    return jsonify(metrics_data)
+    start, end = request.args.get('start'), request.args.get('end')
+    for value in (start, end):
+        if value is not None and _iso_date(value) is None:
+            return jsonify({'error': 'start and end must be given as YYYY-MM-DD'}), 400
+    
+    return jsonify({
+        'window': loaded.detector.window,
+        'threshold': loaded.detector.threshold,
+        'anomalies': loaded.detector.select(start, end, anomaly_interval(current, loaded)),
+    })
+
+
+@app.route('/api/correlation', methods=['GET'])
+def api_correlation():
+    """
+    API endpoint with cross-asset return correlation, covariance and beta
+    over the latest window, the whole sample, and rolling history.
+    """
+    window = request.args.get('window', DEFAULT_WINDOW, type=int)
+    step = request.args.get('step', DEFAULT_STEP, type=int)
+    benchmark = request.args.get('benchmark')
+    if not 2 <= window <= 3650:
+        return jsonify({'error': 'window must be between 2 and 3650'}), 400
+    if not 1 <= step <= window:
+        return jsonify({'error': 'step must be between 1 and window'}), 400
+    
+    try:
+        return jsonify(cross_asset_summary(all_asset_datasets(), window, step, benchmark))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/retrain', methods=['GET'])
+def api_retrain():
+    """
+    API endpoint exposing the retraining daemon's queue depth, running
+    jobs and recent job durations.
+    """
+    try:
+        with open(REGISTRY_DIR / 'daemon_status.json') as f:
+            return jsonify(json.load(f))
+    except FileNotFoundError:
+        return jsonify({'error': 'Retraining daemon has not run'}), 404
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus metrics (see metrics_text()).
+    """
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/about')
@@ -214,12 +819,24 @@ def about():
 
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run the forecasting web app")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--no-debug', action='store_true',
+                        help="Disable the debugger and reloader (use for load tests)")
+    parser.add_argument('--single-threaded', action='store_true',
+                        help="Handle one request at a time")
+    args = parser.parse_args()
+    
     # Initialize the application
     success = initialize_app()
     
     if success:
         # Run Flask app
-        print("Starting Flask server on http://localhost:5000\n")
-        app.run(debug=True, host='localhost', port=5000)
+        print(f"Starting Flask server on http://{args.host}:{args.port}\n")
+        app.run(debug=not args.no_debug, host=args.host, port=args.port,
+                threaded=not args.single_threaded)
     else:
         print("Failed to initialize application. Please check the errors above.")
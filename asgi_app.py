@@ -0,0 +1,406 @@
+"""
+ASGI Serving Module
+Async variant of the web app: cheap and cached requests are answered on
+the event loop, while CPU-bound forecasting runs in a bounded executor
+with a timeout, so a slow on-demand Prophet prediction no longer holds up
+/api/metrics and precomputed forecasts queued behind it
+
+Served on the event loop: /api/metrics, /metrics, /api/retrain and
+/api/forecast for horizons precomputed in the bundle. Bundle plots under
+/static are read in the default thread pool. On-demand forecasts go to the
+forecasting executor (threads, or processes attached to the bundle's
+shared arrays so predictions do not compete with the loop for the GIL); at
+most `max_pending` may be queued or running, beyond which requests get 503.
+A request is answered 504 after `timeout` seconds and its prediction is
+cancelled if it has not started; a client disconnect cancels it the same
+way. Work that has already started runs to completion in the background.
+Every other route (the HTML pages) is passed to the Flask app in a thread.
+
+The bundle state, initialization and hot reload are those of app.py.
+
+Usage:
+    python asgi_app.py --port 5000 --executor process --workers 2 --timeout 30
+    uvicorn asgi_app:app --port 5000      # configured from FORECAST_EXECUTOR* env vars
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import app as wsgi
+from prophet_model import generate_forecast
+from shared_arrays import attach_bundle, detach, release, share_bundle
+
+
+# Seconds between checks for a newly promoted bundle
+REFRESH_INTERVAL = 2.0
+
+# Bundle attached by a forecasting worker process, by shared name
+_worker_bundles = {}
+
+
+def predict_payload(model, horizon):
+    """
+    Predict `horizon` future days and return the /api/forecast body.
+    """
+    rows = generate_forecast(model, periods=horizon).tail(horizon)
+    return wsgi.forecast_payload(rows)
+
+
+def _predict_in_worker(shared_name, horizon):
+    """Process-pool task: predict with the shared bundle, attached once per worker."""
+    current = _worker_bundles.get(shared_name)
+    if current is None:
+        # Another bundle is served now: unmap the superseded one
+        for name in _worker_bundles:
+            detach(name)
+        _worker_bundles.clear()
+        current = _worker_bundles[shared_name] = attach_bundle(shared_name)
+    return predict_payload(current.model, horizon)
+
+
+def _horizon(query, default=30):
+    """The integer horizon query argument, or the default like Flask's type=int."""
+    values = query.get('horizon')
+    try:
+        return int(values[0])
+    except (TypeError, ValueError):
+        return default
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_response(send, status, body, content_type='application/json', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()),
+                    (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _json(payload):
+    return json.dumps(payload).encode()
+
+
+class AsyncForecastApp:
+    """
+    ASGI application serving the forecasting API.
+
+    Args:
+        executor (str): 'thread' or 'process' pool for on-demand forecasts
+        workers (int): Forecasting executor size
+        timeout (float): Seconds before an offloaded request is answered 504
+        max_pending (int): Offloaded requests allowed queued or running
+            before new ones are rejected with 503
+    """
+
+    def __init__(self, executor='thread', workers=2, timeout=30.0, max_pending=16):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor '{executor}' (use 'thread' or 'process')")
+        self.executor_kind = executor
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.executor = None
+        self._pending = 0
+        self._refresh_task = None
+        # Shared bundle files by bundle id, and offloaded tasks using each
+        self._shared = {}
+        self._in_flight = Counter()
+
+    @classmethod
+    def from_env(cls):
+        """Configure from FORECAST_EXECUTOR, _WORKERS, _TIMEOUT and _QUEUE."""
+        return cls(executor=os.environ.get('FORECAST_EXECUTOR', 'thread'),
+                   workers=int(os.environ.get('FORECAST_EXECUTOR_WORKERS', 2)),
+                   timeout=float(os.environ.get('FORECAST_EXECUTOR_TIMEOUT', 30)),
+                   max_pending=int(os.environ.get('FORECAST_EXECUTOR_QUEUE', 16)))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    # Lifecycle
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if not await asyncio.to_thread(wsgi.initialize_app):
+                    await send({'type': 'lifespan.startup.failed',
+                                'message': 'Initialization failed, see the logs'})
+                    return
+                pool = ThreadPoolExecutor if self.executor_kind == 'thread' else ProcessPoolExecutor
+                self.executor = pool(max_workers=self.workers)
+                self._refresh_task = asyncio.create_task(self._refresh_bundles())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._refresh_task is not None:
+                    self._refresh_task.cancel()
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                for name in self._shared.values():
+                    release(name)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _refresh_bundles(self):
+        """Hot-load newly promoted bundles (off the request path)."""
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            await asyncio.to_thread(wsgi.refresh_bundle)
+            self._retire_shared()
+
+    def _retire_shared(self, *keep):
+        """
+        Release the shared files of bundles that are no longer served (nor
+        in `keep`) once no offloaded forecast uses them, so a long-running
+        server holds one shared bundle in memory rather than one per deploy.
+        """
+        current = wsgi.bundle
+        keep = set(keep) | ({current.bundle_id} if current is not None else set())
+        for bundle_id, name in list(self._shared.items()):
+            if bundle_id not in keep and not self._in_flight[name]:
+                del self._shared[bundle_id]
+                release(name)
+
+    # Requests
+
+    async def _http(self, scope, receive, send):
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        start = time.perf_counter()
+        path = scope['path']
+        query = urllib.parse.parse_qs(scope['query_string'].decode('latin-1'))
+        # Volatility-rescaled forecasts are served by the Flask route
+        if path == '/api/forecast' and 'volatility' not in query:
+            route, status = path, await self._forecast(query, receive, send)
+        elif path == '/api/metrics':
+            route, status = path, await self._metrics(send)
+        elif path == '/metrics':
+            route, status = path, 200
+            await _send_response(send, 200, wsgi.metrics_text().encode(),
+                                 'text/plain; version=0.0.4')
+        elif path == '/api/retrain':
+            route, status = path, await self._retrain_status(send)
+        elif path.startswith('/static/') and await self._bundle_plot(path[len('/static/'):], send):
+            route, status = '/static/<path:filename>', 200
+        else:
+            # Flask records latency for the routes it serves
+            await self._call_wsgi(scope, body, send)
+            return
+        wsgi.REQUEST_LATENCY.observe(time.perf_counter() - start, route, scope['method'],
+                                     str(status))
+
+    async def _forecast(self, query, receive, send):
+        current = wsgi.bundle
+        if current is None:
+            await _send_response(send, 500, _json({'error': 'Model not initialized'}))
+            return 500
+        horizon = _horizon(query)
+        if not 1 <= horizon <= wsgi.MAX_HORIZON:
+            await _send_response(send, 400, _json(
+                {'error': f'horizon must be between 1 and {wsgi.MAX_HORIZON}'}))
+            return 400
+        rows = current.forecast_for(horizon)
+        if rows is not None:
+            wsgi.record_forecast(current, rows['ds'], rows['yhat'], rows['yhat_lower'],
+                                 rows['yhat_upper'])
+            await _send_response(send, 200, _json(wsgi.forecast_payload(rows)))
+            return 200
+
+        shared = None
+        if self.executor_kind == 'process':
+            # Workers attach the bundle's arrays instead of each loading a copy
+            if current.bundle_id not in self._shared:
+                self._shared[current.bundle_id] = await asyncio.to_thread(share_bundle, current)
+            shared = self._shared[current.bundle_id]
+            self._retire_shared(current.bundle_id)
+            call = (_predict_in_worker, shared, horizon)
+        else:
+            call = (predict_payload, current.model, horizon)
+        status, payload = await self._offload(receive, *call, shared=shared)
+        if status == 200:
+            wsgi.record_forecast(current, payload['dates'], payload['predictions'],
+                                 payload['lower_bound'], payload['upper_bound'])
+        if status is not None:
+            await _send_response(send, status, _json(payload),
+                                 headers=[(b'retry-after', b'1')] if status == 503 else ())
+        return status or 499
+
+    async def _offload(self, receive, func, *args, shared=None):
+        """
+        Run func(*args) in the forecasting executor, bounded by max_pending
+        and the timeout and cancelled when the client disconnects.
+
+        Args:
+            shared (str): Shared bundle name the task uses, kept published
+                until the task is done
+
+        Returns:
+            tuple: (status, payload); status is None if the client went away
+        """
+        if self._pending >= self.max_pending:
+            return 503, {'error': 'Forecast queue is full, retry later'}
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        if shared is not None:
+            self._in_flight[shared] += 1
+        future = self.executor.submit(func, *args)
+        # Only release the slot once the worker is really done with it
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, shared))
+        result = asyncio.wrap_future(future)
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            done, _ = await asyncio.wait({result, disconnect}, timeout=self.timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnect.cancel()
+        if result in done:
+            try:
+                return 200, result.result()
+            except Exception as e:
+                return 500, {'error': f'Forecast failed: {e}'}
+        future.cancel()
+        if disconnect in done:
+            return None, None
+        return 504, {'error': f'Forecast did not finish within {self.timeout:g}s'}
+
+    def _release(self, shared=None):
+        self._pending -= 1
+        if shared is not None:
+            self._in_flight[shared] -= 1
+            if not self._in_flight[shared]:
+                del self._in_flight[shared]
+                self._retire_shared()
+
+    async def _metrics(self, send):
+        current = wsgi.bundle
+        if current is None:
+            await _send_response(send, 500, _json({'error': 'Metrics not computed'}))
+            return 500
+        await _send_response(send, 200, _json(wsgi.metrics_payload(current.metrics)))
+        return 200
+
+    async def _retrain_status(self, send):
+        try:
+            text = await asyncio.to_thread((wsgi.REGISTRY_DIR / 'daemon_status.json').read_bytes)
+        except FileNotFoundError:
+            await _send_response(send, 404, _json({'error': 'Retraining daemon has not run'}))
+            return 404
+        await _send_response(send, 200, text)
+        return 200
+
+    async def _bundle_plot(self, filename, send):
+        """Serve a plot of the current bundle; False if it has no such file."""
+        current = wsgi.bundle
+        if current is None or '..' in Path(filename).parts:
+            return False
+        plot = current.plots_dir / filename
+        try:
+            data = await asyncio.to_thread(plot.read_bytes)
+        except (FileNotFoundError, IsADirectoryError):
+            return False
+        await _send_response(send, 200, data, 'image/png' if plot.suffix == '.png'
+                             else 'application/octet-stream')
+        return True
+
+    async def _call_wsgi(self, scope, body, send):
+        """Serve the request with the Flask app in a worker thread."""
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': (scope.get('server') or ('localhost', 80))[0],
+            'SERVER_PORT': str((scope.get('server') or ('localhost', 80))[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            key = name.decode('latin-1').upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = f'HTTP_{key}'
+            environ[key] = value.decode('latin-1')
+
+        def call():
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started['status'] = int(status.split(' ', 1)[0])
+                started['headers'] = headers
+
+            chunks = wsgi.app.wsgi_app(environ, start_response)
+            try:
+                data = b''.join(chunks)
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+            return started['status'], started['headers'], data
+
+        status, headers, data = await asyncio.to_thread(call)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        })
+        await send({'type': 'http.response.body', 'body': data})
+
+
+app = AsyncForecastApp.from_env()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the forecasting web app on an ASGI server")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--executor', choices=['thread', 'process'], default=app.executor_kind,
+                        help="Executor for on-demand forecasts")
+    parser.add_argument('--workers', type=int, default=app.workers,
+                        help="Forecasting executor size")
+    parser.add_argument('--timeout', type=float, default=app.timeout,
+                        help="Seconds before an on-demand forecast is answered 504")
+    parser.add_argument('--max-pending', type=int, default=app.max_pending,
+                        help="Queued or running forecasts before answering 503")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The async server needs uvicorn: pip install uvicorn")
+
+    app = AsyncForecastApp(executor=args.executor, workers=args.workers,
+                           timeout=args.timeout, max_pending=args.max_pending)
+    print(f"Starting ASGI server on http://{args.host}:{args.port}\n")
+    uvicorn.run(app, host=args.host, port=args.port, lifespan='on', log_level='warning')
@@ -0,0 +1,476 @@
+"""
+Benchmark Suite Module
+Times the load / fit / predict / evaluate / plot hot paths on the bundled
+BTC CSV and on synthetic OHLCV series scaled from 1k to 1M rows, records
+timings and peak memory to a JSON Lines history, and compares each run
+against a stored baseline
+
+Synthetic series are generated from a fixed seed (hourly bars, since 1M
+daily bars do not fit in pandas' timestamp range) and cached under
+cache/bench, so runs are reproducible and need no network access.
+Prophet benchmarks and the statistics plot are capped at 100k rows by
+default; pass --max-rows to override.
+
+Usage:
+    python benchmark.py                      # run, append to history, compare to baseline
+    python benchmark.py --save-baseline      # ... and store this run as the new baseline
+    python benchmark.py --sizes 1000 10000 --only load_data plot_historical_price
+    python benchmark.py --threshold 0.1      # flag >10% slowdowns
+    python benchmark.py --sizes 10000 --only train_prophet_model train_regressors \
+        generate_forecast forecast_regressors  # extra-regressor fit/predict overhead
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import matplotlib
+
+# Use Agg backend; benchmarks render plots without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from data_loader import PriceDataset, load_data, preprocess_data, get_train_test_split
+
+
+PROJECT_ROOT = Path(__file__).parent
+BENCH_DIR = PROJECT_ROOT / 'benchmarks'
+HISTORY_FILE = BENCH_DIR / 'history.jsonl'
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+SYNTHETIC_DIR = PROJECT_ROOT / 'cache' / 'bench'
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_THRESHOLD = 0.2
+SEED = 20240523
+
+# Per-case time budget: stop repeating once this many seconds have been spent
+CASE_BUDGET_SECONDS = 30.0
+
+# Differences below this are treated as noise when comparing timings
+MIN_DELTA_SECONDS = 0.005
+
+
+def synthetic_csv(rows, seed=SEED, cache_dir=SYNTHETIC_DIR):
+    """
+    Write (or reuse) a synthetic hourly OHLCV CSV in the bundled file's layout.
+
+    Close follows a geometric random walk; the file is newest-first like the
+    CoinGecko export so load_data's sort is exercised.
+
+    Args:
+        rows (int): Number of bars
+        seed (int): Random seed
+        cache_dir (Path): Directory for generated files
+
+    Returns:
+        Path: CSV path
+    """
+    path = Path(cache_dir) / f'synthetic_{rows}_{seed}.csv'
+    if path.exists():
+        return path
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2000-01-01')
+    starts = pd.date_range(start, periods=rows, freq='h')
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.005, rows)) * close
+    volume = rng.lognormal(20, 1, rows)
+    frame = pd.DataFrame({
+        'Start': starts.strftime('%Y-%m-%d %H:%M:%S'),
+        'End': (starts + pd.Timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': volume,
+        'Market Cap': volume * 50,
+    }).iloc[::-1]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    frame.to_csv(tmp, index=False, float_format='%.6f')
+    os.replace(tmp, path)
+    return path
+
+
+class Case:
+    """
+    Lazily prepared inputs for one dataset, shared by its benchmarks so
+    setup (parsing, fitting) is never part of a timed run.
+    """
+
+    def __init__(self, name, csv_path):
+        self.name = name
+        self.csv_path = csv_path
+        self._frame = None
+        self._split = None
+        self._dataset_split = None
+        self.model = None
+        self.regressor_model = None
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            self._frame = load_data(str(self.csv_path))
+        return self._frame
+
+    @property
+    def split(self):
+        if self._split is None:
+            self._split = get_train_test_split(preprocess_data(self.frame), test_days=90)
+        return self._split
+
+    @property
+    def dataset_split(self):
+        """Train/test PriceDatasets, which keep the regressor columns."""
+        if self._dataset_split is None:
+            dataset = preprocess_data(PriceDataset.from_frame(self.frame))
+            self._dataset_split = get_train_test_split(dataset, test_days=90)
+        return self._dataset_split
+
+    def fitted_model(self):
+        if self.model is None:
+            from prophet_model import train_prophet_model
+            self.model = train_prophet_model(self.split[0])
+        return self.model
+
+    def fitted_regressor_model(self):
+        if self.regressor_model is None:
+            self.regressor_model = _fit_regressor_model(self.dataset_split[0])
+        return self.regressor_model
+
+
+def _save_plot(plot, frame):
+    with tempfile.TemporaryDirectory() as plot_dir:
+        fig = plot(frame, save_path=str(Path(plot_dir) / 'plot.png'))
+        plt.close(fig)
+
+
+def _bench_load_data(case):
+    return lambda: load_data(str(case.csv_path))
+
+
+def _bench_preprocess_data(case):
+    frame = case.frame
+    return lambda: preprocess_data(frame)
+
+
+def _bench_train_prophet_model(case):
+    from prophet_model import train_prophet_model
+    train_df = case.split[0]
+
+    def run():
+        case.model = train_prophet_model(train_df)
+    return run
+
+
+def _bench_generate_forecast(case):
+    from prophet_model import generate_forecast
+    model = case.fitted_model()
+    return lambda: generate_forecast(model, periods=90)
+
+
+def _fit_regressor_model(train_df):
+    """Fit in-process, like train_prophet_model(), including the design matrix."""
+    import regressors
+    regressors._design_cache.clear()
+    return regressors.fit_regressor_model(train_df, settings={'isolated': False})
+
+
+def _bench_train_regressors(case):
+    train_df = case.dataset_split[0]
+
+    def run():
+        case.regressor_model = _fit_regressor_model(train_df)
+    return run
+
+
+def _bench_forecast_regressors(case):
+    from prophet_model import generate_forecast
+    model = case.fitted_regressor_model()
+    return lambda: generate_forecast(model, periods=90)
+
+
+def _bench_evaluate_model(case):
+    from model_evaluation import evaluate_model
+    model, test_df = case.fitted_model(), case.split[1]
+    return lambda: evaluate_model(model, test_df)
+
+
+def _bench_plot(plot_name):
+    def setup(case):
+        import eda
+        plot, frame = getattr(eda, plot_name), case.frame
+        return lambda: _save_plot(plot, frame)
+    return setup
+
+
+# name -> (setup returning a zero-argument callable, default maximum rows).
+# plot_price_statistics draws one volume bar per row, so it is capped too.
+BENCHMARKS = {
+    'load_data': (_bench_load_data, None),
+    'preprocess_data': (_bench_preprocess_data, None),
+    'train_prophet_model': (_bench_train_prophet_model, 100_000),
+    'generate_forecast': (_bench_generate_forecast, 100_000),
+    'evaluate_model': (_bench_evaluate_model, 100_000),
+    # Extra-regressor overhead: compare with train_prophet_model / generate_forecast
+    'train_regressors': (_bench_train_regressors, 100_000),
+    'forecast_regressors': (_bench_forecast_regressors, 100_000),
+    'plot_historical_price': (_bench_plot('plot_historical_price'), None),
+    'plot_price_statistics': (_bench_plot('plot_price_statistics'), 100_000),
+}
+
+
+def measure(func, repeat=3, memory=True, budget=CASE_BUDGET_SECONDS):
+    """
+    Time a callable and optionally measure its peak traced memory.
+
+    Timed runs are done without tracemalloc (it slows allocation-heavy
+    code); peak memory comes from one extra traced run.
+
+    Args:
+        func (callable): Zero-argument function to benchmark
+        repeat (int): Maximum number of timed runs
+        memory (bool): Whether to do the traced run
+        budget (float): Stop repeating once this many seconds were spent
+
+    Returns:
+        dict: 'runs', 'min_s', 'median_s' and 'peak_bytes' (None without memory)
+    """
+    timings = []
+    spent = 0.0
+    while len(timings) < repeat and (not timings or spent < budget):
+        np.random.seed(SEED)
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        spent += timings[-1]
+
+    peak_bytes = None
+    if memory:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        np.random.seed(SEED)
+        func()
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        if not was_tracing:
+            tracemalloc.stop()
+
+    return {'runs': len(timings), 'min_s': min(timings),
+            'median_s': statistics.median(timings), 'peak_bytes': peak_bytes}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    versions = {'numpy': np.__version__, 'pandas': pd.__version__,
+                'matplotlib': matplotlib.__version__}
+    try:
+        import prophet
+        versions['prophet'] = prophet.__version__
+    except ImportError:
+        pass
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, repeat=3, memory=True,
+                   max_rows=None, include_bundled=True):
+    """
+    Run the benchmark matrix.
+
+    Args:
+        sizes (tuple): Synthetic series lengths
+        names (list): Benchmarks to run (default: all of BENCHMARKS)
+        repeat (int): Maximum timed runs per case
+        memory (bool): Whether to measure peak memory
+        max_rows (int): Override every benchmark's default row cap
+        include_bundled (bool): Whether to include the bundled BTC CSV
+
+    Returns:
+        dict: Run record with 'timestamp', 'commit', 'environment' and 'results'
+    """
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}. "
+                         f"Choose from: {', '.join(BENCHMARKS)}")
+
+    cases = []
+    if include_bundled:
+        bundled = sorted(PROJECT_ROOT.glob('*.csv'))
+        if bundled:
+            cases.append(Case('btc', bundled[0]))
+    for rows in sizes:
+        cases.append(Case(f'synthetic_{rows}', synthetic_csv(rows)))
+
+    # Prophet's and cmdstanpy's INFO logs would drown the table
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+    results = []
+    for case in cases:
+        rows = len(case.frame)
+        for name in names:
+            setup, cap = BENCHMARKS[name]
+            cap = max_rows if max_rows is not None else cap
+            if cap is not None and rows > cap:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                func = setup(case)
+                stats = measure(func, repeat=repeat, memory=memory)
+            result = dict(benchmark=name, dataset=case.name, rows=rows, **stats)
+            results.append(result)
+            print(f"  {name:<24}{case.name:<22}{stats['min_s'] * 1e3:>11.1f} ms", flush=True)
+
+    return {
+        'timestamp': time.time(),
+        'commit': _git_commit(),
+        'environment': _environment(),
+        'results': results,
+    }
+
+
+def compare(run, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare a run against a baseline run.
+
+    A case regresses when its best time (or peak memory) exceeds the
+    baseline's by more than `threshold` (a fraction) and by more than
+    MIN_DELTA_SECONDS for timings.
+
+    Args:
+        run (dict): Output of run_benchmarks()
+        baseline (dict): Stored baseline run
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: One dict per case present in both, with 'time_ratio',
+        'memory_ratio' and 'regressed'
+    """
+    base = {(r['benchmark'], r['dataset']): r for r in baseline['results']}
+    rows = []
+    for result in run['results']:
+        previous = base.get((result['benchmark'], result['dataset']))
+        if previous is None:
+            continue
+        time_ratio = result['min_s'] / previous['min_s'] if previous['min_s'] else float('inf')
+        slower = (time_ratio > 1 + threshold
+                  and result['min_s'] - previous['min_s'] > MIN_DELTA_SECONDS)
+        memory_ratio = None
+        heavier = False
+        if result['peak_bytes'] and previous.get('peak_bytes'):
+            memory_ratio = result['peak_bytes'] / previous['peak_bytes']
+            heavier = memory_ratio > 1 + threshold
+        rows.append({'benchmark': result['benchmark'], 'dataset': result['dataset'],
+                     'time_ratio': time_ratio, 'memory_ratio': memory_ratio,
+                     'regressed': slower or heavier})
+    return rows
+
+
+def print_results(run, comparison=None):
+    """
+    Print a run (and its baseline comparison) as a table.
+
+    Args:
+        run (dict): Output of run_benchmarks()
+        comparison (list): Output of compare(), if a baseline exists
+    """
+    ratios = {(c['benchmark'], c['dataset']): c for c in comparison or []}
+    print("=" * 100)
+    print(f"{'Benchmark':<24}{'Dataset':<22}{'Rows':>10}{'Min (ms)':>12}{'Median (ms)':>13}"
+          f"{'Peak (MB)':>11}{'vs base':>8}")
+    print("-" * 100)
+    for r in run['results']:
+        peak = f"{r['peak_bytes'] / 2**20:.1f}" if r['peak_bytes'] is not None else '-'
+        c = ratios.get((r['benchmark'], r['dataset']))
+        versus = f"{c['time_ratio']:.2f}x" if c else '-'
+        flag = ' !' if c and c['regressed'] else ''
+        print(f"{r['benchmark']:<24}{r['dataset']:<22}{r['rows']:>10}{r['min_s'] * 1e3:>12.1f}"
+              f"{r['median_s'] * 1e3:>13.1f}{peak:>11}{versus:>8}{flag}")
+    print("=" * 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the forecasting hot paths")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(DEFAULT_SIZES),
+                        help="Synthetic series lengths (default: 1k 10k 100k 1M)")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), metavar='BENCHMARK',
+                        help=f"Benchmarks to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (default: 3)")
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help="Row cap for every benchmark (default: 100k for Prophet and the "
+                             "statistics plot, none otherwise)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip peak memory measurement")
+    parser.add_argument('--no-bundled', action='store_true', help="Skip the bundled BTC CSV")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown counted as a regression (default: 0.2)")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE))
+    parser.add_argument('--history', default=str(HISTORY_FILE))
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    print("Running benchmarks...")
+    run = run_benchmarks(args.sizes, args.only, args.repeat, not args.no_memory,
+                         args.max_rows, not args.no_bundled)
+
+    history = Path(args.history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+    comparison = None
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            comparison = compare(run, json.load(f), args.threshold)
+
+    print()
+    print_results(run, comparison)
+    print(f"Appended to {history}")
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    regressions = [c for c in comparison or [] if c['regressed']]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for c in regressions:
+            memory = f", memory {c['memory_ratio']:.2f}x" if c['memory_ratio'] else ''
+            print(f"  {c['benchmark']} on {c['dataset']}: time {c['time_ratio']:.2f}x{memory}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Compact Model Serialization Module
+Saves a fitted Prophet model as an .npz file holding only its fitted
+parameters plus a versioned JSON header, and forecasts from that file with
+NumPy/pandas alone (no prophet, cmdstanpy or Stan import)
+
+Only what the MAP fit in this project uses is supported: linear or flat
+growth, Fourier seasonalities and extra regressors.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+
+SCHEMA_VERSION = 1
+
+
+def read_meta(filepath):
+    """
+    Read the JSON header of a compact model file.
+
+    Args:
+        filepath (str): Path to a compact .npz model
+
+    Returns:
+        dict: Header with at least 'schema_version' and 'model'
+    """
+    with np.load(filepath) as archive:
+        return json.loads(str(archive['meta']))
+
+
+def plot_history_forecast(history_dates, history_y, forecast):
+    """
+    Plot observed history points and the forecast band, like Prophet.plot.
+
+    Args:
+        history_dates (array-like): Training dates
+        history_y (array-like): Observed prices
+        forecast (pd.DataFrame): Forecast with 'ds', 'yhat', 'yhat_lower' and 'yhat_upper'
+
+    Returns:
+        matplotlib.figure.Figure: Matplotlib figure object
+    """
+    # Imported here so serving processes that never plot skip matplotlib
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(history_dates, history_y, 'k.', markersize=2)
+    ax.plot(forecast['ds'], forecast['yhat'], color='#0072B2')
+    ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'],
+                    color='#0072B2', alpha=0.2)
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+def export_prophet(model, filepath):
+    """
+    Write a fitted Prophet model to the compact format.
+
+    Args:
+        model (Prophet): Fitted Prophet model (MAP fit)
+        filepath (str): Destination path (conventionally ending in .npz)
+    """
+    if model.growth not in ('linear', 'flat'):
+        raise ValueError(f"Compact format does not support '{model.growth}' growth")
+    if model.mcmc_samples:
+        raise ValueError("Compact format only supports MAP-fitted models")
+    if model.holidays is not None or model.country_holidays is not None:
+        raise ValueError("Compact format does not support holidays")
+    if any(props['condition_name'] for props in model.seasonalities.values()):
+        raise ValueError("Compact format does not support conditional seasonalities")
+
+    seasonalities = [
+        {'name': name, 'period': props['period'], 'fourier_order': props['fourier_order'],
+         'mode': props['mode']}
+        for name, props in model.seasonalities.items()
+    ]
+    regressors = [
+        {'name': name, 'mu': props['mu'], 'std': props['std'], 'mode': props['mode']}
+        for name, props in model.extra_regressors.items()
+    ]
+
+    # Column layout and additive/multiplicative masks exactly as Prophet builds them
+    features, _, component_cols, _ = model.make_all_seasonality_features(model.history.iloc[:1])
+    expected = _feature_names(seasonalities, regressors)
+    if list(features.columns) != expected:
+        raise ValueError(f"Unexpected Prophet feature layout: {list(features.columns)}")
+
+    meta = {
+        'schema_version': SCHEMA_VERSION,
+        'model': 'prophet',
+        'growth': model.growth,
+        'start': model.start.isoformat(),
+        't_scale_seconds': model.t_scale.total_seconds(),
+        'y_scale': float(model.y_scale),
+        'floor': float(model.y_min) if model.scaling == 'minmax' else 0.0,
+        'interval_width': model.interval_width,
+        'uncertainty_samples': int(model.uncertainty_samples or 0),
+        'seasonalities': seasonalities,
+        'regressors': regressors,
+    }
+    arrays = {
+        'meta': np.array(json.dumps(meta)),
+        'k': np.asarray(model.params['k']).ravel()[:1],
+        'm': np.asarray(model.params['m']).ravel()[:1],
+        'delta': np.asarray(model.params['delta'])[0],
+        'beta': np.asarray(model.params['beta'])[0],
+        'sigma_obs': np.asarray(model.params['sigma_obs']).ravel()[:1],
+        'changepoints_t': np.asarray(model.changepoints_t, dtype=np.float64),
+        'additive_mask': component_cols['additive_terms'].to_numpy(dtype=np.float64),
+        'multiplicative_mask': component_cols['multiplicative_terms'].to_numpy(dtype=np.float64),
+        'history_dates': model.history['ds'].to_numpy(dtype='datetime64[s]'),
+        'history_y': model.history['y'].to_numpy(dtype=np.float64),
+    }
+    with open(filepath, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _feature_names(seasonalities, regressors):
+    names = [
+        f"{s['name']}_delim_{i + 1}"
+        for s in seasonalities for i in range(2 * s['fourier_order'])
+    ]
+    return names + [r['name'] for r in regressors]
+
+
+class CompactProphet:
+    """
+    Forecast-only Prophet model loaded from the compact format.
+
+    Implements the subset of the Prophet API used by this project
+    (make_future_dataframe, predict, history_dates, extra_regressors, plot),
+    so it can be passed to generate_forecast(), evaluate_model() and
+    plot_forecast().
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.growth = meta['growth']
+        self.start = np.datetime64(pd.Timestamp(meta['start']).to_datetime64(), 'ns')
+        self.t_scale_ns = meta['t_scale_seconds'] * 1e9
+        self.y_scale = meta['y_scale']
+        self.floor = meta['floor']
+        self.interval_width = meta['interval_width']
+        self.uncertainty_samples = meta['uncertainty_samples']
+        self.seasonalities = meta['seasonalities']
+        self.extra_regressors = {r['name']: r for r in meta['regressors']}
+        self.history_dates = pd.Series(pd.to_datetime(arrays['history_dates']))
+        self.rng = np.random.default_rng()
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load a model written by export_prophet().
+
+        Args:
+            filepath (str): Path to the compact .npz model
+
+        Returns:
+            CompactProphet: Loaded model
+        """
+        with np.load(filepath) as archive:
+            return cls.from_arrays({key: archive[key] for key in archive.files})
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Build a model from the arrays of a compact file, e.g. zero-copy views
+        attached from shared memory.
+
+        Args:
+            arrays (dict): Array name -> array, including the 'meta' header
+
+        Returns:
+            CompactProphet: Model using the given arrays without copying them
+        """
+        meta = json.loads(str(arrays['meta']))
+        if meta.get('model') != 'prophet':
+            raise ValueError("Arrays do not contain a Prophet model")
+        if meta['schema_version'] > SCHEMA_VERSION:
+            raise ValueError(f"Unsupported model schema version {meta['schema_version']}")
+        return cls(meta, {key: values for key, values in arrays.items() if key != 'meta'})
+
+    def save(self, filepath):
+        """
+        Write the model back to the compact format.
+
+        Args:
+            filepath (str): Destination path
+        """
+        with open(filepath, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(self.meta)), **self.arrays)
+
+    def make_future_dataframe(self, periods, freq='D', include_history=True):
+        """
+        Same contract as Prophet.make_future_dataframe.
+
+        Args:
+            periods (int): Number of periods to forecast
+            freq (str): pandas frequency of the future dates
+            include_history (bool): Whether to include the training dates
+
+        Returns:
+            pd.DataFrame: Dataframe with a 'ds' column
+        """
+        last = self.history_dates.iloc[-1]
+        dates = pd.date_range(start=last, periods=periods + 1, freq=freq)
+        dates = dates[dates > last][:periods]
+        if include_history:
+            dates = np.concatenate((self.history_dates.to_numpy(), dates.to_numpy()))
+        return pd.DataFrame({'ds': dates})
+
+    def _scaled_time(self, ds):
+        return (ds.astype('datetime64[ns]') - self.start).astype(np.float64) / self.t_scale_ns
+
+    def _features(self, ds, future):
+        days = ds.astype('datetime64[ns]').astype(np.int64) / 1e9 / (24 * 60 * 60)
+        columns = []
+        for s in self.seasonalities:
+            x = 2 * np.pi * days
+            for i in range(s['fourier_order']):
+                c = (i + 1) / s['period'] * x
+                columns.append(np.sin(c))
+                columns.append(np.cos(c))
+        for name, r in self.extra_regressors.items():
+            columns.append((future[name].to_numpy(dtype=np.float64) - r['mu']) / r['std'])
+        return np.column_stack(columns) if columns else np.zeros((len(ds), 0))
+
+    def _trend(self, t):
+        k, m = self.arrays['k'][0], self.arrays['m'][0]
+        if self.growth == 'flat':
+            return np.full(len(t), m)
+        changepoints = self.arrays['changepoints_t']
+        deltas_t = (changepoints[None, :] <= t[:, None]) * self.arrays['delta']
+        return (deltas_t.sum(axis=1) + k) * t + (deltas_t * -changepoints).sum(axis=1) + m
+
+    def _trend_uncertainty(self, t, n_samples):
+        """Vectorized trend-shift simulation, matching Prophet's linear growth."""
+        uncertainty = np.zeros((n_samples, len(t)))
+        future = t > 1
+        n_future = int(future.sum())
+        if self.growth == 'flat' or n_future == 0:
+            return uncertainty
+
+        if n_future > 1:
+            single_diff = np.diff(t[future]).mean()
+        else:
+            single_diff = np.diff(self._scaled_time(self.history_dates.to_numpy())).mean()
+        likelihood = len(self.arrays['changepoints_t']) * single_diff
+        mean_delta = np.mean(np.abs(self.arrays['delta'])) + 1e-8
+
+        changes = self.rng.uniform(size=(n_samples, n_future)) < likelihood
+        shifts = self.rng.laplace(0, mean_delta, size=changes.shape) * changes
+        shifts = (np.hstack([np.zeros((n_samples, 1)), shifts])[:, :-1] + shifts) / 2
+        uncertainty[:, future] = shifts.cumsum(axis=1).cumsum(axis=1) * single_diff
+        return uncertainty
+
+    def predict(self, future):
+        """
+        Predict for the dates (and regressor values) in a future dataframe.
+
+        Args:
+            future (pd.DataFrame): Dataframe with 'ds' and any regressor columns
+
+        Returns:
+            pd.DataFrame: Prophet-style forecast with 'ds', 'trend', seasonal
+            components, 'additive_terms', 'multiplicative_terms', 'yhat',
+            'yhat_lower' and 'yhat_upper'
+        """
+        for name in self.extra_regressors:
+            if name not in future:
+                raise ValueError(f"Regressor {name!r} missing from dataframe")
+        future = future.sort_values('ds', kind='mergesort').reset_index(drop=True)
+        ds = pd.to_datetime(future['ds']).to_numpy()
+        t = self._scaled_time(ds)
+
+        X = self._features(ds, future)
+        beta = self.arrays['beta']
+        additive = X @ (beta * self.arrays['additive_mask']) * self.y_scale
+        multiplicative = X @ (beta * self.arrays['multiplicative_mask'])
+        trend = self._trend(t) * self.y_scale + self.floor
+
+        result = {'ds': ds, 'trend': trend}
+        offset = 0
+        for s in self.seasonalities:
+            width = 2 * s['fourier_order']
+            component = X[:, offset:offset + width] @ beta[offset:offset + width]
+            result[s['name']] = component * self.y_scale if s['mode'] == 'additive' else component
+            offset += width
+        result['additive_terms'] = additive
+        result['multiplicative_terms'] = multiplicative
+
+        if self.uncertainty_samples:
+            # Simulated paths are laid out (dates, samples) so one percentile
+            # call reduces each row; no NaNs can occur, so np.percentile is safe.
+            n = self.uncertainty_samples
+            trends = trend[:, None] + self._trend_uncertainty(t, n).T * self.y_scale
+            noise = self.rng.normal(0, self.arrays['sigma_obs'][0], trends.shape) * self.y_scale
+            sims = trends * (1 + multiplicative[:, None]) + additive[:, None] + noise
+            percentiles = [100 * (1.0 - self.interval_width) / 2,
+                           100 * (1.0 + self.interval_width) / 2]
+            result['yhat_lower'], result['yhat_upper'] = np.percentile(sims, percentiles, axis=1)
+            result['trend_lower'], result['trend_upper'] = np.percentile(trends, percentiles, axis=1)
+
+        forecast = pd.DataFrame(result)
+        forecast['yhat'] = trend * (1 + multiplicative) + additive
+        return forecast
+
+    def plot(self, forecast):
+        """
+        Plot history and forecast band, like Prophet.plot.
+
+        Args:
+            forecast (pd.DataFrame): Output of predict()
+
+        Returns:
+            matplotlib.figure.Figure: Matplotlib figure object
+        """
+        return plot_history_forecast(self.history_dates, self.arrays['history_y'], forecast)
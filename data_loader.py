@@ -3,11 +3,185 @@ Data Loading and Preprocessing Module
 Handles loading, cleaning, and preparing Bitcoin data for analysis
 """
 
+import hashlib
+import os
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from instrumentation import instrument
+
+
+# Column dtypes for the compact in-memory representation. Prices stay float64
+# so Close is bit-identical to the CSV; volume-style columns only need ~7
+# significant digits and are halved to float32.
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+COLUMN_DTYPES = {
+    'Open': np.float64,
+    'High': np.float64,
+    'Low': np.float64,
+    'Close': np.float64,
+    'Volume': np.float32,
+    'Market Cap': np.float32,
+}
+
+# Bar size of intraday exports to resample on load (pandas offset alias, e.g.
+# '1D'); unset means the CSVs already hold one row per bar
+DEFAULT_BAR = os.environ.get('FORECAST_BAR') or None
+
+
+class PriceDataset:
+    """
+    Compact, array-backed daily OHLCV history.
+
+    Holds one datetime64 array of bar timestamps (days for the bundled daily
+    CSV) plus one NumPy array per numeric column. Slicing returns views onto
+    the same buffers, so train/test splits and tail windows cost no extra
+    memory.
+    """
+
+    __slots__ = ('dates', 'columns', 'target')
+
+    def __init__(self, dates, columns, target='Close'):
+        dates = np.asarray(dates)
+        if dates.dtype.kind != 'M':
+            dates = dates.astype('datetime64[D]')
+        self.dates = dates
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.target = target
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build a dataset from a dataframe returned by load_data().
+
+        Args:
+            df (pd.DataFrame): Dataframe with a 'Date' column and numeric columns
+
+        Returns:
+            PriceDataset: Compact dataset (non-numeric columns such as 'End' are dropped)
+        """
+        dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+        # Day resolution for daily bars; intraday bars keep their times
+        if (dates.view(np.int64) % (86_400 * 10**9) == 0).all():
+            dates = dates.astype('datetime64[D]')
+        else:
+            dates = dates.astype('datetime64[s]')
+        columns = {
+            name: df[name].to_numpy(dtype=dtype)
+            for name, dtype in COLUMN_DTYPES.items()
+            if name in df.columns
+        }
+        return cls(dates, columns)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, name):
+        if name == 'Date':
+            return self.dates
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name == 'Date' or name in self.columns
+
+    @property
+    def y(self):
+        """np.ndarray: Target (Close) price array."""
+        return self.columns[self.target]
+
+    @property
+    def nbytes(self):
+        """int: Bytes held by the date and column buffers."""
+        return self.dates.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    def fingerprint(self):
+        """
+        Content hash of the dates and columns, used as the data version key
+        for derived caches (features, forecasts, ...).
+
+        Returns:
+            str: 32-character hex digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.dates.dtype.str.encode())
+        digest.update(np.ascontiguousarray(self.dates).tobytes())
+        for name in sorted(self.columns):
+            values = np.ascontiguousarray(self.columns[name])
+            digest.update(name.encode())
+            digest.update(values.dtype.str.encode())
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    def slice(self, start=None, stop=None):
+        """
+        Return a zero-copy view over rows [start, stop).
+
+        Args:
+            start (int): First row (inclusive)
+            stop (int): Last row (exclusive)
+
+        Returns:
+            PriceDataset: Dataset whose arrays share memory with this one
+        """
+        window = slice(start, stop)
+        columns = {name: values[window] for name, values in self.columns.items()}
+        return PriceDataset(self.dates[window], columns, target=self.target)
+
+    def to_frame(self):
+        """
+        Materialise the dataset as a load_data()-style dataframe.
+
+        Returns:
+            pd.DataFrame: Dataframe with 'Date' plus all numeric columns
+        """
+        data = {'Date': pd.to_datetime(self.dates)}
+        data.update(self.columns)
+        return pd.DataFrame(data)
+
+    def to_prophet_frame(self):
+        """
+        Materialise the 'ds'/'y' frame Prophet needs for fit/evaluation.
+
+        Returns:
+            pd.DataFrame: Dataframe with 'ds' (date) and 'y' (target price) columns
+        """
+        return pd.DataFrame({'ds': pd.to_datetime(self.dates), 'y': self.y})
 
+    def save(self, filepath):
+        """
+        Write the dataset to an uncompressed .npz columnar cache.
+
+        Args:
+            filepath (str): Destination path (conventionally ending in .npz)
+        """
+        arrays = {'__dates__': self.dates}
+        arrays.update({f'col:{name}': values for name, values in self.columns.items()})
+        with open(filepath, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Read a dataset written by save().
+
+        Args:
+            filepath (str): Path to the .npz cache
+
+        Returns:
+            PriceDataset: Loaded dataset
+        """
+        with np.load(filepath) as archive:
+            dates = archive['__dates__']
+            columns = {
+                key[len('col:'):]: archive[key]
+                for key in archive.files if key.startswith('col:')
+            }
+        return cls(dates, columns)
+
+
+@instrument()
 def load_data(filepath):
     """
     Load Bitcoin OHLCV data from CSV file.
@@ -34,34 +208,261 @@ def load_data(filepath):
     return df
 
 
+def dataset_cache_path(csv_path, cache_dir, bar=DEFAULT_BAR):
+    """
+    Columnar cache path of a CSV: '<stem>.npz', or '<stem>_<bar>.npz' for an
+    intraday export resampled to `bar` (the file ingest.py writes).
+
+    Args:
+        csv_path (str): Path to the CSV file
+        cache_dir (str): Cache directory
+        bar (str): Bar size the export is resampled to, or None
+
+    Returns:
+        Path: Cache file path
+    """
+    stem = Path(csv_path).stem
+    return Path(cache_dir) / (f'{stem}_{bar}.npz' if bar else f'{stem}.npz')
+
+
+@instrument()
+def load_dataset(filepath, cache_path=None, bar=DEFAULT_BAR):
+    """
+    Load the CSV into a compact PriceDataset, using a columnar cache if given.
+
+    The cache is rebuilt whenever it is missing or older than the CSV. With
+    `bar` set the CSV is an intraday export, resampled to that bar size by
+    ingest.resample_csv() (run `python ingest.py` beforehand to build the
+    cache in parallel or with a non-default timestamp layout).
+
+    Args:
+        filepath (str): Path to the CSV file
+        cache_path (str): Optional path of the .npz columnar cache
+        bar (str): Bar size to resample an intraday export to, or None
+
+    Returns:
+        PriceDataset: Compact dataset sorted by date
+    """
+    if cache_path is not None:
+        cache_path = Path(cache_path)
+        if cache_path.exists() and cache_path.stat().st_mtime >= Path(filepath).stat().st_mtime:
+            return PriceDataset.load(cache_path)
+
+    if bar:
+        from ingest import resample_csv
+        dataset, _ = resample_csv(filepath, bar=bar)
+    else:
+        dataset = PriceDataset.from_frame(load_data(filepath))
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        dataset.save(cache_path)
+
+    return dataset
+
+
+# Offending timestamps listed per problem in a quality report
+QUALITY_EXAMPLES = 5
+
+
+def _bar_unit(dates):
+    """Unit of a datetime64 array, e.g. 'D' for daily bars."""
+    return np.datetime_data(dates.dtype)[0]
+
+
+@instrument()
+def check_quality(dataset, step=None):
+    """
+    Detect data-quality problems in one vectorized pass over the arrays.
+
+    Checks for unsorted or duplicate timestamps, gaps in the bar calendar,
+    missing values, non-positive prices and bars whose High is below their Low.
+
+    Args:
+        dataset (PriceDataset): Price history
+        step (np.timedelta64): Expected bar spacing (default: the median spacing)
+
+    Returns:
+        dict: rows, start, end, step (in bar units), unsorted, duplicates, gaps,
+        missing_bars, missing and non_positive (column -> count), high_below_low,
+        examples (first offending timestamps per problem) and ok
+    """
+    dates = dataset.dates
+    unit = _bar_unit(dates)
+    descending = np.diff(dates.view(np.int64)) < 0
+    # Duplicates and gaps are counted on the sorted timestamps
+    ordered = np.sort(dates, kind='stable') if descending.any() else dates
+    diffs = np.diff(ordered.view(np.int64))
+    if step is None:
+        positive = diffs[diffs > 0]
+        step = int(np.median(positive)) if len(positive) else 1
+    else:
+        step = int(np.timedelta64(step).astype(f'timedelta64[{unit}]').astype(np.int64))
+
+    names = list(dataset.columns)
+    matrix = (np.vstack([dataset.columns[name] for name in names]).astype(np.float64, copy=False)
+              if names else np.empty((0, len(dates))))
+    prices = [i for i, name in enumerate(names) if name in PRICE_COLUMNS]
+    missing = np.isnan(matrix)
+    non_positive = matrix[prices] <= 0
+    if 'High' in dataset.columns and 'Low' in dataset.columns:
+        inverted = dataset.columns['High'] < dataset.columns['Low']
+    else:
+        inverted = np.zeros(len(dates), dtype=bool)
+
+    duplicate = diffs == 0
+    gap = diffs > step
+    # diffs[i] spans sorted bars i -> i + 1
+    gap_starts = np.flatnonzero(gap)
+
+    def stamps(mask, source=dates):
+        return [str(date) for date in source[mask][:QUALITY_EXAMPLES]]
+
+    report = {
+        'rows': len(dates),
+        'start': str(ordered[0]) if len(dates) else None,
+        'end': str(ordered[-1]) if len(dates) else None,
+        'step': step,
+        'unsorted': int(descending.sum()),
+        'duplicates': int(duplicate.sum()),
+        'gaps': len(gap_starts),
+        'missing_bars': int((diffs[gap] // step - 1).sum()),
+        'missing': {name: int(count) for name, count in zip(names, missing.sum(axis=1)) if count},
+        'non_positive': {names[i]: int(count)
+                         for i, count in zip(prices, non_positive.sum(axis=1)) if count},
+        'high_below_low': int(inverted.sum()),
+        'examples': {
+            # duplicate[i] marks sorted bar i + 1 (no bars: no marks)
+            'duplicates': stamps(np.r_[np.zeros(min(1, len(dates)), bool), duplicate], ordered),
+            'gaps': [[str(ordered[i]), str(ordered[i + 1])]
+                     for i in gap_starts[:QUALITY_EXAMPLES]],
+            'non_positive': stamps(non_positive.any(axis=0)),
+            'high_below_low': stamps(inverted),
+        },
+    }
+    report['ok'] = not (report['unsorted'] or report['duplicates'] or report['gaps']
+                        or report['missing'] or report['non_positive']
+                        or report['high_below_low'])
+    return report
+
+
+@instrument()
+def repair_dataset(dataset, report=None):
+    """
+    Fix the problems found by check_quality() without per-row loops.
+
+    Rows are sorted, duplicate timestamps keep their last row, inverted High/Low
+    pairs are swapped and non-positive prices dropped; the result is then
+    reindexed onto the full bar calendar and every missing value is linearly
+    interpolated (held constant before the first and after the last value).
+
+    Args:
+        dataset (PriceDataset): Price history
+        report (dict): Its check_quality() report (computed if not given)
+
+    Returns:
+        PriceDataset: Repaired dataset (the input itself when nothing needed fixing)
+    """
+    report = report or check_quality(dataset)
+    if report['ok'] or not len(dataset):
+        return dataset
+
+    dates = dataset.dates
+    columns = {name: values.astype(np.float64) for name, values in dataset.columns.items()}
+    if report['unsorted']:
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+        columns = {name: values[order] for name, values in columns.items()}
+    if report['duplicates']:
+        last = np.append(dates[1:] != dates[:-1], True)
+        dates = dates[last]
+        columns = {name: values[last] for name, values in columns.items()}
+
+    if report['high_below_low']:
+        high, low = columns['High'], columns['Low']
+        inverted = high < low
+        high[inverted], low[inverted] = low[inverted], high[inverted]
+    for name in PRICE_COLUMNS:
+        if name in columns:
+            columns[name][columns[name] <= 0] = np.nan
+
+    # Reindex onto the calendar when every timestamp lies on it
+    step = np.timedelta64(report['step'], _bar_unit(dates))
+    calendar = np.arange(dates[0], dates[-1] + step, step)
+    positions = np.searchsorted(calendar, dates)
+    if not np.array_equal(calendar[np.minimum(positions, len(calendar) - 1)], dates):
+        calendar, positions = dates, np.arange(len(dates))
+
+    index = np.arange(len(calendar))
+    repaired = {}
+    for name, values in columns.items():
+        full = np.full(len(calendar), np.nan)
+        full[positions] = values
+        valid = ~np.isnan(full)
+        if valid.any() and not valid.all():
+            full = np.interp(index, index[valid], full[valid])
+        repaired[name] = full.astype(dataset.columns[name].dtype, copy=False)
+    return PriceDataset(calendar, repaired, target=dataset.target)
+
+
+def _print_quality(report):
+    """Print a one-line summary of a check_quality() report."""
+    if report['ok']:
+        print(f"Data quality: OK ({report['rows']} rows)")
+        return
+    problems = []
+    for key, label in (('unsorted', 'out-of-order rows'), ('duplicates', 'duplicate dates'),
+                       ('high_below_low', 'bars with High < Low')):
+        if report[key]:
+            problems.append(f"{report[key]} {label}")
+    if report['gaps']:
+        problems.append(f"{report['gaps']} gaps ({report['missing_bars']} missing bars)")
+    for key, label in (('missing', 'missing'), ('non_positive', 'non-positive')):
+        if report[key]:
+            counts = ', '.join(f"{name} {count}" for name, count in report[key].items())
+            problems.append(f"{label} values ({counts})")
+    print(f"Data quality: repaired {'; '.join(problems)}")
+
+
+@instrument()
 def preprocess_data(df):
     """
-    Preprocess the dataframe for Prophet model.
-    Handles missing values and formats data in Prophet format (ds, y).
-    
+    Preprocess the data for the Prophet model.
+    Validates it with check_quality(), repairs any problems with
+    repair_dataset() and returns it in Prophet format (ds, y).
+
     Args:
-        df (pd.DataFrame): Raw dataframe from load_data()
-    
+        df (pd.DataFrame or PriceDataset): Raw data from load_data() or load_dataset()
+
     Returns:
-        pd.DataFrame: Preprocessed dataframe with 'ds' (Date) and 'y' (Close price)
+        pd.DataFrame or PriceDataset: Preprocessed dataframe with 'ds' (Date) and
+        'y' (Close price), or a repaired PriceDataset when given one
     """
-    # Create a copy to avoid modifying original
-    df_processed = df.copy()
-    
-    # Check for missing values
-    print(f"Missing values before handling:\n{df_processed.isnull().sum()}\n")
-    
-    # Forward fill for missing values in Close column (if any)
-    df_processed['Close'] = df_processed['Close'].fillna(method='ffill').fillna(method='bfill')
-    
-    # Select only Date and Close columns, rename for Prophet format
-    df_prophet = df_processed[['Date', 'Close']].copy()
-    df_prophet.columns = ['ds', 'y']
-    
-    print(f"Data shape after preprocessing: {df_prophet.shape}")
-    print(f"Date range: {df_prophet['ds'].min()} to {df_prophet['ds'].max()}\n")
-    
-    return df_prophet
+    if not isinstance(df, PriceDataset):
+        return preprocess_data(PriceDataset.from_frame(df)).to_prophet_frame()
+
+    report = check_quality(df)
+    _print_quality(report)
+    df = repair_dataset(df, report)
+
+    print(f"Data shape after preprocessing: ({len(df)}, 2)")
+    print(f"Date range: {df.dates[0]} to {df.dates[-1]}\n")
+    return df
+
+
+def as_prophet_frame(data):
+    """
+    Return Prophet-format data as a 'ds'/'y' dataframe.
+
+    Args:
+        data (pd.DataFrame or PriceDataset): Prophet-format frame or dataset
+
+    Returns:
+        pd.DataFrame: Dataframe with 'ds' and 'y' columns
+    """
+    if isinstance(data, PriceDataset):
+        return data.to_prophet_frame()
+    return data
 
 
 def get_train_test_split(df_prophet, test_days=90):
@@ -70,13 +471,22 @@ def get_train_test_split(df_prophet, test_days=90):
     Last test_days are used for testing.
     
     Args:
-        df_prophet (pd.DataFrame): Preprocessed dataframe in Prophet format
+        df_prophet (pd.DataFrame or PriceDataset): Preprocessed data in Prophet format
         test_days (int): Number of days to reserve for testing
     
     Returns:
-        tuple: (train_df, test_df)
+        tuple: (train_df, test_df); zero-copy PriceDataset views when given a
+        PriceDataset, independent copies when given a DataFrame
     """
     split_point = len(df_prophet) - test_days
+
+    if isinstance(df_prophet, PriceDataset):
+        train_df = df_prophet.slice(None, split_point)
+        test_df = df_prophet.slice(split_point, None)
+        print(f"Train set: {len(train_df)} samples ({train_df.dates[0]} to {train_df.dates[-1]})")
+        print(f"Test set: {len(test_df)} samples ({test_df.dates[0]} to {test_df.dates[-1]})\n")
+        return train_df, test_df
+
     train_df = df_prophet.iloc[:split_point].copy()
     test_df = df_prophet.iloc[split_point:].copy()
     
@@ -6,7 +6,10 @@ Handles visualization of historical price data
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from instrumentation import instrument
 
+
+@instrument()
 def plot_historical_price(df_original, save_path=None):
     """
     Plot historical Bitcoin closing price over time.
@@ -37,6 +40,7 @@ def plot_historical_price(df_original, save_path=None):
     return fig
 
 
+@instrument()
 def plot_price_statistics(df_original, save_path=None):
     """
     Create a subplot showing price statistics and distribution.
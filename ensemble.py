@@ -0,0 +1,301 @@
+"""
+Ensemble Forecasting Module
+Fits several member models concurrently in a process pool (Prophet
+variants with different seasonality and changepoint settings plus cheap
+NumPy baselines) and combines their forecasts with weights learned from
+recent backtest error
+
+Each member task holds out the last `validation_days` of the training data,
+fits on the rest and scores the holdout, then refits on the full training
+data (Prophet warm-starts from the holdout fit) and returns the model in its
+compact array form. Members run in parallel, so the ensemble trains in
+about the time of its slowest member. Weights are proportional to
+1 / holdout MSE, and the ensemble's yhat and interval bounds are the
+weighted averages of the members'.
+
+EnsembleModel is a registry model ('ensemble' in models.py): it is trained,
+evaluated, published and served like any other model.
+
+Usage:
+    python ensemble.py --workers 4 --validation-days 30
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from compact_model import plot_history_forecast
+from data_loader import as_prophet_frame, get_train_test_split
+from instrumentation import record
+from models import fit_model, model_arrays, model_from_arrays
+
+
+SCHEMA_VERSION = 1
+DEFAULT_VALIDATION_DAYS = 30
+
+# (label, registry model name, fit parameters)
+DEFAULT_MEMBERS = (
+    ('prophet', 'prophet', {}),
+    ('prophet_flexible', 'prophet', {'changepoint_prior_scale': 0.5}),
+    ('prophet_smooth', 'prophet', {'changepoint_prior_scale': 0.01,
+                                   'yearly_seasonality': False}),
+    ('drift', 'drift', {}),
+    ('holt', 'holt', {}),
+    ('ar', 'ar', {}),
+)
+
+
+def _fit_member(label, model_name, params, train_df, validation_days):
+    """
+    Process-pool task: backtest one member on the last `validation_days`,
+    then fit it on the whole training data.
+
+    Returns:
+        dict: label, model, arrays, validation_mse, seconds
+    """
+    start = time.perf_counter()
+    inner, validation = get_train_test_split(train_df, test_days=validation_days)
+    model = fit_model(model_name, inner, **params)
+
+    future = model.make_future_dataframe(periods=len(validation), include_history=False)
+    predicted = model.predict(future)['yhat'].to_numpy()
+    actual = as_prophet_frame(validation)['y'].to_numpy(dtype=np.float64)
+    validation_mse = float(np.mean((actual - predicted) ** 2))
+
+    if model_name == 'prophet':
+        from prophet_model import warm_start_params
+        params = dict(params, init=warm_start_params(model))
+    final = fit_model(model_name, train_df, **params)
+    return {
+        'label': label,
+        'model': model_name,
+        'arrays': model_arrays(final),
+        'validation_mse': validation_mse,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+class EnsembleModel:
+    """
+    Weighted combination of fitted member models.
+
+    Implements the subset of the Prophet API used by this project
+    (make_future_dataframe, predict, history_dates, extra_regressors, plot).
+
+    Args:
+        members (list): Fitted member models (CompactProphet or BaselineModel)
+        info (list): Per member dict with 'label', 'model', 'weight',
+            'validation_mse' and 'seconds'
+        history_dates (pd.Series): Training dates
+        y (np.ndarray): Training prices
+    """
+
+    name = 'ensemble'
+
+    def __init__(self, members, info, history_dates, y):
+        self.members = members
+        self.info = info
+        self.weights = np.array([member['weight'] for member in info])
+        self.history_dates = history_dates
+        self.y = y
+        self.extra_regressors = {}
+
+    def make_future_dataframe(self, periods, include_history=True):
+        """
+        Same contract as Prophet.make_future_dataframe for daily data.
+
+        Args:
+            periods (int): Number of days to forecast
+            include_history (bool): Whether to include the training dates
+
+        Returns:
+            pd.DataFrame: Dataframe with a 'ds' column
+        """
+        history = self.history_dates.to_numpy(dtype='datetime64[ns]')
+        future = history[-1] + np.arange(1, periods + 1) * np.timedelta64(1, 'D')
+        dates = np.concatenate((history, future)) if include_history else future
+        return pd.DataFrame({'ds': dates})
+
+    def predict(self, future):
+        """
+        Weighted average of the members' predictions and interval bounds.
+
+        Args:
+            future (pd.DataFrame): Dataframe with a 'ds' column
+
+        Returns:
+            pd.DataFrame: 'ds', 'yhat', 'yhat_lower' and 'yhat_upper' columns
+        """
+        frame = future[['ds']]
+        combined = {column: 0.0 for column in ('yhat', 'yhat_lower', 'yhat_upper')}
+        for member, weight in zip(self.members, self.weights):
+            forecast = member.predict(frame)
+            for column in combined:
+                combined[column] = combined[column] + weight * forecast[column].to_numpy()
+        return pd.DataFrame({'ds': pd.to_datetime(frame['ds']).to_numpy(), **combined})
+
+    def plot(self, forecast):
+        """
+        Plot history and forecast band, like Prophet.plot.
+
+        Args:
+            forecast (pd.DataFrame): Output of predict()
+
+        Returns:
+            matplotlib.figure.Figure: Matplotlib figure object
+        """
+        return plot_history_forecast(self.history_dates, self.y, forecast)
+
+    def save(self, filepath):
+        """
+        Save the ensemble (members' arrays under 'member<i>:' prefixes) to an
+        .npz file with a JSON metadata header.
+
+        Args:
+            filepath (str): Path to save the model
+        """
+        with open(filepath, 'wb') as f:
+            np.savez(f, **self.to_arrays())
+        print(f"Model saved to {filepath}")
+
+    def to_arrays(self):
+        """dict: Array name -> array, the contents of a saved ensemble."""
+        meta = {'schema_version': SCHEMA_VERSION, 'model': self.name, 'members': self.info}
+        arrays = {
+            'meta': np.array(json.dumps(meta)),
+            'dates': self.history_dates.to_numpy(dtype='datetime64[D]'),
+            'y': self.y,
+        }
+        for i, member in enumerate(self.members):
+            arrays.update({f'member{i}:{key}': values
+                           for key, values in model_arrays(member).items()})
+        return arrays
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load an ensemble written by save().
+
+        Args:
+            filepath (str): Path to the saved model
+
+        Returns:
+            EnsembleModel: Loaded ensemble
+        """
+        with np.load(filepath) as archive:
+            model = cls.from_arrays({key: archive[key] for key in archive.files})
+        print(f"Model loaded from {filepath}")
+        return model
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Build an ensemble from the arrays of a saved file, e.g. zero-copy views
+        attached from shared memory.
+
+        Args:
+            arrays (dict): Array name -> array, including the 'meta' header
+
+        Returns:
+            EnsembleModel: Ensemble whose members use the given arrays
+        """
+        meta = json.loads(str(arrays['meta']))
+        if meta['schema_version'] > SCHEMA_VERSION:
+            raise ValueError(f"Unsupported model schema version {meta['schema_version']}")
+        members = []
+        for i in range(len(meta['members'])):
+            prefix = f'member{i}:'
+            members.append(model_from_arrays({key[len(prefix):]: values
+                                              for key, values in arrays.items()
+                                              if key.startswith(prefix)}))
+        return cls(members, meta['members'], pd.Series(pd.to_datetime(arrays['dates'])),
+                   arrays['y'])
+
+
+def fit_ensemble(train_df, members=DEFAULT_MEMBERS, validation_days=DEFAULT_VALIDATION_DAYS,
+                 workers=None):
+    """
+    Fit the members in parallel and weight them by inverse holdout MSE.
+
+    Members that fail to fit are dropped with a message.
+
+    Args:
+        train_df (pd.DataFrame or PriceDataset): Training data in Prophet format
+        members (tuple): (label, model name, params) per member
+        validation_days (int): Trailing training days each member is backtested on
+        workers (int): Worker processes (default: one per member, at most the CPU count)
+
+    Returns:
+        EnsembleModel: Fitted ensemble
+
+    Raises:
+        RuntimeError: If every member failed
+    """
+    workers = workers or min(len(members), os.cpu_count() or 1)
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fit_member, label, name, params, train_df, validation_days)
+                   for label, name, params in members]
+        for (label, _, _), future in zip(members, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Ensemble member {label} failed: {e}")
+    if not results:
+        raise RuntimeError("Every ensemble member failed to fit")
+    for result in results:
+        record(f"ensemble_member[{result['label']}]", result['seconds'])
+
+    inverse = np.array([1 / max(result['validation_mse'], 1e-12) for result in results])
+    weights = inverse / inverse.sum()
+    info = [{'label': result['label'], 'model': result['model'], 'weight': float(weight),
+             'validation_mse': result['validation_mse'], 'seconds': result['seconds']}
+            for result, weight in zip(results, weights)]
+    wall = time.perf_counter() - start
+    slowest = max(result['seconds'] for result in results)
+    print(f"Ensemble of {len(results)} members fitted in {wall:.2f}s "
+          f"(slowest member {slowest:.2f}s, {workers} workers)")
+
+    frame = as_prophet_frame(train_df)
+    return EnsembleModel([model_from_arrays(result['arrays']) for result in results], info,
+                         pd.Series(pd.to_datetime(frame['ds'].to_numpy())),
+                         frame['y'].to_numpy(dtype=np.float64))
+
+
+def main(argv=None):
+    from data_loader import load_dataset, preprocess_data
+    from model_evaluation import evaluate_model
+
+    parser = argparse.ArgumentParser(description="Fit and evaluate the forecasting ensemble")
+    parser.add_argument('--csv', help="Price CSV (default: the bundled data)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--validation-days', type=int, default=DEFAULT_VALIDATION_DAYS)
+    parser.add_argument('--members', nargs='+', metavar='LABEL',
+                        help="Subset of member labels (default: all)")
+    args = parser.parse_args(argv)
+
+    root = Path(__file__).parent
+    csv_path = args.csv or (sorted((root / 'data').glob('*.csv')) or sorted(root.glob('*.csv')))[0]
+    train, test = get_train_test_split(preprocess_data(load_dataset(str(csv_path))), test_days=90)
+    members = [member for member in DEFAULT_MEMBERS
+               if not args.members or member[0] in args.members]
+
+    ensemble = fit_ensemble(train, members, args.validation_days, args.workers)
+    evaluation = evaluate_model(ensemble, test)
+
+    print(f"\n{'Member':<18}{'Weight':>8}{'Holdout RMSE':>14}{'Fit (s)':>9}")
+    for member in ensemble.info:
+        print(f"{member['label']:<18}{member['weight']:>8.3f}"
+              f"{np.sqrt(member['validation_mse']):>14.2f}{member['seconds']:>9.2f}")
+    print(f"\nEnsemble test MAE ${evaluation['mae']:,.2f}, MAPE {evaluation['mape']:.2f}%")
+
+
+if __name__ == '__main__':
+    main()
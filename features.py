@@ -0,0 +1,302 @@
+"""
+Technical Indicator Feature Module
+Computes SMA/EMA, RSI, ATR, realized volatility, log returns and volume
+z-scores over the full price history, and keeps an incremental state that
+updates every indicator in O(1) per appended candle
+"""
+
+import hashlib
+import json
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import PriceDataset
+
+
+# Indicator windows (in bars). Changing these changes the feature cache key.
+FEATURE_WINDOWS = {
+    'sma': (7, 30),
+    'ema': (12, 26),
+    'rsi': 14,
+    'atr': 14,
+    'realized_vol': 30,
+    'volume_z': 30,
+}
+
+# Crypto trades every calendar day
+PERIODS_PER_YEAR = 365
+
+# In-process cache: (data version, windows key) -> features PriceDataset
+_feature_cache = {}
+
+
+def _windows_key(windows):
+    return json.dumps(windows, sort_keys=True)
+
+
+def _rolling_mean(values, window):
+    return pd.Series(values).rolling(window, min_periods=window).mean().to_numpy()
+
+
+def _rolling_std(values, window):
+    return pd.Series(values).rolling(window, min_periods=window).std().to_numpy()
+
+
+def _ewm(values, alpha):
+    """Recursive (adjust=False) exponential average seeded with the first value."""
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _true_range(high, low, close):
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return tr
+
+
+def _rsi_averages(close, window):
+    """Wilder-smoothed average gain and loss, aligned to close (first bar NaN)."""
+    delta = np.diff(close)
+    alpha = 1.0 / window
+    avg_gain = np.concatenate(([np.nan], _ewm(np.maximum(delta, 0.0), alpha)))
+    avg_loss = np.concatenate(([np.nan], _ewm(np.maximum(-delta, 0.0), alpha)))
+    return avg_gain, avg_loss
+
+
+def _rsi(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+def compute_features(dataset, windows=None):
+    """
+    Compute all indicators over the full history in one vectorized pass.
+
+    Args:
+        dataset (PriceDataset): Dataset with Close and, when available,
+            High/Low/Volume columns
+        windows (dict): Indicator windows (default: FEATURE_WINDOWS)
+
+    Returns:
+        PriceDataset: Feature arrays aligned to dataset.dates (leading values
+        are NaN until each window has filled)
+    """
+    windows = windows or FEATURE_WINDOWS
+    close = dataset['Close'].astype(np.float64)
+    features = {}
+
+    log_return = np.concatenate(([np.nan], np.diff(np.log(close))))
+    features['log_return'] = log_return
+
+    for window in windows['sma']:
+        features[f'sma_{window}'] = _rolling_mean(close, window)
+    for window in windows['ema']:
+        features[f'ema_{window}'] = _ewm(close, 2.0 / (window + 1))
+
+    avg_gain, avg_loss = _rsi_averages(close, windows['rsi'])
+    features[f"rsi_{windows['rsi']}"] = _rsi(avg_gain, avg_loss)
+
+    if 'High' in dataset and 'Low' in dataset:
+        tr = _true_range(dataset['High'].astype(np.float64), dataset['Low'].astype(np.float64), close)
+        features[f"atr_{windows['atr']}"] = _ewm(tr, 1.0 / windows['atr'])
+
+    vol_window = windows['realized_vol']
+    features[f'realized_vol_{vol_window}'] = (
+        _rolling_std(log_return, vol_window) * np.sqrt(PERIODS_PER_YEAR)
+    )
+
+    if 'Volume' in dataset:
+        volume = dataset['Volume'].astype(np.float64)
+        z_window = windows['volume_z']
+        std = _rolling_std(volume, z_window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (volume - _rolling_mean(volume, z_window)) / std
+        features[f'volume_z_{z_window}'] = np.where(std > 0, z, np.nan)
+
+    return PriceDataset(dataset.dates, features, target='log_return')
+
+
+def get_features(dataset, cache_dir=None, windows=None):
+    """
+    Return indicator features for a dataset, computing them at most once per
+    data version.
+
+    Features are looked up in an in-process cache, then in
+    '<cache_dir>/features_<version>_<windows>.npz', and only computed on a miss.
+
+    Args:
+        dataset (PriceDataset): Source dataset
+        cache_dir (str): Optional directory for the on-disk feature cache
+        windows (dict): Indicator windows (default: FEATURE_WINDOWS)
+
+    Returns:
+        PriceDataset: Feature arrays aligned to dataset.dates
+    """
+    windows = windows or FEATURE_WINDOWS
+    key = (dataset.fingerprint(), _windows_key(windows))
+    if key in _feature_cache:
+        return _feature_cache[key]
+
+    cache_path = None
+    if cache_dir is not None:
+        windows_hash = hashlib.blake2b(key[1].encode(), digest_size=4).hexdigest()
+        cache_path = Path(cache_dir) / f'features_{key[0]}_{windows_hash}.npz'
+
+    if cache_path is not None and cache_path.exists():
+        features = PriceDataset.load(cache_path)
+        features.target = 'log_return'
+    else:
+        features = compute_features(dataset, windows)
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            features.save(cache_path)
+
+    _feature_cache[key] = features
+    return features
+
+
+class _SlidingStats:
+    """Mean and sample variance over a fixed window, updated in O(1)."""
+
+    __slots__ = ('window', 'values', 'mean', 'm2')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            n = len(self.values) - 1
+            if n == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 -= delta * (old - self.mean)
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def window_mean(self):
+        return self.mean if self.full else np.nan
+
+    def window_std(self):
+        if not self.full or self.window < 2:
+            return np.nan
+        return np.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+
+class FeatureState:
+    """
+    Incremental indicator state.
+
+    update() consumes one candle and returns the latest value of every
+    feature produced by compute_features(), in O(1) time and memory.
+    """
+
+    def __init__(self, windows=None):
+        self.windows = windows or FEATURE_WINDOWS
+        self.prev_close = None
+        self.ema = {window: None for window in self.windows['ema']}
+        self.avg_gain = None
+        self.avg_loss = None
+        self.atr = None
+        self.sma = {window: _SlidingStats(window) for window in self.windows['sma']}
+        self.returns = _SlidingStats(self.windows['realized_vol'])
+        self.volume = _SlidingStats(self.windows['volume_z'])
+
+    @classmethod
+    def from_dataset(cls, dataset, windows=None):
+        """
+        Build a state positioned after the last candle of a dataset.
+
+        Args:
+            dataset (PriceDataset): History to replay
+            windows (dict): Indicator windows (default: FEATURE_WINDOWS)
+
+        Returns:
+            FeatureState: State ready for update() with the next candle
+        """
+        state = cls(windows)
+        high = dataset['High'] if 'High' in dataset else dataset['Close']
+        low = dataset['Low'] if 'Low' in dataset else dataset['Close']
+        volume = dataset['Volume'] if 'Volume' in dataset else np.zeros(len(dataset))
+        for row in zip(dataset['Close'].tolist(), high.tolist(), low.tolist(), volume.tolist()):
+            state.update(*row)
+        return state
+
+    @staticmethod
+    def _recursive(previous, value, alpha):
+        return value if previous is None else previous + alpha * (value - previous)
+
+    def update(self, close, high=None, low=None, volume=None):
+        """
+        Append one candle.
+
+        Args:
+            close (float): Close price
+            high (float): High price (defaults to close)
+            low (float): Low price (defaults to close)
+            volume (float): Traded volume (optional)
+
+        Returns:
+            dict: Latest value of every feature
+        """
+        high = close if high is None else high
+        low = close if low is None else low
+        w = self.windows
+        out = {}
+
+        if self.prev_close is None:
+            log_return = np.nan
+            true_range = high - low
+        else:
+            log_return = np.log(close / self.prev_close)
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            delta = close - self.prev_close
+            alpha = 1.0 / w['rsi']
+            self.avg_gain = self._recursive(self.avg_gain, max(delta, 0.0), alpha)
+            self.avg_loss = self._recursive(self.avg_loss, max(-delta, 0.0), alpha)
+            self.returns.push(log_return)
+        out['log_return'] = log_return
+
+        for window, stats in self.sma.items():
+            stats.push(close)
+            out[f'sma_{window}'] = stats.window_mean()
+        for window in self.ema:
+            self.ema[window] = self._recursive(self.ema[window], close, 2.0 / (window + 1))
+            out[f'ema_{window}'] = self.ema[window]
+
+        if self.avg_loss is None:
+            out[f"rsi_{w['rsi']}"] = np.nan
+        elif self.avg_loss == 0:
+            out[f"rsi_{w['rsi']}"] = 100.0
+        else:
+            out[f"rsi_{w['rsi']}"] = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+        self.atr = self._recursive(self.atr, true_range, 1.0 / w['atr'])
+        out[f"atr_{w['atr']}"] = self.atr
+
+        out[f"realized_vol_{w['realized_vol']}"] = self.returns.window_std() * np.sqrt(PERIODS_PER_YEAR)
+
+        if volume is not None:
+            self.volume.push(volume)
+            std = self.volume.window_std()
+            out[f"volume_z_{w['volume_z']}"] = (
+                (volume - self.volume.window_mean()) / std if std > 0 else np.nan
+            )
+
+        self.prev_close = close
+        return out
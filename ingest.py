@@ -0,0 +1,259 @@
+"""
+Streaming Ingestion Module
+Reads large intraday OHLCV exports in chunks and resamples them to daily or
+hourly bars with bounded memory, writing the columnar cache used by
+load_dataset() / preprocess_data()
+
+The cache is written where the loaders look for it when FORECAST_BAR is set
+to the same bar size, so the ingested bars are what training and serving use.
+
+Usage:
+    python ingest.py data/*.csv --bar 1D --out cache --workers 4
+    FORECAST_BAR=1D python app.py
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import PriceDataset, dataset_cache_path
+
+
+DEFAULT_CHUNKSIZE = 1_000_000
+DEFAULT_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Partial bars are re-aggregated once this many chunks have been buffered,
+# so memory stays proportional to the number of output bars, not input rows.
+COMPACT_EVERY = 32
+
+
+def _parse_timestamps(values, timestamp_format, timestamp_unit):
+    """
+    Parse a timestamp column with a fixed format (no per-row format inference).
+
+    Args:
+        values (pd.Series): Raw timestamp column
+        timestamp_format (str): strftime format of the column
+        timestamp_unit (str): Epoch unit ('s', 'ms', ...) for numeric timestamps;
+            takes precedence over timestamp_format when set
+
+    Returns:
+        pd.Series: datetime64 timestamps
+    """
+    if timestamp_unit is not None:
+        return pd.to_datetime(values, unit=timestamp_unit)
+    return pd.to_datetime(values, format=timestamp_format)
+
+
+def _aggregate_chunk(chunk, timestamps, bar):
+    """
+    Aggregate one chunk of rows into partial OHLCV bars.
+
+    Each partial bar keeps the timestamps of its first and last rows so that
+    partial bars split across chunks can be merged exactly later.
+    """
+    frame = pd.DataFrame({
+        'bar': timestamps.dt.floor(bar),
+        'first_ts': timestamps,
+        'last_ts': timestamps,
+        'Open': chunk['Open'].to_numpy(),
+        'High': chunk['High'].to_numpy(),
+        'Low': chunk['Low'].to_numpy(),
+        'Close': chunk['Close'].to_numpy(),
+        'Volume': chunk['Volume'].to_numpy() if 'Volume' in chunk else 0.0,
+    })
+    return _combine_bars(frame)
+
+
+def _combine_bars(parts):
+    """
+    Merge partial bars that share a bar key.
+
+    Open comes from the earliest row and Close from the latest row, so the
+    result is correct even when the input is not sorted by time.
+
+    Args:
+        parts (pd.DataFrame): Partial bars with 'bar', 'first_ts', 'last_ts'
+            and OHLCV columns
+
+    Returns:
+        pd.DataFrame: One row per bar, sorted by bar
+    """
+    by_first = parts.sort_values('first_ts', kind='stable').groupby('bar', sort=True)
+    by_last = parts.sort_values('last_ts', kind='stable').groupby('bar', sort=True)
+
+    return pd.DataFrame({
+        'first_ts': by_first['first_ts'].first(),
+        'last_ts': by_last['last_ts'].last(),
+        'Open': by_first['Open'].first(),
+        'High': by_first['High'].max(),
+        'Low': by_first['Low'].min(),
+        'Close': by_last['Close'].last(),
+        'Volume': by_first['Volume'].sum(),
+    }).reset_index()
+
+
+def resample_csv(filepath, bar='1D', timestamp_column='Timestamp',
+                 timestamp_format=DEFAULT_TIMESTAMP_FORMAT, timestamp_unit=None,
+                 chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Stream a CSV in chunks and aggregate it to OHLCV bars.
+
+    Args:
+        filepath (str): Path to the intraday CSV export
+        bar (str): Target bar size as a pandas offset alias ('1D', '1h', ...)
+        timestamp_column (str): Name of the timestamp column
+        timestamp_format (str): Fixed strftime format of the timestamps
+        timestamp_unit (str): Epoch unit for numeric timestamps (e.g. 's', 'ms')
+        chunksize (int): Rows read per chunk
+
+    Returns:
+        tuple: (PriceDataset of bars, stats dict with 'rows', 'bars', 'seconds'
+        and 'rows_per_second')
+    """
+    start = time.perf_counter()
+    header = pd.read_csv(filepath, nrows=0).columns
+    usecols = [timestamp_column] + [
+        c for c in ('Open', 'High', 'Low', 'Close', 'Volume') if c in header
+    ]
+    dtypes = {c: np.float64 for c in usecols if c != timestamp_column}
+
+    parts = []
+    rows = 0
+    for chunk in pd.read_csv(filepath, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        timestamps = _parse_timestamps(chunk[timestamp_column], timestamp_format, timestamp_unit)
+        parts.append(_aggregate_chunk(chunk, timestamps, bar))
+        rows += len(chunk)
+
+        if len(parts) >= COMPACT_EVERY:
+            parts = [_combine_bars(pd.concat(parts, ignore_index=True))]
+
+    if not parts:
+        raise ValueError(f"No rows found in {filepath}")
+
+    bars = _combine_bars(pd.concat(parts, ignore_index=True))
+
+    # Daily bars use day resolution like load_dataset(); finer bars keep seconds
+    is_daily = pd.Timedelta(bar) % pd.Timedelta(days=1) == pd.Timedelta(0)
+    unit = 'datetime64[D]' if is_daily else 'datetime64[s]'
+    dataset = PriceDataset(
+        bars['bar'].to_numpy(dtype=unit),
+        {c: bars[c].to_numpy(dtype=np.float64) for c in ('Open', 'High', 'Low', 'Close')}
+        | {'Volume': bars['Volume'].to_numpy(dtype=np.float32)},
+    )
+
+    seconds = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'bars': len(dataset),
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else float('inf'),
+    }
+    return dataset, stats
+
+
+def ingest_file(filepath, cache_dir, bar='1D', **kwargs):
+    """
+    Resample one CSV and write the bars to the columnar cache.
+
+    The cache file is dataset_cache_path(filepath, cache_dir, bar), i.e.
+    '<csv stem>_<bar>.npz' inside cache_dir, which load_dataset() reads when
+    given the same bar (FORECAST_BAR).
+
+    Args:
+        filepath (str): Path to the intraday CSV export
+        cache_dir (str): Directory for the .npz cache
+        bar (str): Target bar size as a pandas offset alias
+        **kwargs: Passed through to resample_csv()
+
+    Returns:
+        dict: Ingestion stats including the 'cache_path' written
+    """
+    dataset, stats = resample_csv(filepath, bar=bar, **kwargs)
+
+    cache_path = dataset_cache_path(filepath, cache_dir, bar)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    dataset.save(cache_path)
+
+    stats['file'] = str(filepath)
+    stats['cache_path'] = str(cache_path)
+    return stats
+
+
+def ingest_files(filepaths, cache_dir, bar='1D', workers=None, **kwargs):
+    """
+    Ingest several CSV files, one per worker process.
+
+    Args:
+        filepaths (list): CSV paths to ingest
+        cache_dir (str): Directory for the .npz caches
+        bar (str): Target bar size as a pandas offset alias
+        workers (int): Number of worker processes (default: one per CPU)
+        **kwargs: Passed through to resample_csv()
+
+    Returns:
+        list: Per-file stats dicts, in input order
+    """
+    if workers == 1 or len(filepaths) == 1:
+        return [ingest_file(path, cache_dir, bar, **kwargs) for path in filepaths]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(ingest_file, path, cache_dir, bar, **kwargs)
+            for path in filepaths
+        ]
+        return [future.result() for future in futures]
+
+
+def print_ingest_stats(results, seconds):
+    """
+    Print per-file and aggregate ingestion throughput.
+
+    Args:
+        results (list): Stats dicts from ingest_files()
+        seconds (float): Total wall-clock time
+    """
+    print("=" * 60)
+    print("INGESTION SUMMARY")
+    print("=" * 60)
+    for stats in results:
+        print(f"{Path(stats['file']).name}: {stats['rows']:,} rows -> {stats['bars']:,} bars "
+              f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
+        print(f"  -> {stats['cache_path']}")
+    total_rows = sum(stats['rows'] for stats in results)
+    print(f"\nTotal: {total_rows:,} rows in {seconds:.2f}s "
+          f"({total_rows / seconds:,.0f} rows/s)")
+    print("=" * 60)
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunked OHLCV ingestion and resampling")
+    parser.add_argument('files', nargs='+', help="Intraday CSV exports to ingest")
+    parser.add_argument('--bar', default='1D', help="Target bar size, e.g. 1D or 1h")
+    parser.add_argument('--out', default='cache', help="Output directory for .npz caches")
+    parser.add_argument('--timestamp-column', default='Timestamp')
+    parser.add_argument('--timestamp-format', default=DEFAULT_TIMESTAMP_FORMAT)
+    parser.add_argument('--timestamp-unit', default=None,
+                        help="Epoch unit for numeric timestamps (s, ms, us)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = ingest_files(
+        args.files, args.out, bar=args.bar, workers=args.workers,
+        timestamp_column=args.timestamp_column,
+        timestamp_format=args.timestamp_format,
+        timestamp_unit=args.timestamp_unit,
+        chunksize=args.chunksize,
+    )
+    print_ingest_stats(results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
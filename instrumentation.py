@@ -0,0 +1,275 @@
+"""
+Instrumentation Module
+Lightweight timers (context manager and decorator) with optional
+tracemalloc peak-memory capture, an in-process aggregate of every timed
+section, latency histograms, and Prometheus text exposition
+
+Memory capture is off unless enable_memory_tracking() is called (or
+FORECAST_TRACE_MEMORY=1 is set): tracemalloc slows allocation-heavy code
+noticeably. tracemalloc is process-wide, so peaks are only meaningful for
+sections that do not run concurrently with other threads.
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Prometheus' default buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_stats = {}
+_captures = []
+_local = threading.local()
+
+
+def enable_memory_tracking():
+    """Start tracemalloc so timers also record peak traced memory."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def memory_tracking_enabled():
+    return tracemalloc.is_tracing()
+
+
+def record(name, seconds, peak_bytes=None):
+    """
+    Add one measurement to the aggregate for `name`.
+
+    Args:
+        name (str): Section name
+        seconds (float): Wall-clock duration
+        peak_bytes (int): Peak traced memory above the section's starting
+            point, or None when memory tracking is off
+    """
+    with _lock:
+        entry = _stats.setdefault(name, {'count': 0, 'total_seconds': 0.0,
+                                         'max_seconds': 0.0, 'peak_bytes': None})
+        entry['count'] += 1
+        entry['total_seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        entry['last_seconds'] = seconds
+        if peak_bytes is not None:
+            entry['peak_bytes'] = max(entry['peak_bytes'] or 0, peak_bytes)
+        for captured in _captures:
+            captured.append((name, seconds, peak_bytes))
+
+
+def _memory_frames():
+    if not hasattr(_local, 'frames'):
+        _local.frames = []
+    return _local.frames
+
+
+@contextmanager
+def timed(name):
+    """
+    Time a block (and its peak memory when tracking is enabled).
+
+    Nested timers each report their own peak: tracemalloc's peak is reset on
+    entry and the outer section's running peak is carried over.
+
+    Args:
+        name (str): Section name
+    """
+    frames = _memory_frames() if tracemalloc.is_tracing() else None
+    if frames is not None:
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            frames[-1][1] = max(frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        frames.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak_bytes = None
+        if frames is not None and frames and frames[-1] is frame:
+            frames.pop()
+            _, peak = tracemalloc.get_traced_memory()
+            frame[1] = max(frame[1], peak)
+            if frames:
+                frames[-1][1] = max(frames[-1][1], frame[1])
+            peak_bytes = frame[1] - frame[0]
+        record(name, seconds, peak_bytes)
+
+
+def instrument(name=None):
+    """
+    Decorator form of timed(); the section name defaults to the function name.
+
+    Args:
+        name (str): Section name
+    """
+    def decorator(func):
+        section = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(section):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def capture():
+    """
+    Collect the measurements recorded inside the block, e.g. to ship them
+    from a worker process back to the parent with merge().
+
+    Yields:
+        list: (name, seconds, peak_bytes) tuples, filled as sections finish
+    """
+    captured = []
+    with _lock:
+        _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        with _lock:
+            _captures.remove(captured)
+
+
+def merge(measurements):
+    """
+    Record measurements captured elsewhere (see capture()).
+
+    Args:
+        measurements (list): (name, seconds, peak_bytes) tuples
+    """
+    for measurement in measurements:
+        record(*measurement)
+
+
+def snapshot():
+    """
+    Aggregates of every timed section so far.
+
+    Returns:
+        dict: name -> count, total/max/last seconds and peak_bytes
+    """
+    with _lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def reset():
+    """Clear all aggregates."""
+    with _lock:
+        _stats.clear()
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram keyed by a tuple of label values.
+
+    Args:
+        name (str): Metric name
+        help_text (str): Metric description
+        labels (tuple): Label names
+        buckets (tuple): Upper bounds in seconds (+Inf is implicit)
+    """
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value (seconds)
+            *label_values: One value per label name
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        """
+        Prometheus text exposition of this histogram.
+
+        Returns:
+            list: Lines
+        """
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted(self._series.items())
+        for label_values, (counts, total_count, total) in items:
+            labels = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values)]
+            bounds = [f'"{bound:g}"' for bound in self.buckets] + ['"+Inf"']
+            for bound, count in zip(bounds, counts + [total_count]):
+                lines.append(f"{self.name}_bucket{{{','.join(labels + ['le=' + bound])}}} {count}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {total!r}')
+            lines.append(f'{self.name}_count{suffix} {total_count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render_sections(prefix='forecast_section'):
+    """
+    Prometheus text exposition of the timed-section aggregates.
+
+    Args:
+        prefix (str): Metric name prefix
+
+    Returns:
+        list: Lines
+    """
+    stats = snapshot()
+    lines = [
+        f'# HELP {prefix}_seconds Time spent in instrumented sections',
+        f'# TYPE {prefix}_seconds summary',
+    ]
+    for name, entry in sorted(stats.items()):
+        label = f'section="{_escape(name)}"'
+        lines.append(f'{prefix}_seconds_sum{{{label}}} {entry["total_seconds"]!r}')
+        lines.append(f'{prefix}_seconds_count{{{label}}} {entry["count"]}')
+    peaks = [(name, entry['peak_bytes']) for name, entry in sorted(stats.items())
+             if entry['peak_bytes'] is not None]
+    if peaks:
+        lines += [f'# HELP {prefix}_peak_bytes Peak traced memory of instrumented sections',
+                  f'# TYPE {prefix}_peak_bytes gauge']
+        lines += [f'{prefix}_peak_bytes{{section="{_escape(name)}"}} {peak}'
+                  for name, peak in peaks]
+    return lines
+
+
+def render_gauge(name, help_text, value):
+    """
+    Prometheus text exposition of a single unlabelled gauge.
+
+    Returns:
+        list: Lines (empty for NaN values)
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return []
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value!r}']
+
+
+if os.environ.get('FORECAST_TRACE_MEMORY') == '1':
+    enable_memory_tracking()
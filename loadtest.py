@@ -0,0 +1,450 @@
+"""
+Load Testing Module
+Starts the web app against a fixture model bundle and replays a
+configurable traffic mix at several concurrency levels, reporting
+throughput and p50/p95/p99 latency per route
+
+Everything runs in local processes: the server is a subprocess (one of
+SERVER_MODES, or any command given with --server-cmd), and the load comes
+from closed-loop virtual users spread over client processes, each with its
+own keep-alive connection. Request sequences are seeded, and every result
+file records the traffic mix, server mode, commit and environment, so runs
+are comparable across server modes and code versions (see --compare).
+
+/api/forecast requests are labelled by whether the horizon is served from
+the bundle's precomputed forecast ('precomputed', horizons up to 90 days)
+or predicted on demand ('predicted'); --hit-ratio sets the mix.
+
+Usage:
+    python loadtest.py --mode threaded --concurrency 1 8 32 --duration 10
+    python loadtest.py --mode async --hit-ratio 0.5
+    python loadtest.py --mix "/api/forecast=8,/api/metrics=2" --hit-ratio 0.5
+    python loadtest.py --server-cmd "python app.py --no-debug --port {port}"
+    python loadtest.py --url http://localhost:5000        # existing server
+    python loadtest.py --compare loadtests/threaded_20240523-120000.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+
+
+PROJECT_ROOT = Path(__file__).parent
+RESULTS_DIR = PROJECT_ROOT / 'loadtests'
+FIXTURE_DIR = PROJECT_ROOT / 'cache' / 'loadtest'
+# The home page; without it '/' can only answer 500
+INDEX_TEMPLATE = PROJECT_ROOT / 'templates' / 'index.html'
+
+# Built-in ways to start the server; {host} and {port} are substituted
+SERVER_MODES = {
+    'threaded': [sys.executable, 'app.py', '--no-debug', '--host', '{host}', '--port', '{port}'],
+    'single': [sys.executable, 'app.py', '--no-debug', '--single-threaded',
+               '--host', '{host}', '--port', '{port}'],
+    # Requires uvicorn
+    'async': [sys.executable, 'asgi_app.py', '--executor', 'process',
+              '--host', '{host}', '--port', '{port}'],
+}
+
+# '/' is dropped from the default mix when INDEX_TEMPLATE is missing
+DEFAULT_MIX = {'/': 1, '/api/forecast': 6, '/api/metrics': 3}
+HIT_HORIZONS = (7, 30, 60, 90)
+MISS_HORIZONS = (120, 180, 365)
+DEFAULT_CONCURRENCY = (1, 8, 32)
+
+READY_TIMEOUT = 300.0
+REQUEST_TIMEOUT = 60.0
+
+
+def parse_mix(text):
+    """
+    Parse a traffic mix like "/=1,/api/forecast=6,/api/metrics=3".
+
+    Returns:
+        dict: Route -> relative weight
+    """
+    mix = {}
+    for item in text.split(','):
+        route, _, weight = item.strip().partition('=')
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def make_request_stream(mix, hit_ratio, seed):
+    """
+    Infinite seeded stream of (label, path) requests following a traffic mix.
+
+    Args:
+        mix (dict): Route -> relative weight
+        hit_ratio (float): Fraction of forecast requests for precomputed horizons
+        seed (int): Random seed
+
+    Yields:
+        tuple: (label used in the report, request path with query string)
+    """
+    rng = random.Random(seed)
+    routes, weights = list(mix), list(mix.values())
+    while True:
+        route = rng.choices(routes, weights)[0]
+        if route == '/api/forecast':
+            if rng.random() < hit_ratio:
+                yield f'{route} (precomputed)', f'{route}?horizon={rng.choice(HIT_HORIZONS)}'
+            else:
+                yield f'{route} (predicted)', f'{route}?horizon={rng.choice(MISS_HORIZONS)}'
+        elif route == '/':
+            yield route, f'/?horizon={rng.choice(HIT_HORIZONS)}'
+        else:
+            yield route, route
+
+
+def _virtual_user(host, port, stream, deadline):
+    """Issue requests back to back on one keep-alive connection until deadline."""
+    conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+    samples = []
+    while time.perf_counter() < deadline:
+        label, path = next(stream)
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            status = 0
+        samples.append((label, status, time.perf_counter() - start))
+    conn.close()
+    return samples
+
+
+def _client_process(job):
+    """Run a group of virtual users in one process; returns their samples."""
+    host, port, users, mix, hit_ratio, seed, duration = job
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=len(users)) as executor:
+        futures = [
+            executor.submit(_virtual_user, host, port,
+                            make_request_stream(mix, hit_ratio, seed + user), deadline)
+            for user in users
+        ]
+        return [sample for future in futures for sample in future.result()]
+
+
+def run_level(host, port, concurrency, duration, mix, hit_ratio, seed=0, client_procs=None):
+    """
+    Drive the server with `concurrency` closed-loop virtual users.
+
+    Args:
+        host (str): Server host
+        port (int): Server port
+        concurrency (int): Number of virtual users
+        duration (float): Seconds to run
+        mix (dict): Route -> relative weight
+        hit_ratio (float): Fraction of forecast requests for precomputed horizons
+        seed (int): Base seed (each user gets seed + user index)
+        client_procs (int): Client processes (default: up to one per CPU)
+
+    Returns:
+        tuple: (samples, elapsed seconds) where samples are (label, status, seconds)
+    """
+    procs = max(1, min(concurrency, client_procs or os.cpu_count() or 1))
+    groups = [list(range(i, concurrency, procs)) for i in range(procs)]
+    jobs = [(host, port, users, mix, hit_ratio, seed, duration) for users in groups]
+    start = time.perf_counter()
+    if procs == 1:
+        samples = _client_process(jobs[0])
+    else:
+        with Pool(procs) as pool:
+            samples = [s for group in pool.map(_client_process, jobs) for s in group]
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    """
+    Per-route throughput and latency percentiles.
+
+    Args:
+        samples (list): (label, status, seconds) tuples
+        elapsed (float): Wall-clock duration of the level
+
+    Returns:
+        dict: Label (plus 'all') -> count, errors, rps, mean/p50/p95/p99 in ms
+    """
+    by_label = {}
+    for label, status, seconds in samples:
+        by_label.setdefault(label, []).append((status, seconds))
+    by_label['all'] = [(status, seconds) for _, status, seconds in samples]
+
+    summary = {}
+    for label, rows in sorted(by_label.items()):
+        if not rows:
+            continue
+        statuses = np.array([status for status, _ in rows])
+        latencies = np.array([seconds for _, seconds in rows]) * 1e3
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[label] = {
+            'count': len(rows),
+            'errors': int(((statuses == 0) | (statuses >= 500)).sum()),
+            'rps': len(rows) / elapsed,
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+        }
+    return summary
+
+
+def _find_csv():
+    data_files = sorted((PROJECT_ROOT / 'data').glob('*.csv'))
+    return (data_files or sorted(PROJECT_ROOT.glob('*.csv')))[0]
+
+
+def prepare_fixture(model_name, registry_dir=FIXTURE_DIR):
+    """
+    Publish a fixture bundle for the app's CSV into a dedicated registry,
+    reusing it while the data and model are unchanged.
+
+    Args:
+        model_name (str): Model to serve
+        registry_dir (Path): Fixture registry root
+
+    Returns:
+        Path: Registry root to pass to the server as FORECAST_REGISTRY_DIR
+    """
+    from model_store import asset_registry, file_hash, load_bundle
+    from retrain_daemon import retrain_asset
+
+    csv_path = _find_csv()
+    registry_dir = Path(registry_dir) / model_name
+    existing = load_bundle(asset_registry(csv_path.stem, registry_dir))
+    if (existing is None or existing.manifest['model_name'] != model_name
+            or existing.manifest['source'].get('hash') != file_hash(csv_path)):
+        print(f"Publishing {model_name} fixture bundle...")
+        retrain_asset(str(csv_path), model_name, registry_dir=str(registry_dir))
+    return registry_dir
+
+
+def _free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(host, port, process=None, timeout=READY_TIMEOUT):
+    """Poll /api/metrics until the server answers 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request('GET', '/api/metrics')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {timeout:.0f}s")
+
+
+def start_server(command, host, port, env, log_path):
+    """
+    Start the server subprocess and wait until it is ready.
+
+    Args:
+        command (list): Command with {host}/{port} placeholders
+        host (str): Host to bind
+        port (int): Port to bind
+        env (dict): Extra environment variables
+        log_path (Path): File receiving the server's output
+
+    Returns:
+        subprocess.Popen: Running server
+    """
+    argv = [part.format(host=host, port=port) for part in command]
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, 'w')
+    process = subprocess.Popen(argv, cwd=PROJECT_ROOT, env=dict(os.environ, **env),
+                               stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    try:
+        wait_until_ready(host, port, process)
+    except Exception:
+        stop_server(process)
+        raise
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_loadtest(host, port, concurrency_levels, duration, warmup, mix, hit_ratio, seed,
+                 client_procs=None):
+    """
+    Run every concurrency level (each preceded by a discarded warm-up).
+
+    Returns:
+        list: One dict per level with 'concurrency', 'duration_s' and 'routes'
+    """
+    levels = []
+    for concurrency in concurrency_levels:
+        if warmup > 0:
+            run_level(host, port, concurrency, warmup, mix, hit_ratio, seed + 10_000, client_procs)
+        samples, elapsed = run_level(host, port, concurrency, duration, mix, hit_ratio,
+                                     seed, client_procs)
+        levels.append({'concurrency': concurrency, 'duration_s': elapsed,
+                       'routes': summarize(samples, elapsed)})
+        overall = levels[-1]['routes']['all']
+        print(f"  concurrency {concurrency:>3}: {overall['rps']:8.1f} req/s  "
+              f"p50 {overall['p50_ms']:7.1f} ms  p99 {overall['p99_ms']:7.1f} ms  "
+              f"errors {overall['errors']}", flush=True)
+    return levels
+
+
+def print_results(result, previous=None):
+    """
+    Print per-level, per-route results; with `previous`, add throughput and
+    p95 ratios against it.
+
+    Args:
+        result (dict): Result record from main()
+        previous (dict): Earlier result record to compare with
+    """
+    before = {}
+    for level in (previous or {}).get('levels', []):
+        for label, stats in level['routes'].items():
+            before[(level['concurrency'], label)] = stats
+    width = 118 if previous else 100
+    print("=" * width)
+    header = (f"{'Conc':>5}  {'Route':<30}{'Count':>8}{'Err':>6}{'Req/s':>9}"
+              f"{'Mean':>9}{'p50':>9}{'p95':>9}{'p99':>9} (ms)")
+    print(header + (f"{'rps vs':>9}{'p95 vs':>9}" if previous else ''))
+    print("-" * width)
+    for level in result['levels']:
+        for label, s in level['routes'].items():
+            line = (f"{level['concurrency']:>5}  {label:<30}{s['count']:>8}{s['errors']:>6}"
+                    f"{s['rps']:>9.1f}{s['mean_ms']:>9.1f}{s['p50_ms']:>9.1f}"
+                    f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}     ")
+            old = before.get((level['concurrency'], label))
+            if previous:
+                line += (f"{s['rps'] / old['rps']:>8.2f}x{s['p95_ms'] / old['p95_ms']:>8.2f}x"
+                         if old else f"{'-':>9}{'-':>9}")
+            print(line)
+    print("=" * width)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the forecasting web app")
+    parser.add_argument('--mode', choices=list(SERVER_MODES), default='threaded',
+                        help="Built-in server mode (default: threaded)")
+    parser.add_argument('--server-cmd', help="Custom server command with {host} and {port}")
+    parser.add_argument('--url', help="Test an already running server instead of starting one")
+    parser.add_argument('--model', default=os.environ.get('FORECAST_MODEL', 'prophet'),
+                        help="Fixture model (default: $FORECAST_MODEL or prophet)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Warm-up seconds per level")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='Route weights, e.g. "/=1,/api/forecast=6,/api/metrics=3"')
+    parser.add_argument('--hit-ratio', type=float, default=0.9,
+                        help="Fraction of forecast requests for precomputed horizons")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--client-procs', type=int, default=None,
+                        help="Client processes (default: up to one per CPU)")
+    parser.add_argument('--output', help="Result file (default: loadtests/<mode>_<time>.json)")
+    parser.add_argument('--compare', help="Earlier result file to compare against")
+    args = parser.parse_args(argv)
+    if args.mix is DEFAULT_MIX and not args.url and not INDEX_TEMPLATE.exists():
+        print(f"Note: {INDEX_TEMPLATE.relative_to(PROJECT_ROOT)} is missing; "
+              "leaving '/' out of the traffic mix")
+        args.mix = {route: weight for route, weight in DEFAULT_MIX.items() if route != '/'}
+
+    if args.url:
+        parsed = urllib.parse.urlparse(args.url)
+        host, port, mode = parsed.hostname, parsed.port or 80, 'external'
+        command = None
+    else:
+        host = '127.0.0.1'
+        port = _free_port(host)
+        mode = 'custom' if args.server_cmd else args.mode
+        command = shlex.split(args.server_cmd) if args.server_cmd else SERVER_MODES[args.mode]
+
+    started = time.time()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+    output = Path(args.output or RESULTS_DIR / f'{mode}_{stamp}.json')
+
+    process = None
+    if command is not None:
+        registry = prepare_fixture(args.model)
+        print(f"Starting server ({mode})...")
+        process = start_server(command, host, port,
+                               {'FORECAST_REGISTRY_DIR': str(registry),
+                                'FORECAST_MODEL': args.model},
+                               output.with_suffix('.server.log'))
+
+    try:
+        print(f"Load testing http://{host}:{port} ...")
+        levels = run_loadtest(host, port, args.concurrency, args.duration, args.warmup,
+                              args.mix, args.hit_ratio, args.seed, args.client_procs)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    result = {
+        'started_at': started,
+        'mode': mode,
+        'server_cmd': command,
+        'commit': _git_commit(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'config': {'model': args.model, 'mix': args.mix, 'hit_ratio': args.hit_ratio,
+                   'hit_horizons': HIT_HORIZONS, 'miss_horizons': MISS_HORIZONS,
+                   'concurrency': args.concurrency, 'duration_s': args.duration,
+                   'warmup_s': args.warmup, 'seed': args.seed},
+        'levels': levels,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous.get('config') != json.loads(json.dumps(result['config'])):
+            print("Note: traffic configuration differs from the compared run")
+
+    print()
+    print_results(result, previous)
+    print(f"Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
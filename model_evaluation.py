@@ -8,25 +8,31 @@ import numpy as np
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import matplotlib.pyplot as plt
 
+from data_loader import as_prophet_frame
+from prophet_model import create_future_dataframe
+from instrumentation import instrument
 
-def evaluate_model(model, test_df):
+
+@instrument()
+def evaluate_model(model, test_df, regressors=None):
     """
     Evaluate model on test set and calculate MAE and RMSE.
     
     Args:
         model (Prophet): Trained Prophet model
-        test_df (pd.DataFrame): Test dataframe with 'ds' and 'y' columns
+        test_df (pd.DataFrame or PriceDataset): Test data with 'ds' and 'y' columns
+        regressors (RegressorPipeline): Pipeline the model was trained with, if any
     
     Returns:
         dict: Dictionary containing evaluation metrics and predictions
     """
     # Create future dataframe for test period
-    future = model.make_future_dataframe(periods=len(test_df))
+    future = create_future_dataframe(model, len(test_df), regressors)
     forecast = model.predict(future)
     
     # Get predictions for test period
     test_forecast = forecast.tail(len(test_df))[['ds', 'yhat']].reset_index(drop=True)
-    test_actual = test_df.reset_index(drop=True)
+    test_actual = as_prophet_frame(test_df).reset_index(drop=True)
     
     # Align dataframes
     combined = pd.DataFrame({
@@ -75,6 +81,7 @@ def print_evaluation_metrics(metrics):
     print()
 
 
+@instrument()
 def plot_evaluation(combined, save_path=None):
     """
     Plot actual vs predicted prices on test set.
@@ -0,0 +1,565 @@
+"""
+Model Bundle Registry Module
+Stores each trained model as an immutable, content-addressed bundle (model,
+metrics, precomputed forecast, plots, data fingerprint) and switches the
+served version through an atomic 'current' pointer with rollback and
+retention-based garbage collection
+
+Each asset (CSV file stem) has its own registry:
+    registry/<asset>/
+        bundles/<bundle_id>/   manifest.json, model.npz, metrics.json,
+                               forecast.npz, plots/*.png
+        CURRENT                id of the bundle being served
+        HISTORY                promoted ids, oldest first (one per line)
+        LOCK                   flock() held while CURRENT/HISTORY are updated
+
+Usage: python model_store.py [--asset NAME] list | promote <id> | rollback | gc [--keep N]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from models import load_model, model_from_arrays, save_model
+
+
+PROJECT_ROOT = Path(__file__).parent
+REGISTRY_DIR = PROJECT_ROOT / 'registry'
+
+BUNDLE_SCHEMA_VERSION = 1
+FORECAST_HORIZON = 90
+DEFAULT_KEEP = 5
+
+# Staging directories untouched for this long are from crashed publishes
+# (anything younger may belong to a publish still in progress)
+STAGING_MAX_AGE = 3600
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    SHA-256 hash of a file's contents, read in chunks.
+
+    Args:
+        path (str): File to hash
+        chunk_size (int): Read size in bytes
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, text):
+    """Write text to path via a temp file and os.replace, fsyncing both."""
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(path.parent, os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+@contextlib.contextmanager
+def _registry_lock(registry_dir):
+    """
+    Hold an exclusive flock() on registry_dir/LOCK, so that read-modify-write
+    updates of CURRENT and HISTORY from different processes (promote,
+    rollback, garbage collection) never overwrite each other. A no-op
+    where fcntl is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    registry_dir = Path(registry_dir)
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    with open(registry_dir / 'LOCK', 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _metrics_to_json(metrics):
+    combined = metrics['combined']
+    return {
+        'mae': float(metrics['mae']),
+        'rmse': float(metrics['rmse']),
+        'mape': float(metrics['mape']),
+        'directional_accuracy': float(metrics['directional_accuracy']),
+        'combined': {
+            'ds': combined['ds'].dt.strftime('%Y-%m-%d').tolist(),
+            'actual': combined['actual'].tolist(),
+            'predicted': combined['predicted'].tolist(),
+        },
+    }
+
+
+def _metrics_from_json(data):
+    metrics = {k: v for k, v in data.items() if k != 'combined'}
+    combined = data['combined']
+    metrics['combined'] = pd.DataFrame({
+        'ds': pd.to_datetime(combined['ds']),
+        'actual': combined['actual'],
+        'predicted': combined['predicted'],
+    })
+    return metrics
+
+
+def asset_registry(asset, registry_dir=REGISTRY_DIR):
+    """
+    Registry directory of one asset.
+
+    Args:
+        asset (str): Asset name (the source CSV's file stem)
+        registry_dir (str): Registry root
+
+    Returns:
+        Path: Directory holding the asset's bundles and pointers
+    """
+    return Path(registry_dir) / asset
+
+
+def list_assets(registry_dir=REGISTRY_DIR):
+    """
+    Names of all assets with at least one published bundle.
+
+    Args:
+        registry_dir (str): Registry root
+
+    Returns:
+        list: Sorted asset names
+    """
+    registry_dir = Path(registry_dir)
+    if not registry_dir.exists():
+        return []
+    return sorted(path.name for path in registry_dir.iterdir() if (path / 'bundles').is_dir())
+
+
+def publish_bundle(model, metrics, dataset, registry_dir, model_name='prophet', plots=None,
+                   forecast=None, source=None):
+    """
+    Write a new immutable bundle into the registry.
+
+    The bundle is assembled in a staging directory and moved into
+    bundles/<bundle_id> with a single rename, so readers never see a partial
+    bundle. The id is a hash of the bundle's file contents, so republishing
+    identical content is a no-op.
+
+    Args:
+        model: Fitted model (anything models.save_model() accepts)
+        metrics (dict): Output of evaluate_model()
+        dataset (PriceDataset): Data the model was built from
+        registry_dir (str): Asset registry (see asset_registry())
+        model_name (str): Registry model name
+        plots (dict): Optional plot name -> image path to copy into the bundle
+        forecast (pd.DataFrame): Forecast covering FORECAST_HORIZON future days;
+            generated from the model when omitted
+        source (dict): Optional provenance recorded in the manifest, e.g. the
+            source file path and hash
+
+    Returns:
+        str: Bundle id
+    """
+    registry_dir = Path(registry_dir)
+    bundles_dir = registry_dir / 'bundles'
+    staging = registry_dir / 'tmp' / uuid.uuid4().hex
+    (staging / 'plots').mkdir(parents=True)
+
+    try:
+        save_model(model, str(staging / 'model.npz'))
+
+        with open(staging / 'metrics.json', 'w') as f:
+            json.dump(_metrics_to_json(metrics), f)
+
+        if forecast is None:
+            from prophet_model import generate_forecast
+            forecast = generate_forecast(model, periods=FORECAST_HORIZON)
+        future = forecast.tail(FORECAST_HORIZON)
+        with open(staging / 'forecast.npz', 'wb') as f:
+            np.savez(
+                f,
+                ds=future['ds'].to_numpy(dtype='datetime64[D]'),
+                yhat=future['yhat'].to_numpy(dtype=np.float64),
+                yhat_lower=future['yhat_lower'].to_numpy(dtype=np.float64),
+                yhat_upper=future['yhat_upper'].to_numpy(dtype=np.float64),
+            )
+
+        for name, path in (plots or {}).items():
+            shutil.copyfile(path, staging / 'plots' / name)
+
+        files = {
+            str(path.relative_to(staging)): file_hash(path)
+            for path in sorted(staging.rglob('*')) if path.is_file()
+        }
+        content = {
+            'model_name': model_name,
+            'data_fingerprint': dataset.fingerprint(),
+            'last_date': str(dataset.dates[-1].astype('datetime64[D]')),
+            'last_close': float(dataset['Close'][-1]),
+            'files': files,
+            'source': source or {},
+        }
+        bundle_id = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+
+        manifest = dict(content, schema_version=BUNDLE_SCHEMA_VERSION,
+                        bundle_id=bundle_id, created_at=time.time())
+        with open(staging / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        bundles_dir.mkdir(parents=True, exist_ok=True)
+        target = bundles_dir / bundle_id
+        if target.exists():
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    print(f"Bundle published: {bundle_id}")
+    return bundle_id
+
+
+def current_bundle_id(registry_dir):
+    """
+    Return the id the CURRENT pointer refers to, or None.
+
+    Args:
+        registry_dir (str): Asset registry (see asset_registry())
+
+    Returns:
+        str or None: Bundle id
+    """
+    try:
+        return (Path(registry_dir) / 'CURRENT').read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _read_history(registry_dir):
+    try:
+        return (Path(registry_dir) / 'HISTORY').read_text().split()
+    except FileNotFoundError:
+        return []
+
+
+def list_bundles(registry_dir):
+    """
+    List bundle manifests, newest first.
+
+    Args:
+        registry_dir (str): Asset registry (see asset_registry())
+
+    Returns:
+        list: Manifest dicts
+    """
+    bundles_dir = Path(registry_dir) / 'bundles'
+    if not bundles_dir.exists():
+        return []
+    manifests = []
+    for path in bundles_dir.iterdir():
+        try:
+            with open(path / 'manifest.json') as f:
+                manifests.append(json.load(f))
+        except FileNotFoundError:  # staging leftovers, or deleted meanwhile
+            pass
+    return sorted(manifests, key=lambda m: m['created_at'], reverse=True)
+
+
+def promote(bundle_id, registry_dir):
+    """
+    Atomically point CURRENT at a bundle and record it in HISTORY.
+
+    Args:
+        bundle_id (str): Bundle to serve
+        registry_dir (str): Asset registry (see asset_registry())
+    """
+    registry_dir = Path(registry_dir)
+    with _registry_lock(registry_dir):
+        if not (registry_dir / 'bundles' / bundle_id / 'manifest.json').exists():
+            raise ValueError(f"Unknown bundle: {bundle_id}")
+
+        history = _read_history(registry_dir)
+        if not history or history[-1] != bundle_id:
+            history.append(bundle_id)
+            _atomic_write(registry_dir / 'HISTORY', '\n'.join(history) + '\n')
+        _atomic_write(registry_dir / 'CURRENT', bundle_id + '\n')
+    print(f"Promoted bundle {bundle_id}")
+
+
+def rollback(registry_dir, steps=1):
+    """
+    Point CURRENT back at a previously promoted bundle.
+
+    Args:
+        registry_dir (str): Asset registry (see asset_registry())
+        steps (int): Number of promotions to undo
+
+    Returns:
+        str: Bundle id now being served
+    """
+    registry_dir = Path(registry_dir)
+    with _registry_lock(registry_dir):
+        history = _read_history(registry_dir)
+        if len(history) <= steps:
+            raise ValueError("Not enough promotion history to roll back")
+
+        history = history[:-steps]
+        _atomic_write(registry_dir / 'HISTORY', '\n'.join(history) + '\n')
+        _atomic_write(registry_dir / 'CURRENT', history[-1] + '\n')
+    print(f"Rolled back to bundle {history[-1]}")
+    return history[-1]
+
+
+def garbage_collect(registry_dir, keep=DEFAULT_KEEP):
+    """
+    Delete bundles that are neither current, among the last `keep`
+    promoted, nor published after the current one (awaiting promotion), plus
+    staging directories abandoned for more than STAGING_MAX_AGE seconds.
+
+    Safe to run while other processes publish, promote or roll back in the
+    same registry: the registry lock is held from reading HISTORY until the
+    pruned HISTORY is written.
+
+    Args:
+        registry_dir (str): Asset registry (see asset_registry())
+        keep (int): Number of most recent promoted bundles to retain
+
+    Returns:
+        list: Ids of deleted bundles
+    """
+    registry_dir = Path(registry_dir)
+    with _registry_lock(registry_dir):
+        history = _read_history(registry_dir)
+        # Most recent distinct promotions first
+        retained = set(list(dict.fromkeys(reversed(history)))[:keep])
+        current = current_bundle_id(registry_dir)
+        if current:
+            retained.add(current)
+        manifests = {manifest['bundle_id']: manifest for manifest in list_bundles(registry_dir)}
+        current_created = (manifests[current]['created_at'] if current in manifests
+                           else float('-inf'))
+
+        deleted = []
+        bundles_dir = registry_dir / 'bundles'
+        for path in (bundles_dir.iterdir() if bundles_dir.exists() else []):
+            manifest = manifests.get(path.name)
+            if (path.name in retained or manifest is None
+                    or manifest['created_at'] > current_created):
+                continue
+            shutil.rmtree(path)
+            deleted.append(path.name)
+
+        # Rollback must never target a deleted bundle
+        if deleted and history:
+            pruned = [bundle_id for bundle_id in history if bundle_id not in deleted]
+            _atomic_write(registry_dir / 'HISTORY', '\n'.join(pruned) + '\n')
+
+    staging_dir = registry_dir / 'tmp'
+    cutoff = time.time() - STAGING_MAX_AGE
+    for path in (staging_dir.iterdir() if staging_dir.exists() else []):
+        try:
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def read_bundle_arrays(path):
+    """
+    Read a bundle's model and forecast arrays into memory.
+
+    Args:
+        path (str): Bundle directory
+
+    Returns:
+        dict: 'model:<name>' and 'forecast:<name>' -> array
+    """
+    arrays = {}
+    for prefix in ('model', 'forecast'):
+        with np.load(Path(path) / f'{prefix}.npz') as archive:
+            arrays.update({f'{prefix}:{key}': archive[key] for key in archive.files})
+    return arrays
+
+
+def _unprefix(arrays, prefix):
+    return {key[len(prefix):]: values for key, values in arrays.items() if key.startswith(prefix)}
+
+
+class Bundle:
+    """
+    A loaded bundle: model, metrics, precomputed forecast and plot paths.
+
+    Args:
+        path (str): Bundle directory
+        arrays (dict): Model and forecast arrays in read_bundle_arrays()
+            layout to use instead of reading model.npz and forecast.npz,
+            e.g. views attached from shared memory
+    """
+
+    def __init__(self, path, arrays=None):
+        self.path = Path(path)
+        with open(self.path / 'manifest.json') as f:
+            self.manifest = json.load(f)
+        self.bundle_id = self.manifest['bundle_id']
+        with open(self.path / 'metrics.json') as f:
+            self.metrics = _metrics_from_json(json.load(f))
+        if arrays is None:
+            self.model = load_model(str(self.path / 'model.npz'))
+            with np.load(self.path / 'forecast.npz') as archive:
+                forecast = {key: archive[key] for key in archive.files}
+        else:
+            self.model = model_from_arrays(_unprefix(arrays, 'model:'))
+            forecast = _unprefix(arrays, 'forecast:')
+        self.forecast = pd.DataFrame({
+            'ds': pd.to_datetime(forecast['ds']),
+            'yhat': forecast['yhat'],
+            'yhat_lower': forecast['yhat_lower'],
+            'yhat_upper': forecast['yhat_upper'],
+        })
+        self.plots_dir = self.path / 'plots'
+
+    def forecast_for(self, horizon):
+        """
+        Precomputed forecast rows for the first `horizon` future days.
+
+        Args:
+            horizon (int): Number of days (at most FORECAST_HORIZON)
+
+        Returns:
+            pd.DataFrame or None: Forecast rows, or None if not precomputed
+        """
+        if 0 < horizon <= len(self.forecast):
+            return self.forecast.iloc[:horizon]
+        return None
+
+
+def load_bundle(registry_dir, bundle_id=None):
+    """
+    Load a bundle by id (default: the current one).
+
+    Args:
+        registry_dir (str): Asset registry (see asset_registry())
+        bundle_id (str): Bundle id, or None for CURRENT
+
+    Returns:
+        Bundle or None: Loaded bundle, or None if nothing is promoted
+    """
+    bundle_id = bundle_id or current_bundle_id(registry_dir)
+    if bundle_id is None:
+        return None
+    return Bundle(Path(registry_dir) / 'bundles' / bundle_id)
+
+
+class BundleWatcher:
+    """
+    Detects CURRENT pointer changes so serving processes hot-load new
+    bundles without restarting. poll() stats the pointer at most once per
+    `interval` seconds.
+    """
+
+    def __init__(self, registry_dir, interval=2.0):
+        self.registry_dir = Path(registry_dir)
+        self.interval = interval
+        self.bundle_id = None
+        self._next_check = 0.0
+
+    def due(self):
+        """bool: Whether poll() would check the pointer now."""
+        return time.monotonic() >= self._next_check
+
+    def poll(self, force=False):
+        """
+        Return a newly promoted Bundle, or None if CURRENT is unchanged.
+
+        Args:
+            force (bool): Check the pointer even if the interval has not elapsed
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return None
+        self._next_check = now + self.interval
+
+        bundle_id = current_bundle_id(self.registry_dir)
+        if bundle_id is None or bundle_id == self.bundle_id:
+            return None
+        bundle = load_bundle(self.registry_dir, bundle_id)
+        self.bundle_id = bundle_id
+        return bundle
+
+
+def _resolve_asset(parser, args):
+    if args.asset:
+        return asset_registry(args.asset, args.registry)
+    assets = list_assets(args.registry)
+    if len(assets) != 1:
+        parser.error(f"--asset is required (assets: {', '.join(assets) or 'none'})")
+    return asset_registry(assets[0], args.registry)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the model bundle registry")
+    parser.add_argument('--registry', default=str(REGISTRY_DIR))
+    parser.add_argument('--asset', help="Asset name (required when several exist)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="List bundles")
+    promote_parser = sub.add_parser('promote', help="Serve a bundle")
+    promote_parser.add_argument('bundle_id')
+    rollback_parser = sub.add_parser('rollback', help="Serve the previously promoted bundle")
+    rollback_parser.add_argument('--steps', type=int, default=1)
+    gc_parser = sub.add_parser('gc', help="Delete old bundles")
+    gc_parser.add_argument('--keep', type=int, default=DEFAULT_KEEP)
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        assets = [args.asset] if args.asset else list_assets(args.registry)
+        for asset in assets:
+            registry = asset_registry(asset, args.registry)
+            current = current_bundle_id(registry)
+            print(f"{asset}:")
+            for manifest in list_bundles(registry):
+                marker = '*' if manifest['bundle_id'] == current else ' '
+                created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manifest['created_at']))
+                print(f"  {marker} {manifest['bundle_id']}  {created}  {manifest['model_name']:<16}"
+                      f"data={manifest['data_fingerprint'][:8]}")
+        return
+
+    registry = _resolve_asset(parser, args)
+    if args.command == 'promote':
+        promote(args.bundle_id, registry)
+    elif args.command == 'rollback':
+        rollback(registry, args.steps)
+    elif args.command == 'gc':
+        deleted = garbage_collect(registry, args.keep)
+        print(f"Deleted {len(deleted)} bundle(s)")
+
+
+if __name__ == '__main__':
+    main()
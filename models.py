@@ -0,0 +1,607 @@
+"""
+Baseline Model Registry Module
+NumPy-only forecasting baselines (naive, drift, seasonal naive, simple and
+Holt exponential smoothing, least-squares AR(p)) on log prices, behind the
+same fit/predict/save/load interface as the Prophet model
+
+Baseline models mimic the parts of the Prophet API the rest of the project
+uses (make_future_dataframe, predict, history_dates, plot), so
+generate_forecast(), evaluate_model() and plot_forecast() accept them as-is.
+'ensemble' combines Prophet variants and baselines (see ensemble.py), and
+'prophet_regressors' is Prophet with lagged extra regressors (see regressors.py).
+
+Usage: python models.py   (benchmark every model against Prophet)
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from compact_model import CompactProphet, plot_history_forecast, read_meta
+from data_loader import as_prophet_frame
+from instrumentation import instrument
+
+
+SCHEMA_VERSION = 1
+INTERVAL_WIDTH = 0.95
+
+
+class BaselineModel:
+    """
+    Base class for NumPy baselines fitted on log prices.
+
+    Subclasses implement _fit(y), which must set self.fitted (one-step
+    in-sample predictions), self.sigma (residual std) and self.state, and
+    _forecast(h), which returns the mean and std of log price h steps ahead.
+    """
+
+    name = None
+
+    def __init__(self, interval_width=INTERVAL_WIDTH, **params):
+        self.interval_width = interval_width
+        self.params = params
+        self.history_dates = None
+        self.y = None
+        self.fitted = None
+        self.sigma = None
+        self.state = {}
+        self.extra_regressors = {}
+
+    def fit(self, train_df):
+        """
+        Fit the model on Prophet-format training data.
+
+        Args:
+            train_df (pd.DataFrame or PriceDataset): Training data with 'ds' and 'y'
+
+        Returns:
+            BaselineModel: self
+        """
+        frame = as_prophet_frame(train_df)
+        self.history_dates = pd.Series(pd.to_datetime(frame['ds'].to_numpy()))
+        self.y = np.log(frame['y'].to_numpy(dtype=np.float64))
+        self._fit(self.y)
+        return self
+
+    def make_future_dataframe(self, periods, include_history=True):
+        """
+        Same contract as Prophet.make_future_dataframe for daily data.
+
+        Args:
+            periods (int): Number of days to forecast
+            include_history (bool): Whether to include the training dates
+
+        Returns:
+            pd.DataFrame: Dataframe with a 'ds' column
+        """
+        history = self.history_dates.to_numpy(dtype='datetime64[ns]')
+        future = history[-1] + np.arange(1, periods + 1) * np.timedelta64(1, 'D')
+        dates = np.concatenate((history, future)) if include_history else future
+        return pd.DataFrame({'ds': dates})
+
+    def predict(self, future):
+        """
+        Predict for the dates in a future dataframe.
+
+        Training dates get one-step in-sample predictions; later dates get
+        h-step forecasts with normal intervals on the log scale.
+
+        Args:
+            future (pd.DataFrame): Dataframe with a 'ds' column
+
+        Returns:
+            pd.DataFrame: 'ds', 'yhat', 'yhat_lower' and 'yhat_upper' columns
+        """
+        ds = pd.to_datetime(future['ds']).to_numpy()
+        last = self.history_dates.iloc[-1].to_datetime64()
+        in_sample = ds <= last
+
+        mean = np.empty(len(ds))
+        sd = np.full(len(ds), self.sigma)
+
+        positions = np.searchsorted(self.history_dates.to_numpy(), ds[in_sample])
+        mean[in_sample] = self.fitted[np.clip(positions, 0, len(self.fitted) - 1)]
+
+        horizons = ((ds[~in_sample] - last) // np.timedelta64(1, 'D')).astype(np.int64)
+        if len(horizons):
+            mean[~in_sample], sd[~in_sample] = self._forecast(horizons)
+
+        z = NormalDist().inv_cdf(0.5 + self.interval_width / 2)
+        return pd.DataFrame({
+            'ds': ds,
+            'yhat': np.exp(mean),
+            'yhat_lower': np.exp(mean - z * sd),
+            'yhat_upper': np.exp(mean + z * sd),
+        })
+
+    def plot(self, forecast):
+        """
+        Plot history and forecast band, like Prophet.plot.
+
+        Args:
+            forecast (pd.DataFrame): Output of predict()
+
+        Returns:
+            matplotlib.figure.Figure: Matplotlib figure object
+        """
+        return plot_history_forecast(self.history_dates, np.exp(self.y), forecast)
+
+    def save(self, filepath):
+        """
+        Save the fitted model to an .npz file with a JSON metadata header.
+
+        Args:
+            filepath (str): Path to save the model
+        """
+        meta = {
+            'schema_version': SCHEMA_VERSION,
+            'model': self.name,
+            'params': self.params,
+            'interval_width': self.interval_width,
+            'sigma': self.sigma,
+        }
+        arrays = {
+            'meta': np.array(json.dumps(meta)),
+            'dates': self.history_dates.to_numpy(dtype='datetime64[D]'),
+            'y': self.y,
+            'fitted': self.fitted,
+        }
+        arrays.update({f'state:{k}': np.asarray(v) for k, v in self.state.items()})
+        with open(filepath, 'wb') as f:
+            np.savez(f, **arrays)
+        print(f"Model saved to {filepath}")
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load a model written by save().
+
+        Args:
+            filepath (str): Path to the saved model
+
+        Returns:
+            BaselineModel: Loaded model of the saved subclass
+        """
+        with np.load(filepath) as archive:
+            model = cls.from_arrays({key: archive[key] for key in archive.files})
+        print(f"Model loaded from {filepath}")
+        return model
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Build a model from the arrays of a saved file, e.g. zero-copy views
+        attached from shared memory.
+
+        Args:
+            arrays (dict): Array name -> array, including the 'meta' header
+
+        Returns:
+            BaselineModel: Model of the saved subclass
+        """
+        meta = json.loads(str(arrays['meta']))
+        if meta['schema_version'] > SCHEMA_VERSION:
+            raise ValueError(f"Unsupported model schema version {meta['schema_version']}")
+        model = MODEL_REGISTRY[meta['model']](interval_width=meta['interval_width'],
+                                              **meta['params'])
+        model.history_dates = pd.Series(pd.to_datetime(arrays['dates']))
+        model.y = arrays['y']
+        model.fitted = arrays['fitted']
+        model.state = {k[len('state:'):]: v for k, v in arrays.items() if k.startswith('state:')}
+        model.sigma = meta['sigma']
+        return model
+
+    def _fit(self, y):
+        raise NotImplementedError
+
+    def _forecast(self, h):
+        raise NotImplementedError
+
+
+class NaiveModel(BaselineModel):
+    """Random walk: every forecast equals the last observed price."""
+
+    name = 'naive'
+
+    def _fit(self, y):
+        self.fitted = np.concatenate(([y[0]], y[:-1]))
+        self.sigma = float(np.std(np.diff(y), ddof=1))
+        self.state = {'last': y[-1]}
+
+    def _forecast(self, h):
+        return np.full(len(h), float(self.state['last'])), self.sigma * np.sqrt(h)
+
+
+class DriftModel(BaselineModel):
+    """Random walk with drift equal to the average historical log return."""
+
+    name = 'drift'
+
+    def _fit(self, y):
+        drift = (y[-1] - y[0]) / (len(y) - 1)
+        self.fitted = np.concatenate(([y[0]], y[:-1] + drift))
+        self.sigma = float(np.std(np.diff(y) - drift, ddof=1))
+        self.state = {'last': y[-1], 'drift': drift, 'n': len(y)}
+
+    def _forecast(self, h):
+        n = int(self.state['n'])
+        mean = float(self.state['last']) + h * float(self.state['drift'])
+        return mean, self.sigma * np.sqrt(h * (1 + h / (n - 1)))
+
+
+class SeasonalNaiveModel(BaselineModel):
+    """Repeats the last observed season (weekly by default)."""
+
+    name = 'seasonal_naive'
+
+    def __init__(self, season_length=7, **kwargs):
+        super().__init__(season_length=season_length, **kwargs)
+        self.season_length = season_length
+
+    def _fit(self, y):
+        m = self.season_length
+        self.fitted = np.concatenate((y[:m], y[:-m]))
+        self.sigma = float(np.std(y[m:] - y[:-m], ddof=1))
+        self.state = {'last_season': y[-m:]}
+
+    def _forecast(self, h):
+        m = self.season_length
+        mean = self.state['last_season'][(h - 1) % m]
+        return mean, self.sigma * np.sqrt((h - 1) // m + 1)
+
+
+def _ses_levels(y, alphas):
+    """Run simple exponential smoothing for every alpha at once."""
+    level = np.full(len(alphas), y[0])
+    sse = np.zeros(len(alphas))
+    for value in y[1:]:
+        error = value - level
+        sse += error * error
+        level += alphas * error
+    return level, sse
+
+
+class SimpleExpSmoothingModel(BaselineModel):
+    """Simple exponential smoothing with alpha chosen by grid-search SSE."""
+
+    name = 'ses'
+
+    def __init__(self, alpha=None, **kwargs):
+        super().__init__(alpha=alpha, **kwargs)
+        self.alpha = alpha
+
+    def _fit(self, y):
+        alphas = np.array([self.alpha]) if self.alpha else np.linspace(0.05, 1.0, 20)
+        _, sse = _ses_levels(y, alphas)
+        alpha = float(alphas[np.argmin(sse)])
+
+        # One more pass at the chosen alpha to record in-sample predictions
+        fitted = np.empty_like(y)
+        level = y[0]
+        for t, value in enumerate(y):
+            fitted[t] = level
+            level += alpha * (value - level)
+        self.fitted = fitted
+        self.sigma = float(np.std(y[1:] - fitted[1:], ddof=1))
+        self.state = {'alpha': alpha, 'level': level}
+
+    def _forecast(self, h):
+        alpha = float(self.state['alpha'])
+        mean = np.full(len(h), float(self.state['level']))
+        return mean, self.sigma * np.sqrt(1 + (h - 1) * alpha ** 2)
+
+
+class HoltModel(BaselineModel):
+    """Holt's linear trend method with (alpha, beta) chosen by grid-search SSE."""
+
+    name = 'holt'
+
+    def __init__(self, alpha=None, beta=None, **kwargs):
+        super().__init__(alpha=alpha, beta=beta, **kwargs)
+        self.alpha = alpha
+        self.beta = beta
+
+    @staticmethod
+    def _run(y, alphas, betas, fitted=None):
+        level = np.full(len(alphas), y[1])
+        trend = np.full(len(alphas), y[1] - y[0])
+        sse = np.zeros(len(alphas))
+        for t in range(2, len(y)):
+            forecast = level + trend
+            if fitted is not None:
+                fitted[t] = forecast[0]
+            error = y[t] - forecast
+            sse += error * error
+            level = forecast + alphas * error
+            trend = trend + alphas * betas * error
+        return level, trend, sse
+
+    def _fit(self, y):
+        grid = np.linspace(0.05, 1.0, 10)
+        alpha_grid = np.array([self.alpha]) if self.alpha else grid
+        beta_grid = np.array([self.beta]) if self.beta else np.linspace(0.01, 0.5, 10)
+        alphas, betas = (a.ravel() for a in np.meshgrid(alpha_grid, beta_grid))
+        _, _, sse = self._run(y, alphas, betas)
+        best = int(np.argmin(sse))
+
+        fitted = y.copy()
+        level, trend, _ = self._run(y, alphas[best:best + 1], betas[best:best + 1], fitted)
+        self.fitted = fitted
+        self.sigma = float(np.std(y[2:] - fitted[2:], ddof=1))
+        self.state = {'alpha': alphas[best], 'beta': betas[best],
+                      'level': level[0], 'trend': trend[0]}
+
+    def _forecast(self, h):
+        alpha, beta = float(self.state['alpha']), float(self.state['beta'])
+        mean = float(self.state['level']) + h * float(self.state['trend'])
+        j = np.arange(1, h.max())
+        cumulative = np.concatenate(([0.0], np.cumsum((alpha * (1 + j * beta)) ** 2)))
+        return mean, self.sigma * np.sqrt(1 + cumulative[h - 1])
+
+
+class ARModel(BaselineModel):
+    """AR(p) with intercept on log prices, fitted by least squares."""
+
+    name = 'ar'
+
+    def __init__(self, order=7, **kwargs):
+        super().__init__(order=order, **kwargs)
+        self.order = order
+
+    def _fit(self, y):
+        p = self.order
+        lags = np.lib.stride_tricks.sliding_window_view(y[:-1], p)[:, ::-1]
+        design = np.column_stack((np.ones(len(lags)), lags))
+        coef, *_ = np.linalg.lstsq(design, y[p:], rcond=None)
+
+        self.fitted = np.concatenate((y[:p], design @ coef))
+        self.sigma = float(np.std(y[p:] - self.fitted[p:], ddof=p + 1))
+        self.state = {'coef': coef, 'recent': y[-p:][::-1].copy()}
+
+    def _forecast(self, h):
+        coef = self.state['coef']
+        intercept, phi = coef[0], coef[1:]
+        steps = int(h.max())
+
+        recent = list(self.state['recent'])
+        path = np.empty(steps)
+        for step in range(steps):
+            path[step] = intercept + phi @ np.asarray(recent[:len(phi)])
+            recent.insert(0, path[step])
+
+        # psi weights of the MA(inf) representation give the h-step variance
+        psi = np.zeros(steps)
+        psi[0] = 1.0
+        for j in range(1, steps):
+            k = min(j, len(phi))
+            psi[j] = phi[:k] @ psi[j - 1::-1][:k]
+        sd = self.sigma * np.sqrt(np.cumsum(psi ** 2))
+        return path[h - 1], sd[h - 1]
+
+
+MODEL_REGISTRY = {
+    model.name: model
+    for model in (NaiveModel, DriftModel, SeasonalNaiveModel,
+                  SimpleExpSmoothingModel, HoltModel, ARModel)
+}
+
+MODEL_NAMES = ('prophet', 'prophet_regressors') + tuple(MODEL_REGISTRY) + ('ensemble',)
+
+# Models saved by their own save()/to_arrays()/load()/from_arrays()
+COMPOSITE_MODELS = ('ensemble', 'prophet_regressors')
+
+
+@instrument()
+def fit_model(name, train_df, **params):
+    """
+    Fit a model selected by name.
+
+    Args:
+        name (str): 'prophet', 'prophet_regressors', 'ensemble' or a key of
+            MODEL_REGISTRY
+        train_df (pd.DataFrame or PriceDataset): Training data in Prophet format
+            (a PriceDataset with the regressor columns for 'prophet_regressors')
+        **params: Model-specific parameters (for Prophet, train_prophet_model()
+            arguments plus 'settings' for stan_fit.fit_prophet(); for the
+            regressor model, fit_regressor_model() arguments; for the
+            ensemble, fit_ensemble() arguments)
+
+    Returns:
+        Prophet, RegressorModel, BaselineModel or EnsembleModel: Fitted model
+    """
+    if name == 'prophet':
+        from stan_fit import fit_prophet
+        return fit_prophet(train_df, **params)
+    if name == 'prophet_regressors':
+        from regressors import fit_regressor_model
+        return fit_regressor_model(train_df, **params)
+    if name == 'ensemble':
+        from ensemble import fit_ensemble
+        return fit_ensemble(train_df, **params)
+    if name not in MODEL_REGISTRY:
+        raise ValueError(f"Unknown model '{name}'. Choose from: {', '.join(MODEL_NAMES)}")
+    return MODEL_REGISTRY[name](**params).fit(train_df)
+
+
+def refit_model(name, evaluated, data, **params):
+    """
+    Refit an evaluated model on the full history for serving, so its
+    forecasts start the day after the last observation.
+
+    Prophet (with or without regressors) warm-starts from the evaluated
+    fit's parameters, falling back to a cold start when their shapes no
+    longer match.
+
+    Args:
+        name (str): Model name, as for fit_model()
+        evaluated: Model of the same kind fitted on the training split
+        data (pd.DataFrame or PriceDataset): Full history in Prophet format
+        **params: Passed through to fit_model()
+
+    Returns:
+        Prophet, RegressorModel, BaselineModel or EnsembleModel: Model fitted
+        on all of `data`
+    """
+    if name in ('prophet', 'prophet_regressors'):
+        from prophet_model import warm_start_params
+        prophet = evaluated.model if name == 'prophet_regressors' else evaluated
+        try:
+            return fit_model(name, data, init=warm_start_params(prophet), **params)
+        except (RuntimeError, ValueError):
+            pass
+    return fit_model(name, data, **params)
+
+
+def save_model(model, filepath):
+    """
+    Save any registry model in its compact .npz format.
+
+    Args:
+        model (Prophet, CompactProphet, RegressorModel, BaselineModel or
+            EnsembleModel): Fitted model
+        filepath (str): Path to save the model
+    """
+    if isinstance(model, BaselineModel) or getattr(model, 'name', None) in COMPOSITE_MODELS:
+        model.save(filepath)
+    else:
+        from prophet_model import save_model as save_prophet_model
+        save_prophet_model(model, filepath)
+
+
+def load_model(filepath):
+    """
+    Load any model saved by save_model().
+
+    Compact files are dispatched on their header, so this never imports
+    prophet or Stan; legacy .pkl Prophet files go through prophet_model.
+
+    Args:
+        filepath (str): Path to the saved model
+
+    Returns:
+        CompactProphet, RegressorModel, BaselineModel, EnsembleModel or
+        Prophet: Loaded model
+    """
+    if Path(filepath).suffix == '.pkl':
+        from prophet_model import load_model as load_prophet_model
+        return load_prophet_model(filepath)
+    kind = read_meta(filepath)['model']
+    if kind == 'prophet':
+        model = CompactProphet.load(filepath)
+        print(f"Model loaded from {filepath}")
+        return model
+    if kind == 'ensemble':
+        from ensemble import EnsembleModel
+        return EnsembleModel.load(filepath)
+    if kind == 'prophet_regressors':
+        from regressors import RegressorModel
+        return RegressorModel.load(filepath)
+    return BaselineModel.load(filepath)
+
+
+def model_from_arrays(arrays):
+    """
+    Build any compact model from its arrays (see load_model()).
+
+    Args:
+        arrays (dict): Array name -> array, including the 'meta' header
+
+    Returns:
+        CompactProphet, RegressorModel, BaselineModel or EnsembleModel: Model
+        sharing the given arrays
+    """
+    kind = json.loads(str(arrays['meta']))['model']
+    if kind == 'prophet':
+        return CompactProphet.from_arrays(arrays)
+    if kind == 'ensemble':
+        from ensemble import EnsembleModel
+        return EnsembleModel.from_arrays(arrays)
+    if kind == 'prophet_regressors':
+        from regressors import RegressorModel
+        return RegressorModel.from_arrays(arrays)
+    return BaselineModel.from_arrays(arrays)
+
+
+def model_arrays(model):
+    """
+    A fitted model's compact arrays (the contents of its saved .npz), the
+    inverse of model_from_arrays().
+
+    Args:
+        model: Any model accepted by save_model()
+
+    Returns:
+        dict: Array name -> array, including the 'meta' header
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'model.npz'
+        save_model(model, str(path))
+        with np.load(path) as archive:
+            return {key: archive[key] for key in archive.files}
+
+
+def model_filename(name):
+    """Default file name for a saved model of the given type."""
+    return f'{name}_model.npz'
+
+
+def benchmark_models(train_df, test_df, names=MODEL_NAMES, horizon=30):
+    """
+    Compare fit/predict latency and holdout accuracy across models.
+
+    Args:
+        train_df (pd.DataFrame or PriceDataset): Training data
+        test_df (pd.DataFrame or PriceDataset): Holdout data
+        names (tuple): Model names to compare
+        horizon (int): Forecast horizon used for the predict timing
+
+    Returns:
+        list: One dict per model with 'fit_s', 'predict_s', 'mae' and 'mape'
+    """
+    from model_evaluation import evaluate_model
+    from prophet_model import generate_forecast
+
+    results = []
+    for name in names:
+        start = time.perf_counter()
+        model = fit_model(name, train_df)
+        fit_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        generate_forecast(model, horizon)
+        predict_s = time.perf_counter() - start
+
+        metrics = evaluate_model(model, test_df)
+        results.append({'model': name, 'fit_s': fit_s, 'predict_s': predict_s,
+                        'mae': metrics['mae'], 'mape': metrics['mape']})
+    return results
+
+
+def print_benchmark(results):
+    """
+    Print benchmark_models() results as a table.
+
+    Args:
+        results (list): Output of benchmark_models()
+    """
+    print("=" * 70)
+    print(f"{'Model':<16}{'Fit (ms)':>12}{'Predict (ms)':>14}{'MAE ($)':>14}{'MAPE (%)':>12}")
+    print("-" * 70)
+    for r in results:
+        print(f"{r['model']:<16}{r['fit_s'] * 1e3:>12.1f}{r['predict_s'] * 1e3:>14.1f}"
+              f"{r['mae']:>14.2f}{r['mape']:>12.2f}")
+    print("=" * 70)
+    print()
+
+
+if __name__ == '__main__':
+    from data_loader import load_dataset, get_train_test_split
+
+    csv_path = sorted(Path(__file__).parent.glob('*.csv'))[0]
+    train, test = get_train_test_split(load_dataset(str(csv_path)), test_days=90)
+    print_benchmark(benchmark_models(train, test))
@@ -0,0 +1,254 @@
+"""
+Memoized Stage Pipeline Module
+Runs a graph of named stages with declared inputs, caching each stage's
+output on disk under a key derived from its configuration, its code and the
+keys of its inputs, so only stages whose inputs, settings or code changed
+are recomputed
+
+Keys are computed without running anything: a stage's key hashes its name,
+config, the source of its function and of the modules it declares, and the
+keys of its input stages. An unchanged rerun therefore only loads the
+outputs that are actually needed. Stages that become ready together run in
+parallel worker processes.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import instrumentation
+
+
+# Cached outputs kept per stage (older keys are deleted)
+KEEP_PER_STAGE = 3
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    func is called as func(*input_outputs, **config); it must be a
+    module-level function so it can run in a worker process.
+
+    Args:
+        name (str): Unique stage name
+        func (callable): Function computing the stage output
+        inputs (tuple): Names of the stages whose outputs func receives
+        config (dict): JSON-serializable keyword arguments (part of the key)
+        code (tuple): Modules whose source is part of the key, in addition
+            to func's own source
+        cache (bool): Whether the output is cached (False for side effects
+            such as publishing)
+    """
+
+    def __init__(self, name, func, inputs=(), config=None, code=(), cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.config = dict(config or {})
+        self.code = tuple(code)
+        self.cache = cache
+
+    def code_hash(self):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(inspect.getsource(self.func).encode())
+        for module in self.code:
+            digest.update(Path(inspect.getsourcefile(module)).read_bytes())
+        return digest.hexdigest()
+
+
+def _run_stage(func, args, config, trace_memory=False):
+    """Run a stage function, returning its output, duration and the
+    instrumentation measurements recorded while it ran."""
+    if trace_memory:
+        instrumentation.enable_memory_tracking()
+    with instrumentation.capture() as measurements:
+        start = time.perf_counter()
+        output = func(*args, **config)
+        seconds = time.perf_counter() - start
+    return output, seconds, measurements
+
+
+class Pipeline:
+    """
+    Stage graph with an on-disk output cache.
+
+    Args:
+        stages (list): Stage objects, in any order
+        cache_dir (str): Directory for cached outputs ('<stage>-<key>.pkl')
+        workers (int): Worker processes for stages that are ready together
+            (1 runs everything in-process)
+    """
+
+    def __init__(self, stages, cache_dir, workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers or os.cpu_count() or 1
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{name}'")
+        self.keys = {}
+        for name in self.stages:
+            self._key(name, ())
+
+    def _key(self, name, visiting):
+        if name in self.keys:
+            return self.keys[name]
+        if name in visiting:
+            raise ValueError(f"Cycle in pipeline at stage '{name}'")
+        stage = self.stages[name]
+        payload = {
+            'name': name,
+            'config': stage.config,
+            'code': stage.code_hash(),
+            'inputs': [self._key(dep, visiting + (name,)) for dep in stage.inputs],
+        }
+        key = hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(),
+                              digest_size=12).hexdigest()
+        self.keys[name] = key
+        return key
+
+    def _cache_path(self, name):
+        return self.cache_dir / f'{name}-{self.keys[name]}.pkl'
+
+    def _is_cached(self, name):
+        return self.stages[name].cache and self._cache_path(name).exists()
+
+    def _load(self, name):
+        with open(self._cache_path(name), 'rb') as f:
+            return pickle.load(f)
+
+    def _store(self, name, output):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._cache_path(name)
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        others = sorted((p for p in self.cache_dir.glob(f'{name}-*.pkl') if p != path),
+                        key=lambda p: p.stat().st_mtime)
+        for stale in others[:max(len(others) - (KEEP_PER_STAGE - 1), 0)]:
+            stale.unlink(missing_ok=True)
+
+    def dependents(self, names):
+        """
+        Names of the given stages plus every stage downstream of them.
+
+        Args:
+            names (iterable): Stage names
+
+        Returns:
+            set: Stage names
+        """
+        result = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for stage in self.stages.values():
+                if stage.name not in result and result.intersection(stage.inputs):
+                    result.add(stage.name)
+                    changed = True
+        return result
+
+    def run(self, targets=None, force=()):
+        """
+        Produce the outputs of the target stages.
+
+        A stage runs when it is not cached or is forced; its inputs are then
+        loaded from the cache or computed. Forcing a stage also reruns the
+        stages downstream of it.
+
+        Args:
+            targets (iterable): Stages to produce (default: all)
+            force (iterable): Stages to recompute even if cached; 'all'
+                recomputes everything
+
+        Returns:
+            tuple: (outputs, report) where outputs maps each target to its
+            output and report is a list of (stage, 'cached' or 'ran', seconds)
+        """
+        targets = list(targets or self.stages)
+        for name in list(targets) + [n for n in force if n != 'all']:
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(self.stages)}")
+        forced = set(self.stages) if 'all' in force else self.dependents(force)
+
+        # Stages that must execute: stale targets and, transitively, their stale inputs
+        to_run = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in to_run or (name not in forced and self._is_cached(name)):
+                continue
+            to_run.add(name)
+            pending.extend(self.stages[name].inputs)
+
+        outputs = {}
+        report = []
+
+        def resolve(name):
+            if name not in outputs:
+                start = time.perf_counter()
+                outputs[name] = self._load(name)
+                report.append((name, 'cached', time.perf_counter() - start))
+            return outputs[name]
+
+        executor = None
+        try:
+            remaining = [name for name in self.stages if name in to_run]
+            while remaining:
+                ready = [name for name in remaining
+                         if all(dep in outputs or dep not in to_run
+                                for dep in self.stages[name].inputs)]
+                calls = {
+                    name: ([resolve(dep) for dep in self.stages[name].inputs],
+                           self.stages[name].config)
+                    for name in ready
+                }
+                if len(ready) > 1 and self.workers > 1:
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=self.workers)
+                    trace_memory = instrumentation.memory_tracking_enabled()
+                    futures = {
+                        name: executor.submit(_run_stage, self.stages[name].func,
+                                              *calls[name], trace_memory)
+                        for name in ready
+                    }
+                    results = {name: future.result() for name, future in futures.items()}
+                    # Timers inside workers recorded into the worker's process
+                    for output, seconds, measurements in results.values():
+                        instrumentation.merge(measurements)
+                else:
+                    results = {
+                        name: _run_stage(self.stages[name].func, *calls[name])
+                        for name in ready
+                    }
+                for name, (output, seconds, _) in results.items():
+                    outputs[name] = output
+                    report.append((name, 'ran', seconds))
+                    if self.stages[name].cache:
+                        self._store(name, output)
+                remaining = [name for name in remaining if name not in ready]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return {name: resolve(name) for name in targets}, report
+
+
+def print_report(report):
+    """
+    Print which stages ran or were loaded from cache, with timings.
+
+    Args:
+        report (list): (stage, status, seconds) tuples from Pipeline.run()
+    """
+    for name, status, seconds in report:
+        print(f"   {name:<20} {status:<7} {seconds:7.2f}s")
@@ -10,15 +10,30 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import pickle
 
+from data_loader import as_prophet_frame
+from compact_model import CompactProphet, export_prophet
+from instrumentation import instrument
 
-def train_prophet_model(train_df, yearly_seasonality=True, weekly_seasonality=True):
+
+@instrument()
+def train_prophet_model(train_df, yearly_seasonality=True, weekly_seasonality=True,
+                        regressors=None, init=None, fit_settings=None,
+                        changepoint_prior_scale=0.05):
     """
     Initialize and train Prophet model on historical data.
     
     Args:
-        train_df (pd.DataFrame): Training data with 'ds' (date) and 'y' (price) columns
+        train_df (pd.DataFrame or PriceDataset): Training data with 'ds' (date) and 'y' (price) columns
         yearly_seasonality (bool): Whether to include yearly seasonality
         weekly_seasonality (bool): Whether to include weekly seasonality
+        regressors (RegressorPipeline): Optional extra regressors added via add_regressor
+        init (dict): Optional starting parameters for the optimizer, e.g. from
+            warm_start_params() of a previous fit
+        fit_settings (dict): Optional cmdstanpy optimize() arguments such as
+            'algorithm' and 'iter'. When given, Prophet's own retry with
+            Newton is disabled so the caller decides on fallbacks (see stan_fit.py)
+        changepoint_prior_scale (float): Trend flexibility (larger follows
+            the data more closely)
     
     Returns:
         Prophet: Trained Prophet model
@@ -29,49 +44,93 @@ def train_prophet_model(train_df, yearly_seasonality=True, weekly_seasonality=Tr
         weekly_seasonality=weekly_seasonality,
         daily_seasonality=False,
         interval_width=0.95,
-        changepoint_prior_scale=0.05
+        changepoint_prior_scale=changepoint_prior_scale
     )
     
+    if regressors is not None:
+        for name in regressors.names:
+            model.add_regressor(name)
+        train_frame = regressors.training_frame(train_df)
+    else:
+        train_frame = as_prophet_frame(train_df)
+    
+    fit_kwargs = dict(fit_settings or {})
+    if fit_settings is not None:
+        model.stan_backend.newton_fallback = False
+    if init is not None:
+        fit_kwargs['init'] = init
+    
     print("Training Prophet model...")
     # Fit model on training data
-    model.fit(train_df)
+    model.fit(train_frame, **fit_kwargs)
     print("Model training completed.\n")
     
     return model
 
 
-def create_future_dataframe(model, periods):
+def warm_start_params(model):
+    """
+    Fitted parameters of a model, in the form Prophet.fit(init=...) expects.
+
+    Starting the optimizer from a previous fit on mostly the same history
+    converges in far fewer iterations than the default initialization.
+    
+    Args:
+        model (Prophet or CompactProphet): Previously fitted model
+    
+    Returns:
+        dict: 'k', 'm', 'sigma_obs' (floats), 'delta' and 'beta' (arrays)
+    """
+    params = model.arrays if isinstance(model, CompactProphet) else model.params
+    return {
+        'k': float(np.ravel(params['k'])[0]),
+        'm': float(np.ravel(params['m'])[0]),
+        'sigma_obs': float(np.ravel(params['sigma_obs'])[0]),
+        'delta': np.ravel(params['delta']),
+        'beta': np.ravel(params['beta']),
+    }
+
+
+def create_future_dataframe(model, periods, regressors=None):
     """
     Create a future dataframe for making predictions.
     
     Args:
         model (Prophet): Trained Prophet model
         periods (int): Number of days to forecast
+        regressors (RegressorPipeline): Pipeline the model was trained with, if any
     
     Returns:
-        pd.DataFrame: Future dataframe with 'ds' column
+        pd.DataFrame: Future dataframe with 'ds' column (plus regressor columns)
     """
+    if regressors is not None:
+        return regressors.future_frame(model, periods)
+    if model.extra_regressors:
+        raise ValueError("Model was trained with extra regressors; pass its RegressorPipeline")
     future = model.make_future_dataframe(periods=periods)
     return future
 
 
-def generate_forecast(model, periods):
+@instrument()
+def generate_forecast(model, periods, regressors=None):
     """
     Generate forecast for specified number of days.
     
     Args:
         model (Prophet): Trained Prophet model
         periods (int): Number of days to forecast
+        regressors (RegressorPipeline): Pipeline the model was trained with, if any
     
     Returns:
         pd.DataFrame: Forecast dataframe with predictions and uncertainty intervals
     """
-    future = create_future_dataframe(model, periods)
+    future = create_future_dataframe(model, periods, regressors)
     forecast = model.predict(future)
     
     return forecast
 
 
+@instrument()
 def plot_forecast(model, forecast, title="Bitcoin Price Forecast", save_path=None):
     """
     Plot forecast using Prophet's built-in plotting.
@@ -98,6 +157,7 @@ def plot_forecast(model, forecast, title="Bitcoin Price Forecast", save_path=Non
     return fig
 
 
+@instrument()
 def plot_components(model, forecast, save_path=None):
     """
     Plot Prophet model components (trend, seasonality, etc).
@@ -122,14 +182,20 @@ def plot_components(model, forecast, save_path=None):
 
 def save_model(model, filepath):
     """
-    Save trained Prophet model to pickle file.
+    Save trained Prophet model in the compact, versioned .npz format.
+    
+    Only the fitted parameters and the metadata needed to forecast are
+    written (see compact_model.py); the training frame and Stan artifacts
+    are not.
     
     Args:
-        model (Prophet): Trained Prophet model
+        model (Prophet or CompactProphet): Trained Prophet model
         filepath (str): Path to save the model
     """
-    with open(filepath, 'wb') as f:
-        pickle.dump(model, f)
+    if isinstance(model, CompactProphet):
+        model.save(filepath)
+    else:
+        export_prophet(model, filepath)
     print(f"Model saved to {filepath}")
 
 
@@ -137,13 +203,20 @@ def load_model(filepath):
     """
     Load previously saved Prophet model.
     
+    Compact .npz files load without Stan; legacy .pkl files are still read
+    with pickle, which should only be used for trusted local files.
+    
     Args:
         filepath (str): Path to the saved model
     
     Returns:
-        Prophet: Loaded Prophet model
+        CompactProphet or Prophet: Loaded model
     """
-    with open(filepath, 'rb') as f:
-        model = pickle.load(f)
+    if Path(filepath).suffix == '.pkl':
+        print("Warning: loading legacy pickle model; re-save it in the compact format")
+        with open(filepath, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = CompactProphet.load(filepath)
     print(f"Model loaded from {filepath}")
     return model
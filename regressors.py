@@ -0,0 +1,337 @@
+"""
+Extra Regressor Pipeline Module
+Builds the aligned regressor design matrix for Prophet (Volume, Market Cap or
+derived features) once per data version, and serves matching future
+regressor values for any forecast horizon without rebuilding the frame
+
+Regressors are lagged: the value used for a date is the one of the bar LAG
+bars earlier, so a day's price is never fitted or predicted from that same
+day's volume or indicators. Dates after the model's training end hold the
+values of its last training bar instead of reading later actuals.
+
+RegressorModel is a registry model ('prophet_regressors' in models.py): it
+is trained, evaluated, published and served like any other model, with the
+regressors named by FORECAST_REGRESSORS (comma-separated, default log_Volume).
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import PriceDataset, as_prophet_frame
+from features import get_features
+from models import model_arrays, model_from_arrays
+
+
+SCHEMA_VERSION = 1
+
+# Prefix that applies log1p to a column, e.g. 'log_Volume'
+LOG_PREFIX = 'log_'
+
+# Regressors of the 'prophet_regressors' model
+DEFAULT_REGRESSORS = tuple(os.environ.get('FORECAST_REGRESSORS', 'log_Volume').split(','))
+
+# Bars by which regressor values trail the date they are used for
+LAG = 1
+
+# In-process cache: (data version, regressor names) -> design matrix
+_design_cache = {}
+
+
+def _resolve_column(dataset, name, cache_dir):
+    """Return the raw array for a dataset column or derived feature name."""
+    base = name[len(LOG_PREFIX):] if name.startswith(LOG_PREFIX) else name
+    if base in dataset:
+        values = dataset[base].astype(np.float64)
+    else:
+        features = get_features(dataset, cache_dir=cache_dir)
+        if base not in features:
+            raise ValueError(f"Unknown regressor '{name}': not a dataset column or feature")
+        values = features[base]
+    if base != name:
+        values = np.log1p(values)
+    return values
+
+
+def build_design_matrix(dataset, names, cache_dir=None):
+    """
+    Build the regressor matrix aligned to dataset.dates.
+
+    Leading NaNs (indicator warm-up) are back-filled and any later gaps are
+    forward-filled, since Prophet rejects missing regressor values.
+
+    Args:
+        dataset (PriceDataset): Source dataset
+        names (list): Regressor names (dataset columns, feature names, or
+            either with a 'log_' prefix)
+        cache_dir (str): Optional directory for the on-disk design matrix cache
+
+    Returns:
+        np.ndarray: 2-D float64 array of shape (len(dataset), len(names))
+    """
+    names = tuple(names)
+    key = (dataset.fingerprint(), names)
+    if key in _design_cache:
+        return _design_cache[key]
+
+    cache_path = None
+    if cache_dir is not None:
+        names_hash = hashlib.blake2b('|'.join(names).encode(), digest_size=4).hexdigest()
+        cache_path = Path(cache_dir) / f'regressors_{key[0]}_{names_hash}.npy'
+
+    if cache_path is not None and cache_path.exists():
+        matrix = np.load(cache_path)
+    else:
+        columns = {name: _resolve_column(dataset, name, cache_dir) for name in names}
+        matrix = pd.DataFrame(columns).ffill().bfill().to_numpy(dtype=np.float64)
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            np.save(cache_path, matrix)
+
+    _design_cache[key] = matrix
+    return matrix
+
+
+class RegressorPipeline:
+    """
+    Aligned regressor values for training and forecasting.
+
+    Each date gets the design-matrix row of the bar LAG bars before it;
+    dates past the model's training end hold the last training bar's values.
+    Future frames are cached per (history, horizon), so repeated requests
+    for the same horizon reuse the same frame.
+    """
+
+    def __init__(self, dataset, names, cache_dir=None):
+        self.names = tuple(names)
+        self.version = dataset.fingerprint()
+        self.dates = dataset.dates
+        self.values = build_design_matrix(dataset, self.names, cache_dir)
+        self._future_cache = {}
+
+    def lookup(self, dates, until=None):
+        """
+        Lagged regressor values for arbitrary dates.
+
+        Args:
+            dates (array-like): Dates to look up
+            until (date-like): Last date whose data may be used (the model's
+                training end); later dates hold the values of the last bar
+                up to it. None allows the whole dataset.
+
+        Returns:
+            np.ndarray: Array of shape (len(dates), len(names)); dates before
+            the LAG-th bar use the first row
+        """
+        stamps = np.asarray(dates, dtype='datetime64[ns]').astype(self.dates.dtype)
+        # searchsorted finds the first bar on or after each date; LAG bars back
+        # from it is the LAG-th bar strictly before the date
+        positions = np.searchsorted(self.dates, stamps) - LAG
+        if until is not None:
+            until = np.datetime64(pd.Timestamp(until).to_datetime64()).astype(self.dates.dtype)
+            last = np.searchsorted(self.dates, until, side='right') - 1
+            positions = np.minimum(positions, last)
+        return self.values[np.clip(positions, 0, len(self.dates) - 1)]
+
+    def _with_regressors(self, frame, until):
+        values = self.lookup(frame['ds'].to_numpy(), until)
+        for i, name in enumerate(self.names):
+            frame[name] = values[:, i]
+        return frame
+
+    def training_frame(self, train_df):
+        """
+        Attach regressor columns to Prophet training data.
+
+        Args:
+            train_df (pd.DataFrame or PriceDataset): Training data in Prophet format
+
+        Returns:
+            pd.DataFrame: 'ds', 'y' and one column per regressor
+        """
+        frame = as_prophet_frame(train_df)[['ds', 'y']].copy()
+        return self._with_regressors(frame, frame['ds'].iloc[-1])
+
+    def future_frame(self, model, periods):
+        """
+        Equivalent of model.make_future_dataframe(periods) with regressor columns.
+
+        Args:
+            model (Prophet): Model trained with this pipeline's regressors
+            periods (int): Number of days to forecast
+
+        Returns:
+            pd.DataFrame: Future dataframe with 'ds' and regressor columns
+        """
+        history = model.history_dates
+        key = (history.iloc[0], history.iloc[-1], len(history), periods)
+        frame = self._future_cache.get(key)
+        if frame is None:
+            frame = self._with_regressors(model.make_future_dataframe(periods=periods),
+                                          history.iloc[-1])
+            self._future_cache[key] = frame
+        return frame
+
+
+class RegressorModel:
+    """
+    Prophet model fitted with lagged extra regressors.
+
+    Implements the subset of the Prophet API used by this project
+    (make_future_dataframe, predict, history_dates, extra_regressors, plot):
+    predict() fills in the regressor columns itself, from the lagged values
+    of the training dates and, after the training end, the held values of
+    the last training bar. The model is therefore self-contained once saved.
+
+    Args:
+        model (Prophet or CompactProphet): Model fitted with add_regressor()
+            for each name
+        names (tuple): Regressor names, in the model's column order
+        values (np.ndarray): Regressor values of the training dates,
+            shape (len(history_dates), len(names))
+        held (np.ndarray): Regressor values used after the training end
+    """
+
+    name = 'prophet_regressors'
+
+    def __init__(self, model, names, values, held):
+        self.model = model
+        self.names = tuple(names)
+        self.values = values
+        self.held = held
+        self.history_dates = model.history_dates
+        # Regressor columns are filled in by predict(), not by the caller
+        self.extra_regressors = {}
+
+    def make_future_dataframe(self, periods, include_history=True):
+        """
+        Same contract as Prophet.make_future_dataframe.
+
+        Args:
+            periods (int): Number of days to forecast
+            include_history (bool): Whether to include the training dates
+
+        Returns:
+            pd.DataFrame: Dataframe with a 'ds' column
+        """
+        return self.model.make_future_dataframe(periods=periods, include_history=include_history)
+
+    def predict(self, future):
+        """
+        Predict for the dates in a future dataframe.
+
+        Args:
+            future (pd.DataFrame): Dataframe with a 'ds' column
+
+        Returns:
+            pd.DataFrame: Prophet-style forecast
+        """
+        frame = future[['ds']].copy()
+        ds = pd.to_datetime(frame['ds']).to_numpy()
+        history = self.history_dates.to_numpy(dtype='datetime64[ns]')
+        positions = np.clip(np.searchsorted(history, ds), 0, len(history) - 1)
+        rows = np.where((ds > history[-1])[:, None], self.held, self.values[positions])
+        for i, name in enumerate(self.names):
+            frame[name] = rows[:, i]
+        return self.model.predict(frame)
+
+    def plot(self, forecast):
+        """
+        Plot history and forecast band, like Prophet.plot.
+
+        Args:
+            forecast (pd.DataFrame): Output of predict()
+
+        Returns:
+            matplotlib.figure.Figure: Matplotlib figure object
+        """
+        return self.model.plot(forecast)
+
+    def save(self, filepath):
+        """
+        Save the model (the Prophet model's compact arrays under a 'model:'
+        prefix) to an .npz file with a JSON metadata header.
+
+        Args:
+            filepath (str): Path to save the model
+        """
+        with open(filepath, 'wb') as f:
+            np.savez(f, **self.to_arrays())
+        print(f"Model saved to {filepath}")
+
+    def to_arrays(self):
+        """dict: Array name -> array, the contents of a saved model."""
+        meta = {'schema_version': SCHEMA_VERSION, 'model': self.name, 'names': list(self.names)}
+        arrays = {'meta': np.array(json.dumps(meta)), 'values': self.values, 'held': self.held}
+        arrays.update({f'model:{key}': values for key, values in model_arrays(self.model).items()})
+        return arrays
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load a model written by save().
+
+        Args:
+            filepath (str): Path to the saved model
+
+        Returns:
+            RegressorModel: Loaded model
+        """
+        with np.load(filepath) as archive:
+            model = cls.from_arrays({key: archive[key] for key in archive.files})
+        print(f"Model loaded from {filepath}")
+        return model
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Build a model from the arrays of a saved file, e.g. zero-copy views
+        attached from shared memory.
+
+        Args:
+            arrays (dict): Array name -> array, including the 'meta' header
+
+        Returns:
+            RegressorModel: Model using the given arrays
+        """
+        meta = json.loads(str(arrays['meta']))
+        if meta['schema_version'] > SCHEMA_VERSION:
+            raise ValueError(f"Unsupported model schema version {meta['schema_version']}")
+        prefix = 'model:'
+        model = model_from_arrays({key[len(prefix):]: values for key, values in arrays.items()
+                                   if key.startswith(prefix)})
+        return cls(model, meta['names'], arrays['values'], arrays['held'])
+
+
+def fit_regressor_model(train_df, names=DEFAULT_REGRESSORS, cache_dir=None, **params):
+    """
+    Fit Prophet with lagged extra regressors.
+
+    Args:
+        train_df (PriceDataset): Training data including the regressor columns
+        names (tuple): Regressor names (see build_design_matrix())
+        cache_dir (str): Optional directory for the design matrix cache
+        **params: Passed to stan_fit.fit_prophet() ('settings', 'init',
+            seasonality and changepoint arguments)
+
+    Returns:
+        RegressorModel: Fitted model
+
+    Raises:
+        ValueError: If train_df is not a PriceDataset
+    """
+    from stan_fit import fit_prophet
+
+    if not isinstance(train_df, PriceDataset):
+        raise ValueError("Extra regressors need a PriceDataset with the regressor columns")
+    pipeline = RegressorPipeline(train_df, names, cache_dir)
+    model = fit_prophet(train_df, regressors=pipeline, **params)
+    history = model.history_dates.to_numpy(dtype='datetime64[ns]')
+    values = pipeline.lookup(history, until=history[-1])
+    # The pipeline ends at the training end, whose bar every later date holds
+    held = pipeline.values[-1]
+    return RegressorModel(model, pipeline.names, values, held)
@@ -0,0 +1,360 @@
+"""
+Results Store Module
+Keeps forecasts, backtest windows and metric snapshots in a local SQLite
+database so they survive restarts and can be queried, e.g. "what did we
+forecast for date X"
+
+One database serves every asset (registry/results.sqlite by default):
+    forecasts         asset, model_version (bundle id), issue_date,
+                      target_date, horizon, yhat and interval
+    backtest_windows  holdout window and its metrics per model version
+    metric_snapshots  holdout and live accuracy (overall and per horizon
+                      bucket) as of a date
+
+The database runs in WAL mode, so readers never block the writer. Each
+thread gets its own connection; statements are module-level constants, so
+sqlite3's per-connection statement cache prepares each one once. Rows are
+written with executemany inside a single transaction and duplicates are
+ignored, so recording the same forecast twice is harmless. Dates are ISO
+strings, which sort and compare like dates.
+
+Usage:
+    python results_store.py sync                          # record every registry bundle
+    python results_store.py forecasts --date 2024-06-01   # forecasts targeting a date
+    python results_store.py metrics --kind live
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+DEFAULT_DB_NAME = 'results.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    asset TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    issue_date TEXT NOT NULL,
+    target_date TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    model_name TEXT NOT NULL,
+    yhat REAL NOT NULL,
+    yhat_lower REAL,
+    yhat_upper REAL,
+    PRIMARY KEY (asset, model_version, issue_date, target_date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS forecasts_by_target ON forecasts (asset, target_date);
+CREATE INDEX IF NOT EXISTS forecasts_by_issue ON forecasts (asset, issue_date);
+
+CREATE TABLE IF NOT EXISTS backtest_windows (
+    asset TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mae REAL, rmse REAL, mape REAL, directional_accuracy REAL,
+    PRIMARY KEY (asset, model_version, window_start, window_end)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS backtests_by_end ON backtest_windows (asset, window_end);
+
+CREATE TABLE IF NOT EXISTS metric_snapshots (
+    asset TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mae REAL, rmse REAL, mape REAL, directional_accuracy REAL,
+    PRIMARY KEY (asset, kind, as_of, model_version, bucket)
+) WITHOUT ROWID;
+"""
+
+INSERT_FORECAST = """
+INSERT OR IGNORE INTO forecasts
+    (asset, model_version, issue_date, target_date, horizon, model_name, yhat, yhat_lower, yhat_upper)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_BACKTEST = """
+INSERT OR REPLACE INTO backtest_windows
+    (asset, model_version, model_name, window_start, window_end, n, mae, rmse, mape,
+     directional_accuracy)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_SNAPSHOT = """
+INSERT OR REPLACE INTO metric_snapshots
+    (asset, kind, as_of, model_version, bucket, n, mae, rmse, mape, directional_accuracy)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SELECT_FORECASTS_FOR_TARGET = """
+SELECT model_version, model_name, issue_date, target_date, horizon, yhat, yhat_lower, yhat_upper
+FROM forecasts WHERE asset = ? AND target_date = ?
+ORDER BY issue_date DESC, model_version
+"""
+SELECT_FORECASTS_ISSUED = """
+SELECT model_version, model_name, issue_date, target_date, horizon, yhat, yhat_lower, yhat_upper
+FROM forecasts WHERE asset = ? AND issue_date = ?
+ORDER BY model_version, target_date
+"""
+SELECT_ASSET_FORECASTS = """
+SELECT model_version, issue_date, target_date, horizon, yhat
+FROM forecasts WHERE asset = ?
+"""
+SELECT_BACKTESTS = """
+SELECT model_version, model_name, window_start, window_end, n, mae, rmse, mape,
+       directional_accuracy
+FROM backtest_windows WHERE asset = ?
+ORDER BY window_end DESC, model_version LIMIT ?
+"""
+SELECT_SNAPSHOTS = """
+SELECT as_of, model_version, bucket, n, mae, rmse, mape, directional_accuracy
+FROM metric_snapshots WHERE asset = ? AND kind = ?
+ORDER BY as_of DESC, model_version, bucket LIMIT ?
+"""
+
+FORECAST_COLUMNS = ('model_version', 'model_name', 'issue_date', 'target_date', 'horizon',
+                    'yhat', 'yhat_lower', 'yhat_upper')
+BACKTEST_COLUMNS = ('model_version', 'model_name', 'window_start', 'window_end', 'n', 'mae',
+                    'rmse', 'mape', 'directional_accuracy')
+SNAPSHOT_COLUMNS = ('as_of', 'model_version', 'bucket', 'n', 'mae', 'rmse', 'mape',
+                    'directional_accuracy')
+METRIC_KEYS = ('n', 'mae', 'rmse', 'mape', 'directional_accuracy')
+
+
+def default_db_path(registry_root):
+    """
+    Results database path for a registry root.
+
+    Args:
+        registry_root (str): Registry root (the parent of the asset registries)
+
+    Returns:
+        Path: registry_root/results.sqlite
+    """
+    return Path(registry_root) / DEFAULT_DB_NAME
+
+
+class ResultsStore:
+    """
+    SQLite store of forecasts, backtest windows and metric snapshots.
+
+    Args:
+        path (str): Database file, created with its schema if missing
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params, columns):
+        rows = self._connection().execute(sql, params).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    # Writes
+
+    def add_forecasts(self, rows):
+        """
+        Bulk-insert forecast rows, ignoring ones already stored.
+
+        Args:
+            rows (iterable): (asset, model_version, issue_date, target_date,
+                horizon, model_name, yhat, yhat_lower, yhat_upper) tuples
+        """
+        with self._connection() as conn:
+            conn.executemany(INSERT_FORECAST, rows)
+
+    def add_backtest(self, asset, model_version, model_name, evaluation):
+        """
+        Record a model version's holdout window and metrics.
+
+        Args:
+            asset (str): Asset name
+            model_version (str): Bundle id
+            model_name (str): Registry model name
+            evaluation (dict): evaluate_model() output (or a bundle's metrics)
+        """
+        dates = evaluation['combined']['ds']
+        with self._connection() as conn:
+            conn.execute(INSERT_BACKTEST, (
+                asset, model_version, model_name, dates.iloc[0].strftime('%Y-%m-%d'),
+                dates.iloc[-1].strftime('%Y-%m-%d'), len(dates),
+                *(float(evaluation[key]) for key in METRIC_KEYS[1:])))
+
+    def add_metric_snapshot(self, asset, kind, as_of, model_version, metrics_by_bucket):
+        """
+        Record metrics as of a date, replacing an earlier snapshot for it.
+
+        Args:
+            asset (str): Asset name
+            kind (str): 'holdout' or 'live'
+            as_of (str): ISO date the metrics cover up to
+            model_version (str): Bundle id served at the time
+            metrics_by_bucket (dict): Bucket label (e.g. 'all', '1-7d') ->
+                dict with n, mae, rmse, mape, directional_accuracy
+        """
+        rows = [(asset, kind, as_of, model_version, bucket,
+                 *(metrics.get(key) for key in METRIC_KEYS))
+                for bucket, metrics in metrics_by_bucket.items()]
+        with self._connection() as conn:
+            conn.executemany(INSERT_SNAPSHOT, rows)
+
+    def record_bundle(self, asset, bundle):
+        """
+        Record a bundle's precomputed forecast, holdout window and metrics.
+
+        Args:
+            asset (str): Asset name
+            bundle (Bundle): Loaded bundle
+        """
+        forecast = bundle.forecast
+        targets = forecast['ds'].dt.strftime('%Y-%m-%d').tolist()
+        issue_date = (forecast['ds'].iloc[0] - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        model_name = bundle.manifest['model_name']
+        self.add_forecasts(
+            (asset, bundle.bundle_id, issue_date, target, horizon, model_name,
+             float(yhat), float(lower), float(upper))
+            for horizon, (target, yhat, lower, upper) in enumerate(zip(
+                targets, forecast['yhat'], forecast['yhat_lower'], forecast['yhat_upper']),
+                start=1))
+        self.record_evaluation(asset, bundle)
+
+    def record_evaluation(self, asset, bundle):
+        """
+        Record a bundle's holdout window and a holdout metric snapshot.
+
+        Args:
+            asset (str): Asset name
+            bundle (Bundle): Loaded bundle
+        """
+        self.add_backtest(asset, bundle.bundle_id, bundle.manifest['model_name'], bundle.metrics)
+        window_end = bundle.metrics['combined']['ds'].iloc[-1].strftime('%Y-%m-%d')
+        self.add_metric_snapshot(asset, 'holdout', window_end, bundle.bundle_id, {
+            'all': dict(n=len(bundle.metrics['combined']),
+                        **{key: float(bundle.metrics[key]) for key in METRIC_KEYS[1:]})})
+
+    # Queries
+
+    def forecasts_for(self, asset, target_date):
+        """
+        Every stored forecast for a target date, most recently issued first.
+
+        Args:
+            asset (str): Asset name
+            target_date (str): ISO date
+
+        Returns:
+            list: Dicts with FORECAST_COLUMNS
+        """
+        return self._query(SELECT_FORECASTS_FOR_TARGET, (asset, target_date), FORECAST_COLUMNS)
+
+    def forecasts_issued(self, asset, issue_date):
+        """
+        Every stored forecast issued on a date (the day of the model's last
+        training observation).
+
+        Args:
+            asset (str): Asset name
+            issue_date (str): ISO date
+
+        Returns:
+            list: Dicts with FORECAST_COLUMNS
+        """
+        return self._query(SELECT_FORECASTS_ISSUED, (asset, issue_date), FORECAST_COLUMNS)
+
+    def asset_forecasts(self, asset):
+        """
+        All of an asset's forecast rows, for rebuilding live accuracy.
+
+        Returns:
+            list: (model_version, issue_date, target_date, horizon, yhat) tuples
+        """
+        return self._connection().execute(SELECT_ASSET_FORECASTS, (asset,)).fetchall()
+
+    def backtests(self, asset, limit=50):
+        """
+        Most recent backtest windows.
+
+        Returns:
+            list: Dicts with BACKTEST_COLUMNS
+        """
+        return self._query(SELECT_BACKTESTS, (asset, limit), BACKTEST_COLUMNS)
+
+    def metric_snapshots(self, asset, kind='live', limit=100):
+        """
+        Most recent metric snapshots of a kind.
+
+        Returns:
+            list: Dicts with SNAPSHOT_COLUMNS
+        """
+        return self._query(SELECT_SNAPSHOTS, (asset, kind, limit), SNAPSHOT_COLUMNS)
+
+
+def main(argv=None):
+    from model_store import REGISTRY_DIR, asset_registry, list_assets, list_bundles, load_bundle
+
+    parser = argparse.ArgumentParser(description="Query the forecast results store")
+    parser.add_argument('--registry', default=str(REGISTRY_DIR))
+    parser.add_argument('--db', help="Database path (default: <registry>/results.sqlite)")
+    parser.add_argument('--asset', help="Asset name (default: the only asset)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('sync', help="Record every bundle in the registry")
+    forecasts = sub.add_parser('forecasts', help="Forecasts targeting (or issued on) a date")
+    forecasts.add_argument('--date', required=True)
+    forecasts.add_argument('--issued', action='store_true',
+                           help="Match the issue date instead of the target date")
+    sub.add_parser('backtests', help="Recent backtest windows")
+    metrics = sub.add_parser('metrics', help="Recent metric snapshots")
+    metrics.add_argument('--kind', choices=('live', 'holdout'), default='live')
+    args = parser.parse_args(argv)
+
+    store = ResultsStore(args.db or default_db_path(args.registry))
+    assets = [args.asset] if args.asset else list_assets(args.registry)
+
+    if args.command == 'sync':
+        for asset in assets:
+            registry = asset_registry(asset, args.registry)
+            manifests = list_bundles(registry)
+            start = time.perf_counter()
+            for manifest in manifests:
+                store.record_bundle(asset, load_bundle(registry, manifest['bundle_id']))
+            print(f"{asset}: recorded {len(manifests)} bundle(s) in "
+                  f"{time.perf_counter() - start:.2f}s")
+        return
+
+    if len(assets) != 1:
+        parser.error("--asset is required when the registry has several assets")
+    start = time.perf_counter()
+    if args.command == 'forecasts':
+        query = store.forecasts_issued if args.issued else store.forecasts_for
+        rows = query(assets[0], args.date)
+    elif args.command == 'backtests':
+        rows = store.backtests(assets[0])
+    else:
+        rows = store.metric_snapshots(assets[0], args.kind)
+    elapsed = (time.perf_counter() - start) * 1000
+    for row in rows:
+        print(json.dumps(row))
+    print(f"{len(rows)} row(s) in {elapsed:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""
+Retraining Daemon Module
+Watches the data directory for new or changed CSV files and retrains the
+affected assets in a bounded process pool, publishing and promoting a
+registry bundle per asset so running web apps hot-load the result
+
+Changes are detected by polling file mtime/size and confirmed with a
+content hash, so no external services or filesystem-event libraries are
+needed. A file must stay unchanged for the debounce period before it is
+queued, so bursts of writes (copies, appends) trigger one retrain.
+
+Queue depth, running jobs and per-job durations are written to
+registry/daemon_status.json after every change (served by the web app at
+/api/retrain).
+
+Usage: python retrain_daemon.py [--data-dir data] [--model prophet] [--workers 2]
+                                [--debounce 5] [--interval 1] [--once]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+
+# Use Agg backend; workers render plots without a display
+matplotlib.use('Agg')
+
+from model_store import (REGISTRY_DIR, FORECAST_HORIZON, _atomic_write, asset_registry,
+                         current_bundle_id, file_hash, load_bundle, promote, publish_bundle)
+
+
+PROJECT_ROOT = Path(__file__).parent
+DATA_DIR = PROJECT_ROOT / 'data'
+CACHE_DIR = PROJECT_ROOT / 'cache'
+STATUS_FILE = 'daemon_status.json'
+
+# Durations of the most recent jobs kept in the status file
+RECENT_JOBS = 50
+
+
+class DataWatcher:
+    """
+    Polls a directory for CSV files whose contents changed.
+
+    poll() stats every file; a file whose (mtime, size) changed is only
+    reported once it has stayed unchanged for `debounce` seconds and its
+    content hash differs from the last one reported (touching a file
+    without changing it does not trigger a retrain).
+    """
+
+    def __init__(self, data_dir, pattern='*.csv', debounce=5.0, known_hashes=None):
+        self.data_dir = Path(data_dir)
+        self.pattern = pattern
+        self.debounce = debounce
+        self.hashes = dict(known_hashes or {})
+        self._signatures = {}
+        self._changed_at = {}
+
+    def poll(self, now=None):
+        """
+        Return files whose new contents have settled.
+
+        Args:
+            now (float): Current time.monotonic() value (for tests/replay)
+
+        Returns:
+            list: (path, content hash) pairs, sorted by path
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        for path in sorted(self.data_dir.glob(self.pattern)):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._signatures.get(path) != signature:
+                self._signatures[path] = signature
+                self._changed_at[path] = now
+                continue
+            changed_at = self._changed_at.get(path)
+            if changed_at is None or now - changed_at < self.debounce:
+                continue
+            del self._changed_at[path]
+            digest = file_hash(path)
+            if self.hashes.get(path.stem) != digest:
+                self.hashes[path.stem] = digest
+                ready.append((path, digest))
+        return ready
+
+
+def retrain_asset(csv_path, model_name='prophet', registry_dir=REGISTRY_DIR,
+                  cache_dir=CACHE_DIR, source_hash=None, warm_start=True):
+    """
+    Retrain one asset and publish and promote its bundle.
+
+    Prophet fits start from the currently promoted model's parameters when
+    it was trained with the same model; baseline models are closed-form and
+    refit from scratch in milliseconds.
+
+    Args:
+        csv_path (str): Source CSV
+        model_name (str): 'prophet' or a baseline from models.py
+        registry_dir (str): Registry root
+        cache_dir (str): Directory for the columnar data cache
+        source_hash (str): Content hash of csv_path, recorded in the manifest
+        warm_start (bool): Whether to warm-start Prophet from the served model
+
+    Returns:
+        dict: 'asset', 'bundle_id', 'warm_start' and per-stage 'timings' (seconds)
+    """
+    from data_loader import (dataset_cache_path, load_dataset, preprocess_data,
+                             get_train_test_split)
+    from prophet_model import generate_forecast, plot_forecast, warm_start_params
+    from models import fit_model, refit_model
+    from model_evaluation import evaluate_model, plot_evaluation
+    from eda import plot_historical_price
+
+    csv_path = Path(csv_path)
+    asset = csv_path.stem
+    registry = asset_registry(asset, registry_dir)
+    timings = {}
+
+    start = time.perf_counter()
+    cache_path = dataset_cache_path(csv_path, cache_dir)
+    dataset = preprocess_data(load_dataset(str(csv_path), cache_path=str(cache_path)))
+    train_df, test_df = get_train_test_split(dataset, test_days=90)
+    timings['load'] = time.perf_counter() - start
+
+    params = {}
+    if warm_start and model_name == 'prophet':
+        previous = load_bundle(registry)
+        if previous is not None and previous.manifest['model_name'] == 'prophet':
+            params['init'] = warm_start_params(previous.model)
+
+    start = time.perf_counter()
+    try:
+        model = fit_model(model_name, train_df, **params)
+    except (RuntimeError, ValueError):
+        if not params:
+            raise
+        # Shapes no longer match (e.g. a different number of changepoints)
+        params = {}
+        model = fit_model(model_name, train_df)
+    timings['fit'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metrics = evaluate_model(model, test_df)
+    timings['evaluate'] = time.perf_counter() - start
+
+    # The bundle serves a refit on all the data, warm-started from the holdout fit
+    start = time.perf_counter()
+    model = refit_model(model_name, model, dataset)
+    forecast = generate_forecast(model, periods=FORECAST_HORIZON)
+    timings['refit'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as plot_dir:
+        plot_dir = Path(plot_dir)
+        plot_historical_price(dataset.to_frame(), save_path=str(plot_dir / 'historical.png'))
+        forecast_30 = forecast.iloc[:len(forecast) - (FORECAST_HORIZON - 30)]
+        plot_forecast(model, forecast_30, save_path=str(plot_dir / 'forecast.png'))
+        plot_evaluation(metrics['combined'], save_path=str(plot_dir / 'evaluation.png'))
+        plots = {path.name: str(path) for path in plot_dir.glob('*.png')}
+        source = {'path': csv_path.name, 'hash': source_hash or file_hash(csv_path)}
+        bundle_id = publish_bundle(model, metrics, dataset, registry, model_name=model_name,
+                                   plots=plots, forecast=forecast, source=source)
+    promote(bundle_id, registry)
+    timings['publish'] = time.perf_counter() - start
+
+    return {
+        'asset': asset,
+        'bundle_id': bundle_id,
+        'warm_start': 'init' in params,
+        'timings': timings,
+    }
+
+
+def _served_hashes(data_dir, registry_dir, model_name):
+    """
+    Source hashes of the bundles currently promoted for each CSV in data_dir.
+    Assets served by a different model are left out, so they are retrained.
+    """
+    hashes = {}
+    for path in Path(data_dir).glob('*.csv'):
+        registry = asset_registry(path.stem, registry_dir)
+        bundle_id = current_bundle_id(registry)
+        if bundle_id is None:
+            continue
+        with open(registry / 'bundles' / bundle_id / 'manifest.json') as f:
+            manifest = json.load(f)
+        source = manifest.get('source', {})
+        if manifest['model_name'] == model_name and 'hash' in source:
+            hashes[path.stem] = source['hash']
+    return hashes
+
+
+class RetrainDaemon:
+    """
+    Schedules retraining jobs for changed CSV files.
+
+    At most `workers` jobs run at once, and at most one per asset: an asset
+    that changes again while its job runs is queued once more when the job
+    finishes. Everything else waits in a FIFO queue.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, registry_dir=REGISTRY_DIR, model_name='prophet',
+                 workers=2, debounce=5.0, interval=1.0, warm_start=True):
+        self.data_dir = Path(data_dir)
+        self.registry_dir = Path(registry_dir)
+        self.model_name = model_name
+        self.workers = workers
+        self.interval = interval
+        self.warm_start = warm_start
+        self.watcher = DataWatcher(data_dir, debounce=debounce,
+                                   known_hashes=_served_hashes(data_dir, registry_dir, model_name))
+        self.queue = deque()
+        self.running = {}
+        self.recent = deque(maxlen=RECENT_JOBS)
+        self.completed = 0
+        self.failed = 0
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def _enqueue(self, path, digest):
+        for i, (queued_path, _) in enumerate(self.queue):
+            if queued_path == path:
+                self.queue[i] = (path, digest)
+                return
+        self.queue.append((path, digest))
+
+    def _start_jobs(self):
+        busy = {path for path, _, _ in self.running.values()}
+        waiting = deque()
+        while self.queue and len(self.running) < self.workers:
+            path, digest = self.queue.popleft()
+            if path in busy:
+                waiting.append((path, digest))
+                continue
+            future = self.executor.submit(
+                retrain_asset, str(path), self.model_name, str(self.registry_dir),
+                str(CACHE_DIR), digest, self.warm_start,
+            )
+            self.running[future] = (path, digest, time.time())
+            busy.add(path)
+        self.queue.extendleft(reversed(waiting))
+
+    def _collect_jobs(self):
+        changed = False
+        for future in [f for f in self.running if f.done()]:
+            path, digest, started = self.running.pop(future)
+            job = {'asset': path.stem, 'started_at': started,
+                   'duration': time.time() - started}
+            try:
+                job.update(future.result())
+                job['status'] = 'ok'
+                self.completed += 1
+                print(f"Retrained {path.stem} in {job['duration']:.1f}s "
+                      f"(bundle {job['bundle_id']}, warm start: {job['warm_start']})")
+            except Exception as e:
+                job.update(status='failed', error=f"{type(e).__name__}: {e}")
+                self.failed += 1
+                # Forget the hash so the next change (or restart) retries
+                self.watcher.hashes.pop(path.stem, None)
+                print(f"Retraining {path.stem} failed: {job['error']}")
+            self.recent.append(job)
+            changed = True
+        return changed
+
+    def status(self):
+        """
+        Current scheduler state.
+
+        Returns:
+            dict: Queue depth, running jobs, totals and recent job durations
+        """
+        now = time.time()
+        return {
+            'updated_at': now,
+            'model_name': self.model_name,
+            'workers': self.workers,
+            'queue_depth': len(self.queue),
+            'queued': [path.stem for path, _ in self.queue],
+            'running': [
+                {'asset': path.stem, 'started_at': started, 'elapsed': now - started}
+                for path, _, started in self.running.values()
+            ],
+            'completed': self.completed,
+            'failed': self.failed,
+            'recent_jobs': list(self.recent),
+        }
+
+    def write_status(self):
+        """Atomically write status() to the registry's daemon_status.json."""
+        self.registry_dir.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.registry_dir / STATUS_FILE, json.dumps(self.status(), indent=2))
+
+    def step(self):
+        """
+        Run one scheduling round: collect finished jobs, pick up settled
+        file changes and start queued jobs.
+
+        Returns:
+            bool: Whether any job is still queued or running
+        """
+        changed = self._collect_jobs()
+        for path, digest in self.watcher.poll():
+            print(f"Detected change in {path.name}")
+            self._enqueue(path, digest)
+            changed = True
+        before = len(self.running)
+        self._start_jobs()
+        if changed or len(self.running) != before:
+            self.write_status()
+        return bool(self.queue or self.running)
+
+    def run(self, once=False):
+        """
+        Poll until interrupted.
+
+        Args:
+            once (bool): Exit when all changes present at startup have been
+                retrained, instead of watching forever
+        """
+        print(f"Watching {self.data_dir} (model: {self.model_name}, workers: {self.workers})")
+        self.write_status()
+        deadline = time.monotonic() + self.watcher.debounce + self.interval
+        try:
+            while True:
+                busy = self.step()
+                if once and not busy and time.monotonic() > deadline:
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("Stopping")
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self._collect_jobs()
+            self.queue.clear()
+            self.write_status()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain models when data files change")
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    parser.add_argument('--registry', default=str(REGISTRY_DIR))
+    parser.add_argument('--model', default=os.environ.get('FORECAST_MODEL', 'prophet'),
+                        help="Model to train (default: $FORECAST_MODEL or prophet)")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Maximum concurrent retraining jobs (default: 2)")
+    parser.add_argument('--debounce', type=float, default=5.0,
+                        help="Seconds a file must stay unchanged before retraining (default: 5)")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="Polling interval in seconds (default: 1)")
+    parser.add_argument('--cold-start', action='store_true',
+                        help="Do not warm-start Prophet from the served model")
+    parser.add_argument('--once', action='store_true',
+                        help="Retrain what is out of date, then exit")
+    args = parser.parse_args(argv)
+
+    daemon = RetrainDaemon(args.data_dir, args.registry, args.model, workers=args.workers,
+                           debounce=args.debounce, interval=args.interval,
+                           warm_start=not args.cold_start)
+    daemon.run(once=args.once)
+
+
+if __name__ == '__main__':
+    main()
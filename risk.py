@@ -0,0 +1,171 @@
+"""
+Risk Simulation Module
+Simulates future price paths from historical daily log returns, either by
+bootstrapping observed returns or from a fitted normal distribution, and
+summarizes them as price quantiles, Value-at-Risk and Expected Shortfall
+
+Paths are drawn as one (paths x horizon) NumPy array and accumulated with a
+single cumulative sum. When that array would exceed `max_bytes`, paths are
+simulated in chunks and only the values needed for the summary (terminal
+returns and the fan-chart steps) are kept, so memory stays bounded for any
+number of paths. A fixed seed makes results reproducible.
+
+Usage:
+    python risk.py --horizon 30 --paths 100000 --method bootstrap
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+METHODS = ('bootstrap', 'normal')
+DEFAULT_PATHS = 10_000
+MAX_PATHS = 200_000
+MAX_HORIZON = 365
+
+# Days of history the return distribution is estimated from
+DEFAULT_LOOKBACK = 730
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+CONFIDENCE_LEVELS = (0.95, 0.99)
+
+# Largest simulated block held in memory at once
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Steps of the horizon reported in the fan chart
+FAN_POINTS = 30
+
+
+def log_returns(prices, lookback=DEFAULT_LOOKBACK):
+    """
+    Daily log returns of the last `lookback` days of prices.
+
+    Args:
+        prices (np.ndarray): Price series, oldest first
+        lookback (int): Number of returns to keep (None for all)
+
+    Returns:
+        np.ndarray: Log returns
+    """
+    returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)))
+    returns = returns[np.isfinite(returns)]
+    return returns[-lookback:] if lookback else returns
+
+
+def _draw(rng, returns, size, method):
+    if method == 'bootstrap':
+        return returns[rng.integers(0, len(returns), size=size)]
+    if method == 'normal':
+        return rng.normal(returns.mean(), returns.std(ddof=1), size=size)
+    raise ValueError(f"Unknown method '{method}'. Choose from: {', '.join(METHODS)}")
+
+
+def _fan_steps(horizon, points=FAN_POINTS):
+    """Horizon steps (0-based) shown in the fan chart, always including the last."""
+    return np.unique(np.linspace(0, horizon - 1, min(points, horizon)).round().astype(int))
+
+
+def simulate_risk(prices, horizon, paths=DEFAULT_PATHS, method='bootstrap', seed=0,
+                  lookback=DEFAULT_LOOKBACK, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Simulate price paths and summarize their distribution.
+
+    VaR and ES are reported as positive fractions of the last price lost
+    over the horizon (and in price terms): VaR at 95% is the loss exceeded
+    in 5% of paths, ES the average loss in those paths.
+
+    Args:
+        prices (np.ndarray): Historical prices, oldest first
+        horizon (int): Days to simulate
+        paths (int): Number of paths
+        method (str): 'bootstrap' or 'normal'
+        seed (int): Random seed
+        lookback (int): Days of history to draw returns from
+        max_bytes (int): Memory budget of one simulated block
+
+    Returns:
+        dict: last_price, terminal price quantiles, var/es per confidence
+        level, and a fan chart (price quantiles at selected horizon steps)
+    """
+    returns = log_returns(prices, lookback)
+    if len(returns) < 2:
+        raise ValueError("Not enough price history to simulate returns")
+    last_price = float(prices[-1])
+    steps = _fan_steps(horizon)
+    chunk = max(1, min(paths, max_bytes // (horizon * 8)))
+
+    # Only terminal and fan-step values are kept across chunks
+    rng = np.random.default_rng(seed)
+    kept = np.empty((paths, len(steps)))
+    for start in range(0, paths, chunk):
+        size = min(chunk, paths - start)
+        block = _draw(rng, returns, (size, horizon), method)
+        np.cumsum(block, axis=1, out=block)
+        kept[start:start + size] = block[:, steps]
+
+    terminal = np.expm1(kept[:, -1])
+    losses = -terminal
+    var, es = {}, {}
+    for level in CONFIDENCE_LEVELS:
+        threshold = float(np.quantile(losses, level))
+        var[f'{level:.0%}'] = threshold
+        es[f'{level:.0%}'] = float(losses[losses >= threshold].mean())
+
+    fan = last_price * np.exp(np.quantile(kept, QUANTILES, axis=0))
+    return {
+        'horizon': horizon,
+        'paths': paths,
+        'method': method,
+        'lookback_days': len(returns),
+        'last_price': last_price,
+        'quantiles': {f'p{q * 100:g}': float(last_price * (1 + np.quantile(terminal, q)))
+                      for q in QUANTILES},
+        'var': var,
+        'es': es,
+        'var_price': {level: value * last_price for level, value in var.items()},
+        'es_price': {level: value * last_price for level, value in es.items()},
+        'fan': {
+            'steps': (steps + 1).tolist(),
+            'quantiles': {f'p{q * 100:g}': row.tolist() for q, row in zip(QUANTILES, fan)},
+        },
+    }
+
+
+def main(argv=None):
+    from data_loader import load_dataset, preprocess_data
+
+    parser = argparse.ArgumentParser(description="Monte-Carlo price risk from historical returns")
+    parser.add_argument('--csv', help="Price CSV (default: the bundled data)")
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS)
+    parser.add_argument('--method', choices=METHODS, default='bootstrap')
+    parser.add_argument('--lookback', type=int, default=DEFAULT_LOOKBACK)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="Memory budget per simulated block")
+    args = parser.parse_args(argv)
+
+    root = Path(__file__).parent
+    csv_path = args.csv or (sorted((root / 'data').glob('*.csv')) or sorted(root.glob('*.csv')))[0]
+    dataset = preprocess_data(load_dataset(str(csv_path)))
+
+    start = time.perf_counter()
+    risk = simulate_risk(dataset.y, args.horizon, args.paths, args.method, args.seed,
+                         args.lookback, int(args.max_mb * 1024 * 1024))
+    seconds = time.perf_counter() - start
+
+    print(f"\n{args.paths:,} {args.method} paths over {args.horizon} days "
+          f"({risk['lookback_days']} days of returns) in {seconds:.2f}s")
+    print(f"Last price: ${risk['last_price']:,.2f}")
+    for label, price in risk['quantiles'].items():
+        print(f"  {label:>5}: ${price:,.2f}")
+    for level in risk['var']:
+        print(f"  VaR {level}: {risk['var'][level]:.2%} (${risk['var_price'][level]:,.2f})   "
+              f"ES {level}: {risk['es'][level]:.2%} (${risk['es_price'][level]:,.2f})")
+
+
+if __name__ == '__main__':
+    main()
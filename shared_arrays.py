@@ -0,0 +1,403 @@
+"""
+Shared Array Module
+Publishes datasets, feature matrices and model bundles once as
+memory-mapped array files that any number of worker processes attach to
+zero-copy by name, instead of each worker re-parsing the CSV and reloading
+the model
+
+A shared file holds a JSON header (array names, dtypes, shapes, offsets and
+free-form metadata) followed by the raw, 64-byte aligned array data. Files
+live in /dev/shm when available, so attached pages are shared RAM rather
+than disk-backed. Names are content-addressed (dataset fingerprint, bundle
+id): publishing the same content twice is a no-op and a name always refers
+to the same bytes. Attached arrays are read-only.
+
+Usage:
+    python shared_arrays.py list
+    python shared_arrays.py clear
+    python shared_arrays.py bench --workers 1 8 32 [--rows 1000000]
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+
+PROJECT_ROOT = Path(__file__).parent
+SHARED_DIR = Path(os.environ.get(
+    'FORECAST_SHARED_DIR',
+    '/dev/shm/forecast' if Path('/dev/shm').is_dir() else PROJECT_ROOT / 'cache' / 'shm'))
+
+MAGIC = b'FCSHARE1'
+ALIGNMENT = 64
+SUFFIX = '.arrays'
+
+# Mappings attached by this process, by file path
+_attached = {}
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _path(name, shared_dir):
+    return Path(shared_dir) / f'{name}{SUFFIX}'
+
+
+def share(name, arrays, meta=None, shared_dir=SHARED_DIR):
+    """
+    Publish named arrays under `name` (no-op if already published).
+
+    Args:
+        name (str): Content-addressed name
+        arrays (dict): Array name -> array (any fixed-size dtype)
+        meta (dict): JSON-serializable metadata stored in the header
+        shared_dir (Path): Directory holding shared files
+
+    Returns:
+        str: The name, for attach()
+    """
+    path = _path(name, shared_dir)
+    if path.exists():
+        return name
+    arrays = {key: np.asarray(values) for key, values in arrays.items()}
+    layout, offset = [], 0
+    for key, values in arrays.items():
+        layout.append({'key': key, 'dtype': values.dtype.str, 'shape': list(values.shape),
+                       'offset': offset, 'nbytes': values.nbytes})
+        offset = _align(offset + values.nbytes)
+    header = json.dumps({'arrays': layout, 'meta': meta or {}}).encode()
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+            for entry, values in zip(layout, arrays.values()):
+                f.seek(data_start + entry['offset'])
+                f.write(values.tobytes(order='C'))
+            f.truncate(data_start + offset)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return name
+
+
+def attach(name, shared_dir=SHARED_DIR):
+    """
+    Map a published file and return zero-copy, read-only views of its arrays.
+
+    Args:
+        name (str): Name given to share()
+        shared_dir (Path): Directory holding shared files
+
+    Returns:
+        tuple: (arrays dict, meta dict)
+    """
+    path = _path(name, shared_dir)
+    if path in _attached:
+        return _attached[path]
+    if not path.exists():
+        raise FileNotFoundError(f"No shared arrays named '{name}' in {shared_dir}")
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a shared array file")
+    (header_size,) = struct.unpack('<Q', bytes(buffer[len(MAGIC):len(MAGIC) + 8]))
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buffer[start:start + header_size]))
+    data_start = _align(start + header_size)
+
+    arrays = {}
+    for entry in header['arrays']:
+        dtype = np.dtype(entry['dtype'])
+        begin = data_start + entry['offset']
+        raw = buffer[begin:begin + entry['nbytes']]
+        arrays[entry['key']] = np.ndarray(entry['shape'], dtype=dtype, buffer=raw)
+    _attached[path] = arrays, header['meta']
+    return _attached[path]
+
+
+def release(name, shared_dir=SHARED_DIR):
+    """
+    Remove a published file. Processes that already attached it keep their
+    mapping until they exit.
+
+    Args:
+        name (str): Name given to share()
+        shared_dir (Path): Directory holding shared files
+    """
+    path = _path(name, shared_dir)
+    _attached.pop(path, None)
+    path.unlink(missing_ok=True)
+
+
+def detach(name, shared_dir=SHARED_DIR):
+    """
+    Forget this process's mapping of a published file, without removing it.
+    The memory is unmapped once no views of its arrays remain.
+
+    Args:
+        name (str): Name given to share()
+        shared_dir (Path): Directory holding shared files
+    """
+    _attached.pop(_path(name, shared_dir), None)
+
+
+def list_shared(shared_dir=SHARED_DIR):
+    """
+    Published names and their sizes.
+
+    Returns:
+        dict: name -> size in bytes
+    """
+    shared_dir = Path(shared_dir)
+    if not shared_dir.exists():
+        return {}
+    return {path.name[:-len(SUFFIX)]: path.stat().st_size
+            for path in sorted(shared_dir.glob(f'*{SUFFIX}'))}
+
+
+def share_dataset(dataset, kind='dataset', shared_dir=SHARED_DIR):
+    """
+    Publish a PriceDataset (prices or feature matrix) by its fingerprint.
+
+    Args:
+        dataset (PriceDataset): Dataset to publish
+        kind (str): Name prefix, e.g. 'dataset' or 'features'
+        shared_dir (Path): Directory holding shared files
+
+    Returns:
+        str: Name for attach_dataset()
+    """
+    arrays = {'__dates__': dataset.dates}
+    arrays.update({f'col:{name}': values for name, values in dataset.columns.items()})
+    return share(f'{kind}-{dataset.fingerprint()}', arrays, {'target': dataset.target},
+                 shared_dir)
+
+
+def attach_dataset(name, shared_dir=SHARED_DIR):
+    """
+    Attach a dataset published with share_dataset().
+
+    Returns:
+        PriceDataset: Dataset whose arrays are views of the shared file
+    """
+    from data_loader import PriceDataset
+
+    arrays, meta = attach(name, shared_dir)
+    columns = {key[len('col:'):]: values for key, values in arrays.items()
+               if key.startswith('col:')}
+    return PriceDataset(arrays['__dates__'], columns, target=meta['target'])
+
+
+def share_bundle(bundle, shared_dir=SHARED_DIR):
+    """
+    Publish a registry bundle's model and forecast arrays by bundle id.
+
+    Args:
+        bundle (Bundle): Loaded bundle (see model_store.load_bundle())
+        shared_dir (Path): Directory holding shared files
+
+    Returns:
+        str: Name for attach_bundle()
+    """
+    from model_store import read_bundle_arrays
+
+    return share(f'bundle-{bundle.bundle_id}', read_bundle_arrays(bundle.path),
+                 {'path': str(bundle.path)}, shared_dir)
+
+
+def attach_bundle(name, shared_dir=SHARED_DIR):
+    """
+    Attach a bundle published with share_bundle(). The small manifest and
+    metrics files are still read from the bundle directory.
+
+    Returns:
+        Bundle: Bundle whose model and forecast use the shared arrays
+    """
+    from model_store import Bundle
+
+    arrays, meta = attach(name, shared_dir)
+    return Bundle(meta['path'], arrays=arrays)
+
+
+def memory_kb():
+    """
+    Resident and proportional set size of this process in KB.
+
+    PSS splits shared pages between the processes mapping them, so summing
+    it over workers gives their real combined footprint (Linux only).
+
+    Returns:
+        tuple: (rss, pss); None where /proc is unavailable
+    """
+    values = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get('Rss'), values.get('Pss')
+
+
+def _bench_worker(mode, source, started, results, barrier):
+    """Load the serving state one way, report readiness time and memory."""
+    load_start = time.time()
+    if mode == 'reload':
+        from data_loader import load_dataset, preprocess_data
+        from features import get_features
+        from model_store import load_bundle
+
+        dataset = preprocess_data(load_dataset(source['csv']))
+        features = get_features(dataset)
+        bundle = (load_bundle(source['registry'], source['bundle_id'])
+                  if source['bundle_id'] else None)
+    else:
+        dataset = attach_dataset(source['dataset'])
+        features = attach_dataset(source['features'])
+        bundle = attach_bundle(source['bundle']) if source['bundle'] else None
+
+    # Touch every value so lazily mapped pages count towards memory
+    checksum = float(np.nansum(dataset.y)) + sum(
+        float(np.nansum(values)) for values in features.columns.values())
+    if bundle is not None:
+        checksum += float(bundle.forecast_for(30)['yhat'].sum())
+    ready = time.time()
+    barrier.wait()
+    rss, pss = memory_kb()
+    results.put({'ready_s': ready - started, 'load_s': ready - load_start,
+                 'rss_kb': rss, 'pss_kb': pss, 'checksum': checksum})
+    # Stay alive until every worker has measured, so shared pages are split
+    barrier.wait()
+
+
+def run_bench(mode, workers, source, start_method='spawn'):
+    """
+    Start `workers` processes that each load the serving state and measure
+    spawn-to-ready time plus combined RSS/PSS.
+
+    Args:
+        mode (str): 'reload' (each worker parses the CSV and loads the
+            bundle) or 'shared' (each worker attaches the shared files)
+        workers (int): Number of worker processes
+        source (dict): Paths for 'reload' and shared names for 'shared'
+        start_method (str): multiprocessing start method
+
+    Returns:
+        dict: Spawn times (s) and combined memory (MB)
+    """
+    import multiprocessing
+
+    ctx = multiprocessing.get_context(start_method)
+    results = ctx.Queue()
+    barrier = ctx.Barrier(workers)
+    started = time.time()
+    processes = [ctx.Process(target=_bench_worker, args=(mode, source, started, results, barrier))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    ready = sorted(report['ready_s'] for report in reports)
+    pss = [report['pss_kb'] for report in reports]
+    return {
+        'mode': mode,
+        'workers': workers,
+        'all_ready_s': ready[-1],
+        'median_ready_s': ready[len(ready) // 2],
+        'mean_load_s': sum(report['load_s'] for report in reports) / workers,
+        'total_rss_mb': sum(report['rss_kb'] or 0 for report in reports) / 1024,
+        'total_pss_mb': sum(pss) / 1024 if None not in pss else None,
+    }
+
+
+def _bench(args):
+    from data_loader import load_dataset, preprocess_data
+    from features import get_features
+    from model_store import REGISTRY_DIR, asset_registry, current_bundle_id, load_bundle
+
+    if args.rows:
+        from benchmark import synthetic_csv
+        csv_path = synthetic_csv(args.rows)
+    else:
+        data_files = sorted((PROJECT_ROOT / 'data').glob('*.csv'))
+        csv_path = (data_files or sorted(PROJECT_ROOT.glob('*.csv')))[0]
+    registry = asset_registry(csv_path.stem, args.registry or REGISTRY_DIR)
+    bundle_id = current_bundle_id(registry)
+    if bundle_id is None:
+        print(f"No promoted bundle for {csv_path.stem}; benchmarking data and features only")
+
+    start = time.perf_counter()
+    dataset = preprocess_data(load_dataset(str(csv_path)))
+    bundle = load_bundle(registry, bundle_id) if bundle_id else None
+    source = {
+        'csv': str(csv_path),
+        'registry': str(registry),
+        'bundle_id': bundle_id,
+        'dataset': share_dataset(dataset),
+        'features': share_dataset(get_features(dataset), kind='features'),
+        'bundle': share_bundle(bundle) if bundle else None,
+    }
+    shared_mb = sum(list_shared()[source[key]] for key in ('dataset', 'features', 'bundle')
+                    if source[key]) / 1024 / 1024
+    print(f"Published {shared_mb:.1f} MB of shared arrays in {time.perf_counter() - start:.2f}s "
+          f"({len(dataset):,} rows, {args.start_method} workers)\n")
+
+    rows = []
+    print(f"{'Mode':<8}{'Workers':>8}{'All ready':>11}{'Median':>9}{'Load':>9}"
+          f"{'RSS total':>12}{'PSS total':>12}")
+    for workers in args.workers:
+        for mode in ('reload', 'shared'):
+            row = run_bench(mode, workers, source, args.start_method)
+            rows.append(row)
+            pss = f"{row['total_pss_mb']:9.1f} MB" if row['total_pss_mb'] is not None else '      n/a'
+            print(f"{mode:<8}{workers:>8}{row['all_ready_s']:>10.2f}s{row['median_ready_s']:>8.2f}s"
+                  f"{row['mean_load_s']:>8.3f}s{row['total_rss_mb']:>9.1f} MB{pss:>12}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'csv': str(csv_path), 'rows': len(dataset), 'shared_mb': shared_mb,
+                       'start_method': args.start_method, 'results': rows}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage and benchmark shared array files")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="List published files")
+    sub.add_parser('clear', help="Remove every published file")
+    bench = sub.add_parser('bench', help="Measure worker RSS and spawn time, reload vs shared")
+    bench.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32])
+    bench.add_argument('--rows', type=int, help="Use a synthetic CSV with this many rows")
+    bench.add_argument('--registry', help="Registry root holding the bundle (default: registry/)")
+    bench.add_argument('--start-method', default='spawn', choices=['spawn', 'forkserver', 'fork'])
+    bench.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, size in list_shared().items():
+            print(f"{name:<50} {size / 1024 / 1024:10.2f} MB")
+    elif args.command == 'clear':
+        for name in list_shared():
+            release(name)
+    else:
+        _bench(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
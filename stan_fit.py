@@ -0,0 +1,275 @@
+"""
+Isolated Stan Fitting Module
+Runs Prophet fits in a separate Python subprocess with a wall-clock
+timeout, an optional memory cap and a bounded thread count, and retries
+with a fallback optimizer (Newton by default) when the first one fails, so
+a pathological fit cannot hang or exhaust the process that asked for it
+
+Settings come from DEFAULT_FIT_SETTINGS, overridden by FORECAST_FIT_*
+environment variables and then by explicit arguments:
+    algorithm  cmdstanpy optimizer: LBFGS, BFGS or Newton   (FORECAST_FIT_ALGORITHM)
+    iter       maximum optimizer iterations                  (FORECAST_FIT_ITER)
+    threads    thread limit for Stan/BLAS/OpenMP in the fit   (FORECAST_FIT_THREADS)
+    timeout    seconds per attempt, None for no limit          (FORECAST_FIT_TIMEOUT)
+    memory_mb  address-space cap per attempt (POSIX only)      (FORECAST_FIT_MEMORY_MB)
+    fallback   optimizer for the retry, None to disable        (FORECAST_FIT_FALLBACK)
+    isolated   run in a subprocess (0 fits in-process, without
+               timeout or memory cap)                          (FORECAST_FIT_ISOLATED)
+
+The timeout and memory cap apply to the whole process group, including the
+cmdstan executable. Only optimizer failures, timeouts and memory errors are
+retried; a ValueError from invalid inputs is re-raised as is.
+
+Usage:
+    python stan_fit.py bench --algorithms LBFGS BFGS Newton --threads 1 2 --repeat 5
+"""
+
+import argparse
+import os
+import pickle
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from instrumentation import record
+
+
+DEFAULT_FIT_SETTINGS = {
+    'algorithm': 'LBFGS',
+    'iter': 10000,
+    'threads': 1,
+    'timeout': 600.0,
+    'memory_mb': None,
+    'fallback': 'Newton',
+    'isolated': True,
+}
+
+# Settings that change the fitted parameters (and so belong in cache keys)
+OPTIMIZER_KEYS = ('algorithm', 'iter')
+
+_ENV_PARSERS = {
+    'algorithm': str,
+    'iter': int,
+    'threads': int,
+    'timeout': lambda value: float(value) if value else None,
+    'memory_mb': lambda value: int(value) if value else None,
+    'fallback': lambda value: value or None,
+    'isolated': lambda value: value not in ('0', 'false', 'no'),
+}
+
+# Failures worth retrying with the fallback optimizer; anything else (bad
+# inputs, bad init) would fail the same way again
+RETRYABLE_ERRORS = ('RuntimeError', 'TimeoutError', 'MemoryError', 'Killed')
+
+# Environment variables limiting native thread pools in the fit process
+THREAD_ENV_VARS = ('STAN_NUM_THREADS', 'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'MKL_NUM_THREADS')
+
+
+def fit_settings(**overrides):
+    """
+    Effective fit settings: defaults, then FORECAST_FIT_* variables, then
+    the given overrides (None values are ignored).
+
+    Returns:
+        dict: Settings with every key of DEFAULT_FIT_SETTINGS
+    """
+    settings = dict(DEFAULT_FIT_SETTINGS)
+    for key, parse in _ENV_PARSERS.items():
+        value = os.environ.get(f'FORECAST_FIT_{key.upper()}')
+        if value is not None:
+            settings[key] = parse(value)
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    unknown = set(settings) - set(DEFAULT_FIT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown fit settings: {', '.join(sorted(unknown))}")
+    return settings
+
+
+def optimizer_settings(**overrides):
+    """The subset of fit_settings() that affects the fitted model."""
+    settings = fit_settings(**overrides)
+    return {key: settings[key] for key in OPTIMIZER_KEYS}
+
+
+def _limit_memory(memory_mb):
+    def apply():
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply
+
+
+def _run_attempt(payload, algorithm, settings):
+    """
+    Fit once in a subprocess.
+
+    Returns:
+        tuple: (model or None, error message or None, error type or None)
+    """
+    with tempfile.TemporaryDirectory(prefix='stan_fit_') as work_dir:
+        work_dir = Path(work_dir)
+        with open(work_dir / 'input.pkl', 'wb') as f:
+            pickle.dump(dict(payload, fit_settings={'algorithm': algorithm,
+                                                    'iter': settings['iter']}),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        env = dict(os.environ, **{name: str(settings['threads']) for name in THREAD_ENV_VARS})
+        posix = os.name == 'posix'
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'worker', str(work_dir)],
+            env=env,
+            cwd=Path(__file__).parent,
+            start_new_session=posix,
+            preexec_fn=_limit_memory(settings['memory_mb']) if posix and settings['memory_mb'] else None,
+        )
+        try:
+            process.wait(timeout=settings['timeout'])
+        except subprocess.TimeoutExpired:
+            if posix:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.wait()
+            return None, f"timed out after {settings['timeout']:g}s", 'TimeoutError'
+
+        if process.returncode == 0:
+            with open(work_dir / 'model.pkl', 'rb') as f:
+                return pickle.load(f), None, None
+        error_path = work_dir / 'error.txt'
+        if error_path.exists():
+            error_type, _, message = error_path.read_text().partition('\n')
+            return None, message.strip(), error_type
+        if process.returncode < 0:
+            return None, f"killed by signal {-process.returncode}", 'Killed'
+        return None, f"exited with code {process.returncode}", 'RuntimeError'
+
+
+def _worker(work_dir):
+    """Subprocess entry point: fit the pickled request and pickle the model."""
+    work_dir = Path(work_dir)
+    try:
+        from prophet_model import train_prophet_model
+
+        with open(work_dir / 'input.pkl', 'rb') as f:
+            payload = pickle.load(f)
+        model = train_prophet_model(payload.pop('train_df'), **payload)
+        with open(work_dir / 'model.pkl', 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except BaseException as e:
+        error_type = 'MemoryError' if isinstance(e, MemoryError) else type(e).__name__
+        (work_dir / 'error.txt').write_text(f"{error_type}\n{e}")
+        raise
+
+
+def fit_prophet(train_df, settings=None, **train_kwargs):
+    """
+    Fit Prophet with the configured isolation, limits and fallback.
+
+    Args:
+        train_df (pd.DataFrame or PriceDataset): Training data
+        settings (dict): Overrides for fit_settings()
+        **train_kwargs: Passed to train_prophet_model() (yearly_seasonality,
+            weekly_seasonality, regressors, init)
+
+    Returns:
+        Prophet: Trained Prophet model
+
+    Raises:
+        ValueError: If the inputs are invalid
+        RuntimeError: If every attempt failed or timed out
+    """
+    settings = fit_settings(**(settings or {}))
+    algorithms = [settings['algorithm']]
+    if settings['fallback'] and settings['fallback'] != settings['algorithm']:
+        algorithms.append(settings['fallback'])
+
+    failures = []
+    for algorithm in algorithms:
+        start = time.perf_counter()
+        if settings['isolated']:
+            payload = dict(train_kwargs, train_df=train_df)
+            model, error, error_type = _run_attempt(payload, algorithm, settings)
+        else:
+            from prophet_model import train_prophet_model
+            try:
+                model, error, error_type = train_prophet_model(
+                    train_df, fit_settings={'algorithm': algorithm, 'iter': settings['iter']},
+                    **train_kwargs), None, None
+            except RuntimeError as e:
+                model, error, error_type = None, str(e), type(e).__name__
+        record(f'stan_fit[{algorithm}]', time.perf_counter() - start)
+        if model is not None:
+            return model
+        if error_type == 'ValueError':
+            raise ValueError(error)
+        if error_type not in RETRYABLE_ERRORS:
+            raise RuntimeError(f"Prophet fit failed: {error_type}: {error}")
+        failures.append(f"{algorithm}: {error}")
+        print(f"Prophet fit with {algorithm} failed ({error})"
+              + (f"; retrying with {algorithms[-1]}" if algorithm != algorithms[-1] else ''))
+    raise RuntimeError(f"Prophet fit failed: {'; '.join(failures)}")
+
+
+def _bench(args):
+    from data_loader import load_dataset, preprocess_data, get_train_test_split
+
+    data_files = sorted((Path(__file__).parent / 'data').glob('*.csv'))
+    csv_path = args.csv or (data_files or sorted(Path(__file__).parent.glob('*.csv')))[0]
+    train_df, _ = get_train_test_split(preprocess_data(load_dataset(str(csv_path))), test_days=90)
+
+    print(f"\n{'Algorithm':<10}{'Threads':>8}{'Mode':>11}{'Min':>9}{'Median':>9}"
+          f"{'Max':>9}{'Stdev':>8}{'Failed':>8}")
+    for algorithm in args.algorithms:
+        for threads in args.threads:
+            times, failed = [], 0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                try:
+                    fit_prophet(train_df, settings={
+                        'algorithm': algorithm, 'threads': threads, 'fallback': '',
+                        'iter': args.iter, 'timeout': args.timeout,
+                        'isolated': not args.in_process})
+                    times.append(time.perf_counter() - start)
+                except RuntimeError:
+                    failed += 1
+            mode = 'in-process' if args.in_process else 'isolated'
+            if times:
+                spread = statistics.stdev(times) if len(times) > 1 else 0.0
+                print(f"{algorithm:<10}{threads:>8}{mode:>11}{min(times):>8.2f}s"
+                      f"{statistics.median(times):>8.2f}s{max(times):>8.2f}s{spread:>7.2f}s"
+                      f"{failed:>8}", flush=True)
+            else:
+                print(f"{algorithm:<10}{threads:>8}{mode:>11}{'-':>9}{'-':>9}{'-':>9}{'-':>8}"
+                      f"{failed:>8}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Isolated Prophet fitting")
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help=argparse.SUPPRESS)
+    worker.add_argument('work_dir')
+    bench = sub.add_parser('bench', help="Fit-time distribution per optimizer setting")
+    bench.add_argument('--csv', help="CSV to fit (default: the bundled data)")
+    bench.add_argument('--algorithms', nargs='+', default=['LBFGS', 'BFGS', 'Newton'])
+    bench.add_argument('--threads', type=int, nargs='+', default=[1])
+    bench.add_argument('--iter', type=int, default=DEFAULT_FIT_SETTINGS['iter'])
+    bench.add_argument('--timeout', type=float, default=DEFAULT_FIT_SETTINGS['timeout'])
+    bench.add_argument('--repeat', type=int, default=5)
+    bench.add_argument('--in-process', action='store_true',
+                       help="Fit in this process to measure the isolation overhead")
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        _worker(args.work_dir)
+    else:
+        _bench(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
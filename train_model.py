@@ -1,149 +1,467 @@
 """
 Standalone Training Script
 Run this script to train the model and generate all plots without running the Flask server.
-Usage: python train_model.py
+Usage: python train_model.py [--model prophet|prophet_regressors|naive|drift|seasonal_naive|ses|holt|ar|ensemble]
+                             [--no-promote] [--only STAGE ...] [--force STAGE|all ...] [--workers N]
+                             [--trace-memory] [--report PATH]
+       python train_model.py --export DIR [--horizons 7 30 90 ...] [--format npy|parquet]
+                             [--model NAME] [--workers N]
+
+The steps run as memoized pipeline stages (see pipeline.py): an unchanged
+rerun loads cached outputs instead of refitting. The trained model, metrics,
+forecast and plots are published as one immutable bundle in registry/
+(see model_store.py) and promoted unless --no-promote is given.
+
+--export is a headless batch mode: for every CSV asset it runs the pipeline
+only up to the (cached) full-history refit, so forecasts start the day
+after the last observation, predicts the longest requested horizon once,
+and writes each (asset, horizon) series as a partition
+DIR/asset=<asset>/horizon=<h>/ (one .npy file per column, or
+forecast.parquet, which needs pyarrow), followed by DIR/manifest.json.
+Assets are processed in parallel worker processes and nothing is plotted.
 """
 
+import argparse
+import json
+import os
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import matplotlib
+
+# Use Agg backend; stages may render plots in worker processes
+matplotlib.use('Agg')
+import numpy as np
+
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent
 
 # Import all modules
-from data_loader import load_data, preprocess_data, get_train_test_split
+import data_loader
+import eda
+import model_evaluation
+import models
+import prophet_model
+import regressors
+import stan_fit
+from data_loader import (DEFAULT_BAR, dataset_cache_path, load_dataset, preprocess_data,
+                         get_train_test_split)
 from prophet_model import (
-    train_prophet_model, 
     generate_forecast, 
     plot_forecast, 
     plot_components,
-    save_model
 )
+from models import MODEL_NAMES, fit_model, refit_model
+from regressors import DEFAULT_REGRESSORS
+from risk import MAX_HORIZON
+from model_store import asset_registry, file_hash, publish_bundle, promote
 from model_evaluation import evaluate_model, print_evaluation_metrics, plot_evaluation
 from eda import plot_historical_price, plot_price_statistics, print_data_summary
+from pipeline import Pipeline, Stage, print_report
+import instrumentation
+
+
+EXPORT_FORMATS = ('npy', 'parquet')
+EXPORT_COLUMNS = ('ds', 'yhat', 'yhat_lower', 'yhat_upper')
+DEFAULT_EXPORT_HORIZONS = (7, 30, 60, 90)
+
+# Plot stages: name -> bundle file name
+PLOT_STAGES = {
+    'plot_historical': 'historical.png',
+    'plot_statistics': 'statistics.png',
+    'plot_forecast': 'forecast.png',
+    'plot_components': 'components.png',
+    'plot_evaluation': 'evaluation.png',
+}
+
+
+def _render(plot, *args, **kwargs):
+    """Run a plotting function and return the saved PNG as bytes."""
+    # Imported here so the headless export never loads pyplot itself
+    import matplotlib.pyplot as plt
+
+    with tempfile.TemporaryDirectory() as plot_dir:
+        path = Path(plot_dir) / 'plot.png'
+        plot(*args, save_path=str(path), **kwargs)
+        plt.close('all')
+        return path.read_bytes()
+
+
+# Stage functions. Each receives its input stages' outputs positionally and
+# its config as keyword arguments; see build_pipeline() for the graph.
+
+def load_stage(csv_path, cache_path, source_hash, bar=None):
+    return load_dataset(csv_path, cache_path=cache_path, bar=bar)
+
+
+def preprocess_stage(dataset):
+    return preprocess_data(dataset)
+
+
+def split_stage(df_prophet, test_days):
+    return get_train_test_split(df_prophet, test_days=test_days)
+
+
+def _fit_params(optimizer, regressors):
+    params = {'settings': optimizer} if optimizer else {}
+    if regressors:
+        params['names'] = tuple(regressors)
+    return params
+
+
+def fit_stage(split, model_name, optimizer=None, regressors=None):
+    return fit_model(model_name, split[0], **_fit_params(optimizer, regressors))
+
+
+def refit_stage(model, df_prophet, model_name, optimizer=None, regressors=None):
+    return refit_model(model_name, model, df_prophet, **_fit_params(optimizer, regressors))
+
+
+def evaluate_stage(model, split):
+    return evaluate_model(model, split[1])
+
+
+def forecast_stage(model, periods):
+    return generate_forecast(model, periods=periods)
+
+
+def plot_historical_stage(dataset):
+    return _render(plot_historical_price, dataset.to_frame())
+
+
+def plot_statistics_stage(dataset):
+    return _render(plot_price_statistics, dataset.to_frame())
+
+
+def plot_forecast_stage(model, forecast_30):
+    return _render(plot_forecast, model, forecast_30, title="Bitcoin 30-Day Price Forecast")
+
+
+def plot_components_stage(model, forecast_90):
+    return _render(plot_components, model, forecast_90)
+
+
+def plot_evaluation_stage(metrics):
+    return _render(plot_evaluation, metrics['combined'])
+
+
+def publish_stage(model, metrics, df_prophet, forecast_90, *plots, asset, model_name,
+                  plot_names, source, promote_bundle):
+    registry = asset_registry(asset)
+    with tempfile.TemporaryDirectory() as plot_dir:
+        paths = {}
+        for name, image in zip(plot_names, plots):
+            paths[name] = Path(plot_dir) / name
+            paths[name].write_bytes(image)
+        bundle_id = publish_bundle(model, metrics, df_prophet, registry, model_name=model_name,
+                                   plots=paths, forecast=forecast_90, source=source)
+    if promote_bundle:
+        promote(bundle_id, registry)
+    return registry / 'bundles' / bundle_id
+
+
+def write_run_report(path, model_name, csv_path, started, stage_report, bundle_dir=None):
+    """
+    Write a JSON report of one training run: stage statuses and timings
+    plus the instrumented function timers (and peak memory when traced).
+
+    Args:
+        path (Path): Destination file
+        model_name (str): Model trained
+        csv_path (Path): Source CSV
+        started (float): time.time() at the start of the run
+        stage_report (list): (stage, status, seconds) from Pipeline.run()
+        bundle_dir (Path): Published bundle, if any
+    """
+    report = {
+        'started_at': started,
+        'total_seconds': time.time() - started,
+        'model_name': model_name,
+        'csv': csv_path.name,
+        'bundle': bundle_dir.name if bundle_dir is not None else None,
+        'memory_tracking': instrumentation.memory_tracking_enabled(),
+        'stages': [
+            {'stage': name, 'status': status, 'seconds': seconds}
+            for name, status, seconds in stage_report
+        ],
+        'functions': instrumentation.snapshot(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Run report saved to {path}")
+
+
+def build_pipeline(csv_path, model_name='prophet', promote_bundle=True, cache_dir=None,
+                   workers=None):
+    """
+    Declare the training pipeline for one CSV file.
+
+    load -> preprocess -> split -> fit -> evaluate / refit -> forecast_* -> plot_* -> publish
+
+    Args:
+        csv_path (Path): Source CSV
+        model_name (str): Model to train, 'prophet' or a baseline from models.py
+        promote_bundle (bool): Whether publish promotes the new bundle
+        cache_dir (Path): Cache root (default: PROJECT_ROOT/'cache')
+        workers (int): Worker processes for independent stages
+
+    Returns:
+        Pipeline: Pipeline with stage outputs cached in <cache_dir>/pipeline
+    """
+    cache_dir = Path(cache_dir or PROJECT_ROOT / 'cache')
+    source = {'path': csv_path.name, 'hash': file_hash(csv_path)}
+    plots = [name for name in PLOT_STAGES
+             if name != 'plot_components' or model_name == 'prophet']
+    prophet = model_name in ('prophet', 'prophet_regressors')
+    fit_config = {
+        'model_name': model_name,
+        'optimizer': stan_fit.optimizer_settings() if prophet else None,
+        'regressors': list(DEFAULT_REGRESSORS) if model_name == 'prophet_regressors' else None,
+    }
+    stages = [
+        Stage('load', load_stage, config={
+            'csv_path': str(csv_path),
+            'cache_path': str(dataset_cache_path(csv_path, cache_dir)),
+            'bar': DEFAULT_BAR,
+            'source_hash': source['hash'],
+        }, code=(data_loader,)),
+        Stage('preprocess', preprocess_stage, ['load'], code=(data_loader,)),
+        Stage('split', split_stage, ['preprocess'], {'test_days': 90}, code=(data_loader,)),
+        Stage('fit', fit_stage, ['split'], fit_config,
+              code=(models, prophet_model, stan_fit, regressors)),
+        Stage('evaluate', evaluate_stage, ['fit', 'split'], code=(model_evaluation,)),
+        # Served forecasts come from a refit on all the data
+        Stage('refit', refit_stage, ['fit', 'preprocess'], fit_config,
+              code=(models, prophet_model, stan_fit, regressors)),
+        Stage('forecast_30', forecast_stage, ['refit'], {'periods': 30}, code=(prophet_model,)),
+        Stage('forecast_90', forecast_stage, ['refit'], {'periods': 90}, code=(prophet_model,)),
+        Stage('plot_historical', plot_historical_stage, ['load'], code=(eda,)),
+        Stage('plot_statistics', plot_statistics_stage, ['load'], code=(eda,)),
+        Stage('plot_forecast', plot_forecast_stage, ['refit', 'forecast_30'], code=(prophet_model,)),
+        Stage('plot_evaluation', plot_evaluation_stage, ['evaluate'], code=(model_evaluation,)),
+    ]
+    if 'plot_components' in plots:
+        stages.append(Stage('plot_components', plot_components_stage, ['refit', 'forecast_90'],
+                            code=(prophet_model,)))
+    stages.append(Stage(
+        'publish', publish_stage,
+        ['refit', 'evaluate', 'preprocess', 'forecast_90'] + plots,
+        {'asset': csv_path.stem, 'model_name': model_name,
+         'plot_names': [PLOT_STAGES[name] for name in plots],
+         'source': source, 'promote_bundle': promote_bundle},
+        cache=False,
+    ))
+    return Pipeline(stages, cache_dir / 'pipeline', workers=workers)
 
 
-def main():
+def find_csv_files():
+    """
+    CSV files to train on: data/*.csv, or *.csv in the project root.
+
+    Returns:
+        list: CSV paths, sorted
+    """
+    data_dir = PROJECT_ROOT / 'data'
+    csv_files = sorted(data_dir.glob('*.csv')) if data_dir.exists() else []
+    return csv_files or sorted(PROJECT_ROOT.glob('*.csv'))
+
+
+def _write_partition(path, columns, fmt):
+    """Write one forecast series as .npy column files or a Parquet file."""
+    path.mkdir(parents=True, exist_ok=True)
+    if fmt == 'npy':
+        for name, values in columns.items():
+            np.save(path / f'{name}.npy', values)
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pq.write_table(pa.table(columns), path / 'forecast.parquet')
+
+
+def _export_asset(csv_path, model_name, horizons, out_dir, fmt):
+    """
+    Refit one asset on its full history (or load the cached refit) and write
+    its forecast series, which start the day after the last observation.
+
+    Returns:
+        list: Manifest entries, one per horizon
+    """
+    pipeline = build_pipeline(csv_path, model_name, promote_bundle=False, workers=1)
+    outputs, _ = pipeline.run(['refit', 'preprocess'])
+    forecast = generate_forecast(outputs['refit'], periods=max(horizons)).tail(max(horizons))
+    columns = {
+        'ds': forecast['ds'].to_numpy(dtype='datetime64[D]'),
+        **{name: forecast[name].to_numpy(dtype=np.float64) for name in EXPORT_COLUMNS[1:]},
+    }
+    entries = []
+    for horizon in horizons:
+        relative = Path(f'asset={csv_path.stem}') / f'horizon={horizon}'
+        _write_partition(out_dir / relative, {name: values[:horizon]
+                                              for name, values in columns.items()}, fmt)
+        entries.append({
+            'asset': csv_path.stem,
+            'horizon': horizon,
+            'path': relative.as_posix(),
+            'rows': horizon,
+            'start': str(columns['ds'][0]),
+            'end': str(columns['ds'][horizon - 1]),
+            'data_fingerprint': outputs['preprocess'].fingerprint(),
+        })
+    return entries
+
+
+def export_forecasts(out_dir, model_name='prophet', horizons=DEFAULT_EXPORT_HORIZONS,
+                     fmt='npy', workers=None, csv_files=None):
+    """
+    Headless batch export of forecasts for every asset and horizon.
+
+    Args:
+        out_dir (Path): Destination directory
+        model_name (str): Model to forecast with
+        horizons (list): Forecast horizons in days, each 1..MAX_HORIZON
+        fmt (str): 'npy' or 'parquet'
+        workers (int): Worker processes (default: CPU count, at most one per asset)
+        csv_files (list): Assets to export (default: find_csv_files())
+
+    Returns:
+        dict: The manifest written to out_dir/manifest.json
+
+    Raises:
+        ValueError: If a horizon or the format is invalid
+    """
+    if not horizons or any(not 1 <= horizon <= MAX_HORIZON for horizon in horizons):
+        raise ValueError(f"Horizons must be between 1 and {MAX_HORIZON}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet export needs pyarrow: pip install pyarrow (or use --format npy)")
+    csv_files = list(csv_files or find_csv_files())
+    horizons = sorted(set(horizons))
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.time()
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(csv_files)) or 1
+    args = [(csv_path, model_name, horizons, out_dir, fmt) for csv_path in csv_files]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_export_asset, *zip(*args)))
+    else:
+        results = [_export_asset(*item) for item in args]
+    seconds = time.perf_counter() - start
+
+    partitions = [entry for entries in results for entry in entries]
+    manifest = {
+        'created_at': started,
+        'model_name': model_name,
+        'format': fmt,
+        'columns': list(EXPORT_COLUMNS),
+        'horizons': horizons,
+        'assets': [csv_path.stem for csv_path in csv_files],
+        'series': len(partitions),
+        'seconds': seconds,
+        'series_per_second': len(partitions) / seconds if seconds else None,
+        'partitions': partitions,
+    }
+    with open(out_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(model_name='prophet', promote_bundle=True, only=None, force=(), workers=None,
+         trace_memory=False, report_path=None):
     """
     Main training function - runs the complete pipeline
+    
+    Stage outputs are cached under cache/pipeline, so a rerun only
+    recomputes stages whose inputs, settings or code changed.
+    
+    Args:
+        model_name (str): Model to train, 'prophet' or a baseline from models.py
+        promote_bundle (bool): Whether to make the new bundle the served one
+        only (list): Run only these stages (and whatever they need); default all
+        force (list): Stages to recompute even if cached ('all' for every stage)
+        workers (int): Worker processes for independent stages
+        trace_memory (bool): Record peak memory per instrumented function
+        report_path (Path): Run report destination (default:
+            reports/train_<timestamp>.json)
     """
+    started = time.time()
+    if trace_memory:
+        instrumentation.enable_memory_tracking()
+    report_path = Path(report_path or PROJECT_ROOT / 'reports' /
+                       time.strftime('train_%Y%m%d-%H%M%S.json', time.localtime(started)))
+    
     print("\n" + "=" * 70)
     print("BITCOIN PRICE FORECASTING - MODEL TRAINING SCRIPT")
     print("=" * 70 + "\n")
     
-    # Directories
-    data_dir = PROJECT_ROOT / 'data'
-    static_dir = PROJECT_ROOT / 'static'
-    model_dir = PROJECT_ROOT / 'model'
-    
-    # Create directories if they don't exist
-    static_dir.mkdir(exist_ok=True)
-    model_dir.mkdir(exist_ok=True)
-    
-    # Step 1: Find and load CSV file
-    print("Step 1: Loading Data")
+    # Step 1: Find CSV file
+    print("Step 1: Locating Data")
     print("-" * 70)
     
-    csv_files = list(data_dir.glob('*.csv')) if data_dir.exists() else []
-    
-    if not csv_files:
-        csv_files = list(PROJECT_ROOT.glob('*.csv'))
+    csv_files = find_csv_files()
     
     if not csv_files:
         print("❌ ERROR: No CSV file found!")
-        print(f"   Please place a CSV file in {data_dir} or {PROJECT_ROOT}")
+        print(f"   Please place a CSV file in {PROJECT_ROOT / 'data'} or {PROJECT_ROOT}")
         return False
     
     csv_path = csv_files[0]
     print(f"✓ Found CSV file: {csv_path.name}\n")
     
     try:
-        # Load data
-        df_original = load_data(str(csv_path))
-        print("✓ Data loaded successfully\n")
-        
-        # Step 2: Data Summary
-        print("Step 2: Data Summary")
+        # Step 2: Run the stage pipeline
+        print(f"Step 2: Running Pipeline ({model_name})")
         print("-" * 70)
-        print_data_summary(df_original)
+        pipeline = build_pipeline(csv_path, model_name, promote_bundle, workers=workers)
+        targets = only or list(pipeline.stages)
+        outputs, report = pipeline.run(targets, force=force)
+        print("\nStages:")
+        print_report(report)
+        print()
+        write_run_report(report_path, model_name, csv_path, started, report,
+                         outputs.get('publish'))
+        print()
         
-        # Step 3: Data Preprocessing
-        print("Step 3: Data Preprocessing")
-        print("-" * 70)
-        df_prophet = preprocess_data(df_original)
-        print("✓ Data preprocessed for Prophet\n")
+        if 'publish' not in outputs:
+            print("=" * 70)
+            print(f"STAGES COMPLETED: {', '.join(targets)}")
+            print("=" * 70 + "\n")
+            return True
         
-        # Step 4: Train/Test Split
-        print("Step 4: Creating Train/Test Split")
-        print("-" * 70)
-        train_df, test_df = get_train_test_split(df_prophet, test_days=90)
-        print("✓ Data split completed\n")
+        # Summaries from the stage outputs
+        df_original = outputs['load'].to_frame()
+        metrics = outputs['evaluate']
+        forecast_30 = outputs['forecast_30']
+        bundle_dir = outputs['publish']
         
-        # Step 5: Train Prophet Model
-        print("Step 5: Training Prophet Model")
+        print("Data Summary")
         print("-" * 70)
-        model = train_prophet_model(train_df)
-        print("✓ Model training completed\n")
-        
-        # Step 6: Model Evaluation
-        print("Step 6: Model Evaluation")
+        print_data_summary(df_original)
+        print("Model Evaluation")
         print("-" * 70)
-        metrics = evaluate_model(model, test_df)
         print_evaluation_metrics(metrics)
         
-        # Step 7: Generate Forecasts
-        print("Step 7: Generating Forecasts")
-        print("-" * 70)
-        forecast_30 = generate_forecast(model, periods=30)
-        print("✓ 30-day forecast generated")
-        forecast_90 = generate_forecast(model, periods=90)
-        print("✓ 90-day forecast generated\n")
-        
-        # Step 8: Create Visualizations
-        print("Step 8: Creating Visualizations")
-        print("-" * 70)
-        
-        # Historical price plot
-        hist_path = static_dir / 'historical.png'
-        plot_historical_price(df_original, save_path=str(hist_path))
-        
-        # Price statistics plot
-        stats_path = static_dir / 'statistics.png'
-        plot_price_statistics(df_original, save_path=str(stats_path))
-        
-        # Forecast plot
-        forecast_path = static_dir / 'forecast.png'
-        plot_forecast(model, forecast_30, title="Bitcoin 30-Day Price Forecast", 
-                      save_path=str(forecast_path))
-        
-        # Components plot
-        components_path = static_dir / 'components.png'
-        plot_components(model, forecast_90, save_path=str(components_path))
-        
-        # Evaluation plot
-        eval_path = static_dir / 'evaluation.png'
-        plot_evaluation(metrics['combined'], save_path=str(eval_path))
-        
-        print("✓ All visualizations saved\n")
-        
-        # Step 9: Save Model
-        print("Step 9: Saving Model")
-        print("-" * 70)
-        model_path = model_dir / 'prophet_model.pkl'
-        save_model(model, str(model_path))
-        print()
-        
         # Summary
         print("=" * 70)
         print("TRAINING COMPLETED SUCCESSFULLY")
         print("=" * 70)
-        print(f"\n📊 Generated Files:")
-        print(f"   - {hist_path.relative_to(PROJECT_ROOT)}")
-        print(f"   - {stats_path.relative_to(PROJECT_ROOT)}")
-        print(f"   - {forecast_path.relative_to(PROJECT_ROOT)}")
-        print(f"   - {components_path.relative_to(PROJECT_ROOT)}")
-        print(f"   - {eval_path.relative_to(PROJECT_ROOT)}")
-        print(f"   - {model_path.relative_to(PROJECT_ROOT)}")
+        print(f"\n📊 Generated Bundle: {bundle_dir.relative_to(PROJECT_ROOT)}")
+        for path in sorted(bundle_dir.rglob('*')):
+            if path.is_file():
+                print(f"   - {path.relative_to(bundle_dir)}")
+        if not promote_bundle:
+            print(f"   (not promoted; run 'python model_store.py --asset {csv_path.stem} "
+                  f"promote {bundle_dir.name}')")
         
         print(f"\n📈 Key Results:")
         print(f"   - MAE: ${metrics['mae']:.2f}")
@@ -180,5 +498,39 @@ def main():
 
 
 if __name__ == '__main__':
-    success = main()
+    parser = argparse.ArgumentParser(description="Train the forecasting model and generate plots")
+    parser.add_argument('--model', default='prophet', choices=MODEL_NAMES,
+                        help="Model to train (default: prophet)")
+    parser.add_argument('--no-promote', action='store_true',
+                        help="Publish the bundle without serving it")
+    parser.add_argument('--only', action='append', metavar='STAGE',
+                        help="Run only this stage and what it needs (repeatable)")
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE',
+                        help="Recompute this stage and its dependents even if cached "
+                             "(repeatable; 'all' for every stage)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for independent stages (default: CPU count)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record peak memory per step with tracemalloc (slower)")
+    parser.add_argument('--report', default=None,
+                        help="Run report path (default: reports/train_<timestamp>.json)")
+    parser.add_argument('--export', metavar='DIR', default=None,
+                        help="Headless batch mode: write forecasts for every asset to DIR")
+    parser.add_argument('--horizons', type=int, nargs='+', default=list(DEFAULT_EXPORT_HORIZONS),
+                        help="Forecast horizons to export (with --export)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='npy',
+                        help="Export file format (with --export; parquet needs pyarrow)")
+    args = parser.parse_args()
+    if any(not 1 <= horizon <= MAX_HORIZON for horizon in args.horizons):
+        parser.error(f"--horizons must be between 1 and {MAX_HORIZON}")
+    if args.export:
+        manifest = export_forecasts(args.export, args.model, args.horizons, args.format,
+                                    args.workers)
+        print(f"Exported {manifest['series']} series ({len(manifest['assets'])} assets x "
+              f"{len(manifest['horizons'])} horizons) to {args.export} in "
+              f"{manifest['seconds']:.2f}s ({manifest['series_per_second']:.1f} series/s)")
+        sys.exit(0)
+    success = main(model_name=args.model, promote_bundle=not args.no_promote,
+                   only=args.only, force=args.force, workers=args.workers,
+                   trace_memory=args.trace_memory, report_path=args.report)
     sys.exit(0 if success else 1)
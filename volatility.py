@@ -0,0 +1,253 @@
+"""
+Volatility Forecasting Module
+Fits EWMA (RiskMetrics) and GARCH(1,1) conditional-variance models to daily
+log returns, forecasts volatility over a horizon, and rescales forecast
+intervals by the forecast volatility so they widen in turbulent periods and
+narrow in calm ones
+
+Both variance recursions are linear in the squared returns,
+    var[t] = omega + alpha * e[t-1]**2 + beta * var[t-1]
+(EWMA is omega=0, alpha=1-lambda, beta=lambda), so the whole variance path is
+one scipy.signal.lfilter call and the Gaussian log-likelihood is a single
+vectorized expression; fitting 14 years of daily returns takes milliseconds.
+A fitted model keeps the next-day variance, so update() filters each new
+return in O(1).
+"""
+
+import numpy as np
+from scipy.optimize import minimize, minimize_scalar
+from scipy.signal import lfilter
+
+
+# Crypto trades every calendar day
+PERIODS_PER_YEAR = 365
+
+
+def daily_log_returns(data):
+    """
+    Daily log returns of the Close price.
+
+    Args:
+        data (pd.DataFrame or PriceDataset): load_data() output or a dataset
+
+    Returns:
+        np.ndarray: Log returns (one fewer than prices)
+    """
+    close = np.asarray(data['Close'], dtype=np.float64)
+    returns = np.diff(np.log(close))
+    return returns[np.isfinite(returns)]
+
+
+def _variance_path(residuals, omega, alpha, beta, initial):
+    """Conditional variances var[0..T-1] with var[0] = initial."""
+    x = omega + alpha * residuals[:-1] ** 2
+    rest, _ = lfilter([1.0], [1.0, -beta], x, zi=[beta * initial])
+    return np.concatenate(([initial], rest))
+
+
+def _neg_loglik(residuals, variances):
+    return 0.5 * np.sum(np.log(2 * np.pi * variances) + residuals ** 2 / variances)
+
+
+class VolatilityModel:
+    """
+    Base class for recursive conditional-variance models.
+
+    Subclasses implement _fit(residuals), setting omega, alpha and beta.
+    After fit(), `variances` holds the in-sample conditional variances and
+    `next_variance` the one-step-ahead forecast.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.mu = 0.0
+        self.omega = self.alpha = self.beta = None
+        self.initial_variance = None
+        self.sample_variance = None
+        self.variances = None
+        self.next_variance = None
+        self.loglik = None
+
+    def fit(self, returns):
+        """
+        Fit the model to daily log returns.
+
+        Args:
+            returns (np.ndarray): Daily log returns, oldest first
+
+        Returns:
+            VolatilityModel: self
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        if len(returns) < 30:
+            raise ValueError("Need at least 30 returns to fit a volatility model")
+        self.mu = float(returns.mean())
+        residuals = returns - self.mu
+        self.sample_variance = float(residuals.var())
+        self.initial_variance = float(residuals[:30].var())
+        self._fit(residuals)
+        self.variances = _variance_path(residuals, self.omega, self.alpha, self.beta,
+                                        self.initial_variance)
+        self.loglik = -float(_neg_loglik(residuals, self.variances))
+        self.next_variance = float(self.omega + self.alpha * residuals[-1] ** 2
+                                   + self.beta * self.variances[-1])
+        return self
+
+    def _loss(self, residuals, omega, alpha, beta):
+        return _neg_loglik(residuals, _variance_path(residuals, omega, alpha, beta,
+                                                     self.initial_variance))
+
+    def update(self, log_return):
+        """
+        Filter one new daily return in O(1).
+
+        Args:
+            log_return (float): Latest daily log return
+
+        Returns:
+            float: Variance forecast for the following day
+        """
+        residual = log_return - self.mu
+        self.next_variance = float(self.omega + self.alpha * residual ** 2
+                                   + self.beta * self.next_variance)
+        return self.next_variance
+
+    @property
+    def long_run_variance(self):
+        """float: Unconditional variance (sample variance when not mean-reverting)."""
+        persistence = self.alpha + self.beta
+        if self.omega > 0 and persistence < 1:
+            return self.omega / (1 - persistence)
+        return self.sample_variance
+
+    def forecast(self, horizon):
+        """
+        Expected daily variances for the next `horizon` days.
+
+        Args:
+            horizon (int): Number of days
+
+        Returns:
+            np.ndarray: Variance of each future day's return
+        """
+        steps = np.arange(horizon)
+        persistence = self.alpha + self.beta
+        if self.omega > 0 and persistence < 1:
+            long_run = self.long_run_variance
+            return long_run + persistence ** steps * (self.next_variance - long_run)
+        return np.full(horizon, self.next_variance)
+
+    def params(self):
+        """dict: Fitted parameters."""
+        return {'mu': self.mu, 'omega': self.omega, 'alpha': self.alpha, 'beta': self.beta}
+
+    def summary(self, horizon):
+        """
+        JSON-friendly volatility forecast.
+
+        Args:
+            horizon (int): Number of days
+
+        Returns:
+            dict: Parameters, log-likelihood, current and long-run daily and
+            annualized volatility, per-day volatility and horizon volatility
+        """
+        variances = self.forecast(horizon)
+        return {
+            'model': self.name,
+            'params': self.params(),
+            'loglik': self.loglik,
+            'current_daily': float(np.sqrt(self.next_variance)),
+            'current_annualized': float(np.sqrt(self.next_variance * PERIODS_PER_YEAR)),
+            'long_run_annualized': float(np.sqrt(self.long_run_variance * PERIODS_PER_YEAR)),
+            'daily': np.sqrt(variances).tolist(),
+            'horizon': float(np.sqrt(variances.sum())),
+        }
+
+
+class EWMAVolatility(VolatilityModel):
+    """RiskMetrics EWMA variance; lambda is fitted by maximum likelihood unless given."""
+
+    name = 'ewma'
+
+    def __init__(self, lam=None):
+        super().__init__()
+        self.lam = lam
+
+    def _fit(self, residuals):
+        if self.lam is None:
+            result = minimize_scalar(
+                lambda lam: self._loss(residuals, 0.0, 1 - lam, lam),
+                bounds=(0.5, 0.9999), method='bounded')
+            self.lam = float(result.x)
+        self.omega, self.alpha, self.beta = 0.0, 1 - self.lam, self.lam
+
+
+class GarchVolatility(VolatilityModel):
+    """
+    GARCH(1,1) with variance targeting: omega is tied to the sample variance,
+    and (alpha, beta) are fitted as persistence alpha+beta and alpha's share of it.
+    """
+
+    name = 'garch'
+
+    def _fit(self, residuals):
+        target = self.sample_variance
+
+        def loss(x):
+            persistence, share = x
+            alpha, beta = persistence * share, persistence * (1 - share)
+            return self._loss(residuals, target * (1 - persistence), alpha, beta)
+
+        result = minimize(loss, x0=[0.95, 0.1], method='L-BFGS-B',
+                          bounds=[(0.5, 0.9995), (1e-4, 0.9)])
+        persistence, share = result.x
+        self.alpha = float(persistence * share)
+        self.beta = float(persistence * (1 - share))
+        self.omega = float(target * (1 - persistence))
+
+
+VOLATILITY_MODELS = {'ewma': EWMAVolatility, 'garch': GarchVolatility}
+
+
+def fit_volatility(name, data):
+    """
+    Fit a volatility model by name to a price history.
+
+    Args:
+        name (str): 'ewma' or 'garch'
+        data (pd.DataFrame or PriceDataset): Prices with a 'Close' column
+
+    Returns:
+        VolatilityModel: Fitted model
+    """
+    if name not in VOLATILITY_MODELS:
+        raise ValueError(f"Unknown volatility model '{name}'. "
+                         f"Choose from: {', '.join(VOLATILITY_MODELS)}")
+    return VOLATILITY_MODELS[name]().fit(daily_log_returns(data))
+
+
+def rescale_intervals(forecast, model):
+    """
+    Rescale forecast intervals by forecast vs. long-run volatility.
+
+    Each day's distance from yhat to the bounds is multiplied by
+    sqrt(forecast cumulative variance / (days * long-run variance)), so the
+    band reflects current volatility instead of the average level the
+    forecasting model was fitted to.
+
+    Args:
+        forecast (pd.DataFrame): Future rows with 'yhat', 'yhat_lower', 'yhat_upper'
+        model (VolatilityModel): Fitted volatility model
+
+    Returns:
+        pd.DataFrame: Copy of the forecast with rescaled bounds
+    """
+    days = np.arange(1, len(forecast) + 1)
+    scale = np.sqrt(np.cumsum(model.forecast(len(forecast))) / (days * model.long_run_variance))
+    yhat = forecast['yhat'].to_numpy()
+    result = forecast.copy()
+    result['yhat_lower'] = yhat - (yhat - forecast['yhat_lower'].to_numpy()) * scale
+    result['yhat_upper'] = yhat + (forecast['yhat_upper'].to_numpy() - yhat) * scale
+    return result